@@ -0,0 +1,35 @@
+"""Trivial factories for the synthetic configs, so the benchmarks measure
+Montague rather than the apps it loads."""
+
+
+class App(object):
+    def __init__(self, conf):
+        self.conf = conf
+
+    def __call__(self, environ, start_response):
+        start_response('200 OK', [('Content-type', 'text/plain')])
+        return [b'bench']
+
+
+class Filter(object):
+    def __init__(self, app, conf):
+        self.app = app
+        self.conf = conf
+
+    def __call__(self, environ, start_response):
+        return self.app(environ, start_response)
+
+
+def make_app(global_conf, **local_conf):
+    return App(local_conf)
+
+
+def make_filter(global_conf, **local_conf):
+    def filter(app):
+        return Filter(app, local_conf)
+    return filter
+
+
+def make_composite(loader, global_conf, **local_conf):
+    return dict((key, loader.get_app(value))
+                for key, value in local_conf.items() if key.startswith('/'))
@@ -0,0 +1,167 @@
+"""Generates synthetic Montague configs of a given size, as INI and as JSON
+(in Montague Standard Format), for benchmarking.
+
+Every config has:
+
+* ``sections`` plain app sections, app_0 to app_N, each with ``options``
+  options, ``interpolation`` (0 to 1) of which refer to a default;
+* a composite, main, mounting the first ``fanout`` of those apps;
+* a pipeline, piped, and a chain of filters joined by filter-with, chain_0
+  onwards, both ``pipeline_depth`` filters deep;
+* nested_0, a filter-app whose next is another filter-app, and so on,
+  ``filter_app_depth`` deep;
+* logging config with ``handlers`` handlers attached to the root logger.
+
+All factories are in bench_factories, which must be importable."""
+from __future__ import absolute_import
+
+import json
+import os.path
+from collections import OrderedDict
+
+DEFAULTS = OrderedDict([
+    ('sections', 20),
+    ('options', 5),
+    ('interpolation', 0.5),
+    ('fanout', 4),
+    ('pipeline_depth', 4),
+    ('filter_app_depth', 4),
+    ('handlers', 2),
+])
+
+APP = 'call:bench_factories:make_app'
+FILTER = 'call:bench_factories:make_filter'
+COMPOSITE = 'call:bench_factories:make_composite'
+BASE = '/srv/bench'
+
+
+class SyntheticConfig(object):
+    def __init__(self, **params):
+        unknown = set(params) - set(DEFAULTS)
+        if unknown:
+            raise TypeError("Unknown parameters: {0}".format(', '.join(sorted(unknown))))
+        self.params = OrderedDict(DEFAULTS)
+        self.params.update(params)
+        for key, value in self.params.items():
+            setattr(self, key, value)
+        if self.fanout > self.sections:
+            raise ValueError("fanout can't be more than sections")
+
+    def _options(self, index, interpolate):
+        interpolated = int(round(self.interpolation * self.options))
+        options = OrderedDict()
+        for n in range(self.options):
+            if n < interpolated:
+                value = '%(base)s/app_{0}/{1}' if interpolate else BASE + '/app_{0}/{1}'
+            else:
+                value = 'value_{0}_{1}'
+            options['option_{0}'.format(n)] = value.format(index, n)
+        return options
+
+    def ini_sections(self):
+        """Returns an OrderedDict of INI section name to OrderedDict of options."""
+        sections = OrderedDict()
+        sections['DEFAULT'] = OrderedDict([('base', BASE)])
+        main = sections['composite:main'] = OrderedDict([('use', COMPOSITE)])
+        for index in range(self.fanout):
+            main['/app_{0}'.format(index)] = 'app_{0}'.format(index)
+        for index in range(self.sections):
+            section = sections['app:app_{0}'.format(index)] = OrderedDict([('use', APP)])
+            section.update(self._options(index, True))
+        filters = ' '.join('pipe_{0}'.format(n) for n in range(self.pipeline_depth))
+        sections['pipeline:piped'] = OrderedDict([('pipeline', (filters + ' app_0').strip())])
+        for n in range(self.pipeline_depth):
+            sections['filter:pipe_{0}'.format(n)] = OrderedDict([('use', FILTER)])
+        for n in range(self.pipeline_depth):
+            section = sections['filter:chain_{0}'.format(n)] = OrderedDict([('use', FILTER)])
+            if n + 1 < self.pipeline_depth:
+                section['filter-with'] = 'chain_{0}'.format(n + 1)
+        for n in range(self.filter_app_depth):
+            next_app = 'nested_{0}'.format(n + 1) if n + 1 < self.filter_app_depth else 'app_0'
+            sections['filter-app:nested_{0}'.format(n)] = OrderedDict(
+                [('use', FILTER), ('next', next_app)])
+        if self.handlers:
+            handler_names = ['h{0}'.format(n) for n in range(self.handlers)]
+            sections['loggers'] = OrderedDict([('keys', 'root')])
+            sections['handlers'] = OrderedDict([('keys', ','.join(handler_names))])
+            sections['formatters'] = OrderedDict([('keys', 'generic')])
+            sections['logger_root'] = OrderedDict(
+                [('level', 'INFO'), ('handlers', ' '.join(handler_names))])
+            for name in handler_names:
+                sections['handler_{0}'.format(name)] = OrderedDict([
+                    ('class', 'NullHandler'), ('args', '()'),
+                    ('level', 'NOTSET'), ('formatter', 'generic')])
+            sections['formatter_generic'] = OrderedDict(
+                [('format', '%(asctime)s %(levelname)s %(message)s')])
+        return sections
+
+    def ini(self):
+        lines = []
+        for name, options in self.ini_sections().items():
+            lines.append('[{0}]'.format(name))
+            lines.extend('{0} = {1}'.format(key, value) for key, value in options.items())
+            lines.append('')
+        return '\n'.join(lines)
+
+    def msf(self):
+        """Returns the equivalent Montague Standard Format dict."""
+        application = OrderedDict()
+        filters = OrderedDict()
+        for index in range(self.sections):
+            app = application['app_{0}'.format(index)] = OrderedDict([('use', APP)])
+            app.update(self._options(index, False))
+        main = OrderedDict([('use', COMPOSITE)])
+        for index in range(self.fanout):
+            main['/app_{0}'.format(index)] = 'app_{0}'.format(index)
+        # The pipeline as the INI loader expands it: the app is wrapped by the
+        # last filter, which is wrapped by the one before, and so on.
+        piped = application['piped'] = OrderedDict([('use', 'app_0')])
+        for n in range(self.pipeline_depth):
+            name = 'pipe_{0}'.format(n)
+            filters[name] = OrderedDict([('use', FILTER)])
+        previous = piped
+        for n in reversed(range(self.pipeline_depth)):
+            name = 'pipe_{0}'.format(n)
+            previous['filter-with'] = name
+            previous = filters[name]
+        for n in range(self.pipeline_depth):
+            chain = filters['chain_{0}'.format(n)] = OrderedDict([('use', FILTER)])
+            if n + 1 < self.pipeline_depth:
+                chain['filter-with'] = 'chain_{0}'.format(n + 1)
+        for n in range(self.filter_app_depth):
+            next_app = 'nested_{0}'.format(n + 1) if n + 1 < self.filter_app_depth else 'app_0'
+            filter_name = 'nested_filter_{0}'.format(n)
+            application['nested_{0}'.format(n)] = OrderedDict(
+                [('use', next_app), ('filter-with', filter_name)])
+            filters[filter_name] = OrderedDict([('use', FILTER)])
+        config = OrderedDict([
+            ('globals', OrderedDict([('base', BASE)])),
+            ('application', application),
+            ('composite', OrderedDict([('main', main)])),
+            ('filter', filters),
+            ('server', OrderedDict()),
+            ('logging', OrderedDict()),
+        ])
+        if self.handlers:
+            handler_names = ['h{0}'.format(n) for n in range(self.handlers)]
+            config['logging']['main'] = OrderedDict([
+                ('version', 1),
+                ('root', OrderedDict([('level', 'INFO'), ('handlers', handler_names)])),
+                ('handlers', OrderedDict(
+                    (name, OrderedDict([('class', 'logging.NullHandler'), ('level', 'NOTSET'),
+                                        ('formatter', 'generic')]))
+                    for name in handler_names)),
+                ('formatters', OrderedDict(
+                    [('generic', {'format': '%(asctime)s %(levelname)s %(message)s'})])),
+            ])
+        return config
+
+    def write(self, directory, basename='bench'):
+        """Writes basename.ini and basename.json to directory, returning their paths."""
+        ini_path = os.path.join(directory, basename + '.ini')
+        json_path = os.path.join(directory, basename + '.json')
+        with open(ini_path, 'w') as f:
+            f.write(self.ini())
+        with open(json_path, 'w') as f:
+            json.dump(self.msf(), f, indent=1)
+        return ini_path, json_path
@@ -0,0 +1,81 @@
+"""Compares the throughput of Montague's INI reader with the ConfigParser-based
+reading it replaced, on synthetic configs of increasing size.
+
+Both read every section of the file and interpolate every option, falling
+back to the raw value where interpolation fails::
+
+    python benchmarks/ini_reader.py [--sections 100 1000 10000]
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+here = os.path.dirname(os.path.abspath(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+from six.moves import configparser  # noqa: E402
+from configgen import SyntheticConfig  # noqa: E402
+from montague.iniparser import IniParser  # noqa: E402
+
+
+def read_with_configparser(path):
+    path_defaults = {'here': os.path.dirname(path), '__file__': path}
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    defaults = parser.defaults()
+    data = {}
+    for section in parser.sections():
+        section_data = data[section] = {}
+        for option in parser.options(section):
+            if option in defaults:
+                continue
+            try:
+                section_data[option] = parser.get(section, option, vars=path_defaults)
+            except configparser.InterpolationError:
+                section_data[option] = parser.get(section, option, raw=True)
+    return data
+
+
+def read_with_iniparser(path):
+    path_defaults = {'here': os.path.dirname(path), '__file__': path}
+    parser = IniParser()
+    parser.read(path)
+    defaults = parser.defaults()
+    return dict((section, dict(parser.read_section(section, path_defaults, defaults)))
+                for section in parser.sections())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--options', type=int, default=5)
+    parser.add_argument('--interpolation', type=float, default=0.5,
+                        help='the fraction of options which refer to a default')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    directory = tempfile.mkdtemp(prefix='montague-bench-')
+    try:
+        print('{0:>9} {1:>9} {2:>16} {3:>16} {4:>8}'.format(
+            'sections', 'options', 'ConfigParser/s', 'IniParser/s', 'speedup'))
+        for sections in args.sections:
+            config = SyntheticConfig(sections=sections, options=args.options,
+                                     interpolation=args.interpolation, handlers=0)
+            path = config.write(directory, 'sections_{0}'.format(sections))[0]
+            assert read_with_iniparser(path) == read_with_configparser(path)
+            options = sum(len(s) for s in read_with_iniparser(path).values())
+            old = min(timeit.repeat(lambda: read_with_configparser(path), number=1, repeat=args.repeat))
+            new = min(timeit.repeat(lambda: read_with_iniparser(path), number=1, repeat=args.repeat))
+            print('{0:9d} {1:9d} {2:16.0f} {3:16.0f} {4:7.1f}x'.format(
+                sections, options, options / old, options / new, old / new))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
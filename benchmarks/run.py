@@ -0,0 +1,162 @@
+"""Times Montague's loader paths on synthetic configs of increasing size, and
+checks that they scale roughly linearly.
+
+Each dimension of the generated config (see configgen) is scaled in turn,
+with the others held at their defaults, and the operations it affects are
+timed at each size. The scaling exponent is the slope of log(time) against
+log(size) between the smallest and largest sizes; anything above
+--max-exponent is reported, and makes the run exit with status 1.
+
+Run it from a checkout with Montague installed::
+
+    python benchmarks/run.py [--quick] [--json]
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from collections import OrderedDict
+
+here = os.path.dirname(os.path.abspath(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+from configgen import SyntheticConfig  # noqa: E402
+from montague.cache import config_cache  # noqa: E402
+from montague.ini import IniConfigLoader  # noqa: E402
+from montague.loadwsgi import Loader  # noqa: E402
+from montague.testjson import JSONConfigLoader  # noqa: E402
+
+
+def _operations(ini_path, json_path):
+    """Returns {operation name: callable}. Loader operations reuse one Loader,
+       so they time loading rather than parsing."""
+    loader = Loader(ini_path)
+    return OrderedDict([
+        ('IniConfigLoader', lambda: IniConfigLoader(ini_path)),
+        ('IniConfigLoader lazy', lambda: IniConfigLoader(ini_path, lazy=True).app_config('app_0')),
+        ('JSONConfigLoader.config', lambda: JSONConfigLoader(json_path).config()),
+        ('load_app composite', lambda: loader.load_app('main')),
+        ('load_app pipeline', lambda: loader.load_app('piped')),
+        ('load_app filter-app', lambda: loader.load_app('nested_0')),
+        ('load_filter', lambda: loader.load_filter('chain_0')),
+        ('logging_config', lambda: IniConfigLoader(ini_path, lazy=True).logging_config('main')),
+    ])
+
+
+# dimension: (sizes, operations affected)
+DIMENSIONS = OrderedDict([
+    ('sections', ([50, 100, 200, 400],
+                  ['IniConfigLoader', 'IniConfigLoader lazy', 'JSONConfigLoader.config'])),
+    ('options', ([5, 10, 20, 40], ['IniConfigLoader', 'JSONConfigLoader.config'])),
+    ('interpolation', ([0.25, 0.5, 1.0], ['IniConfigLoader'])),
+    ('fanout', ([10, 20, 40, 80], ['load_app composite'])),
+    ('pipeline_depth', ([10, 20, 40, 80], ['IniConfigLoader', 'load_app pipeline', 'load_filter'])),
+    ('filter_app_depth', ([10, 20, 40, 80], ['IniConfigLoader', 'load_app filter-app'])),
+    ('handlers', ([5, 10, 20, 40], ['logging_config'])),
+])
+
+QUICK_SIZES = 2  # with --quick, only the first two sizes of each dimension
+
+
+def measure(func, repeat=3, min_time=0.05):
+    """Returns the best time per call, in seconds, over repeat runs of at
+       least min_time each."""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        best = min(best, timeit.timeit(func, number=number) / number)
+    return best
+
+
+def exponent(sizes, times):
+    """The slope of log(time) against log(size) between the ends of a series."""
+    if sizes[0] == sizes[-1] or times[0] <= 0:
+        return 0.0
+    return math.log(times[-1] / times[0]) / math.log(float(sizes[-1]) / sizes[0])
+
+
+def run(dimensions=DIMENSIONS, quick=False, repeat=3, min_time=0.05, directory=None):
+    """Returns a list of result dicts: dimension, operation, sizes, times (in
+       seconds, per call) and exponent."""
+    cleanup = directory is None
+    directory = directory or tempfile.mkdtemp(prefix='montague-bench-')
+    results = []
+    try:
+        for dimension, (sizes, operations) in dimensions.items():
+            if quick:
+                sizes = sizes[:QUICK_SIZES]
+            times = OrderedDict((operation, []) for operation in operations)
+            for size in sizes:
+                params = {dimension: size}
+                if dimension == 'fanout':
+                    params['sections'] = size
+                config = SyntheticConfig(**params)
+                basename = '{0}_{1}'.format(dimension, size).replace('.', '_')
+                ini_path, json_path = config.write(directory, basename)
+                available = _operations(ini_path, json_path)
+                for operation in operations:
+                    times[operation].append(measure(available[operation], repeat, min_time))
+                config_cache.clear()
+            for operation, series in times.items():
+                results.append({
+                    'dimension': dimension,
+                    'operation': operation,
+                    'sizes': list(sizes),
+                    'times': series,
+                    'exponent': exponent(sizes, series),
+                })
+    finally:
+        if cleanup:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def report(results, max_exponent):
+    print('{0:<18} {1:<26} {2:>60}  {3:>8}'.format(
+        'dimension', 'operation', 'time per call (ms) at each size', 'exponent'))
+    for result in results:
+        timings = '  '.join('{0}: {1:.3f}'.format(size, time * 1000)
+                            for size, time in zip(result['sizes'], result['times']))
+        flag = '' if result['exponent'] <= max_exponent else '  SUPERLINEAR'
+        print('{0:<18} {1:<26} {2:>60}  {3:8.2f}{4}'.format(
+            result['dimension'], result['operation'], timings, result['exponent'], flag))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='only time the two smallest sizes of each dimension')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-exponent', type=float, default=1.3,
+                        help='the largest acceptable scaling exponent (default: 1.3)')
+    parser.add_argument('--dimension', action='append', choices=list(DIMENSIONS),
+                        help='only scale this dimension (may be repeated)')
+    args = parser.parse_args(argv)
+    dimensions = DIMENSIONS
+    if args.dimension:
+        dimensions = OrderedDict((d, DIMENSIONS[d]) for d in args.dimension)
+    results = run(dimensions, quick=args.quick, repeat=args.repeat)
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        report(results, args.max_exponent)
+    superlinear = [r for r in results if r['exponent'] > args.max_exponent]
+    return 1 if superlinear else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -65,6 +65,12 @@ setup(
         # eg: 'rst': ["docutils>=0.11"],
     },
     entry_points={
+        'console_scripts': [
+            'montague = montague.cli:main',
+        ],
+        'paste.composite_factory': [
+            'urlmap = montague.urlmap:urlmap_factory',
+        ],
     }
 
 )
@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 
 from .loadwsgi import Loader
+from .cache import config_cache
 
 __version__ = "0.2.1"
 
+__all__ = ['Loader', 'config_cache', 'load_app', 'load_server', 'load_filter',
+           'load_logging_config', 'apply_logging_config']
+
 
 def load_app(config_path, name=None):
     loader = Loader(config_path)
@@ -21,5 +25,13 @@ def load_filter(config_path, name=None):
 
 
 def load_logging_config(config_path, name=None):
+    """For queue logging, use Loader.logging_config(queue=True) instead: the
+       Loader owns the listener, stops it around forks (Loader.fork_hooks)
+       and has to be closed (Loader.close())."""
     loader = Loader(config_path)
     return loader.logging_config(name)
+
+
+def apply_logging_config(config_path, name=None):
+    loader = Loader(config_path)
+    return loader.apply_logging_config(name)
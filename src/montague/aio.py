@@ -0,0 +1,71 @@
+"""Loading apps, filters and servers from asyncio code. Requires Python 3.5+.
+
+Factories may be coroutine functions, in which case they're awaited on the
+event loop; other factories are run in the loop's default executor, so slow
+factories don't block it. The factories of a chain (an app and its filters)
+are called concurrently, then composed in order as usual.
+
+Composite factories can use the helper's get_app_async() to load their
+children concurrently, say with asyncio.gather()."""
+from __future__ import absolute_import
+
+import asyncio
+from .structs import compose
+
+
+def is_async_factory(factory):
+    """Whether factory (or the factory a Montague adapter wraps) is a
+       coroutine function."""
+    return asyncio.iscoroutinefunction(getattr(factory, '__wrapped__', factory))
+
+
+async def call_factory(loadable):
+    if is_async_factory(loadable.factory):
+        return await loadable._call_factory()
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, loadable._call_factory)
+
+
+async def get(loadable, layer_timings=None):
+    """The async equivalent of Loadable.get(), without a registry."""
+    chain = loadable.chain()
+    loaded = await asyncio.gather(*[call_factory(node) for node in chain])
+    return compose(list(loaded), chain[-1].is_app, layer_timings,
+                   [node.layer_name() for node in chain])
+
+
+async def _get(loader, loadable, label):
+    # Instances are shared per chain, not per factory call as in Loader._get.
+    registry = loader.registry
+    if registry is None or any(node.name in loader.unshared for node in loadable.chain()):
+        return await get(loadable, loader.layer_timings)
+    key = loader._chain_key(loadable)
+    if key in registry:
+        return registry.get_or_create(key, None, label=label)
+    instance = await get(loadable, loader.layer_timings)
+    # If something else built the same chain in the meantime, use theirs.
+    return registry.get_or_create(key, lambda: instance, label=label)
+
+
+async def lazy_app_async(loader, name):
+    """For composites loading a Loader's lazy_children; nothing to await."""
+    return loader.lazy_app(name)
+
+
+async def load_app_async(loader, name=None):
+    loadable = loader._load_app(name, asynchronous=True)
+    app = await _get(loader, loadable.normalize(), ('app', name or 'main'))
+    if loadable.warmup is not None:
+        # Warmup requests are plain WSGI calls, so they're kept off the loop.
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, loader._warm_up, app, loadable.warmup, name)
+    return app
+
+
+async def load_filter_async(loader, name=None):
+    loadable = loader._load_filter(name, asynchronous=True).normalize()
+    return await _get(loader, loadable, ('filter', name or 'main'))
+
+
+async def load_server_async(loader, name=None):
+    return await call_factory(loader._load_server(name, asynchronous=True))
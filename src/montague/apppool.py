@@ -0,0 +1,190 @@
+"""A bounded pool of the child apps a composite has loaded lazily.
+
+Give a Loader an AppPool (Loader(path, app_pool=AppPool(...))) and its lazy
+children (see montague.lazyapp) are tracked in least recently used order.
+Children are evicted once they've been idle for max_idle seconds, once there
+are more than max_apps of them, or once their approximate total size passes
+memory_budget bytes. An evicted child is closed, and is loaded again the next
+time a request reaches it. Children with requests in flight are never evicted."""
+from __future__ import absolute_import
+
+import gc
+import logging
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+_clock = getattr(time, 'monotonic', time.time)
+
+IDLE, COUNT, MEMORY = 'idle', 'count', 'memory'
+
+# Shared by everything, so not counted towards any one app's size.
+_SKIPPED_TYPES = (type, types.ModuleType)
+
+
+def approximate_size(obj, limit=100000):
+    """Returns the approximate size in bytes of obj and everything it refers
+       to, not counting classes, modules or the globals of functions. Stops
+       after limit objects."""
+    seen = set()
+    pending = [obj]
+    size = 0
+    while pending and len(seen) < limit:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj, 0)
+        if isinstance(obj, types.FunctionType):
+            pending.extend(r for r in (obj.__closure__, obj.__defaults__, obj.__dict__)
+                           if r is not None)
+        else:
+            pending.extend(gc.get_referents(obj))
+    return size
+
+
+class AppPool(object):
+    """Tracks loaded lazy apps and evicts them; see the module docs. size_of
+       estimates an app's size when memory_budget is set. Callables
+       registered with register_close_hook() are called with the name and
+       app of each evicted app, after its own close() method (if any).
+
+       The counters loads, rebuilds (loads of previously evicted apps) and
+       evictions (by reason: 'idle', 'count' or 'memory') are available
+       from stats()."""
+
+    def __init__(self, max_apps=None, max_idle=None, memory_budget=None,
+                 size_of=approximate_size, clock=_clock):
+        self.max_apps = max_apps
+        self.max_idle = max_idle
+        self.memory_budget = memory_budget
+        self.size_of = size_of
+        self.clock = clock
+        self.loads = 0
+        self.rebuilds = 0
+        self.evictions = {IDLE: 0, COUNT: 0, MEMORY: 0}
+        self.close_hooks = []
+        # LazyApp -> time last used, least recently used first
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._evicted = set()
+        self._next_sweep = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def register_close_hook(self, hook):
+        self.close_hooks.append(hook)
+        return hook
+
+    def loaded(self, lazy_app, app):
+        """Called by a LazyApp when it has loaded its app."""
+        size = self.size_of(app) if self.memory_budget is not None else 0
+        with self._lock:
+            self.loads += 1
+            if lazy_app in self._evicted:
+                self._evicted.discard(lazy_app)
+                self.rebuilds += 1
+            self._entries.pop(lazy_app, None)
+            self._entries[lazy_app] = self.clock()
+            self._bytes += size - self._sizes.get(lazy_app, 0)
+            self._sizes[lazy_app] = size
+            evicted = self._evict(keep=lazy_app)
+        self._close(evicted)
+
+    def touch(self, lazy_app):
+        """Called by a LazyApp for each request; marks it as recently used."""
+        now = self.clock()
+        evicted = ()
+        with self._lock:
+            if lazy_app in self._entries:
+                del self._entries[lazy_app]
+                self._entries[lazy_app] = now
+            if self._next_sweep is not None and now >= self._next_sweep:
+                evicted = self._evict(keep=lazy_app)
+        self._close(evicted)
+
+    def sweep(self):
+        """Evicts whatever is over the limits now, returning how many were
+           evicted. Idle apps are also swept up as requests come in, but call
+           this (say, from a timer) if traffic may stop altogether."""
+        with self._lock:
+            evicted = self._evict()
+        self._close(evicted)
+        return len(evicted)
+
+    def _evict(self, keep=None):
+        # Called with the lock held; returns [(lazy_app, app)] to be closed.
+        now = self.clock()
+        evicted = []
+
+        def evict(lazy_app, reason):
+            app = lazy_app.unload()
+            if app is None:
+                return False  # busy, or already gone
+            del self._entries[lazy_app]
+            self._bytes -= self._sizes.pop(lazy_app, 0)
+            self._evicted.add(lazy_app)
+            self.evictions[reason] += 1
+            evicted.append((lazy_app, app))
+            return True
+
+        if self.max_idle is not None:
+            stuck = set()  # idle, but busy or being kept
+            for lazy_app, last_used in list(self._entries.items()):
+                if now - last_used < self.max_idle:
+                    break  # the rest were used more recently
+                if lazy_app is keep or not evict(lazy_app, IDLE):
+                    stuck.add(lazy_app)
+            # No need to look again until the oldest app which could be
+            # evicted could have gone idle; the stuck ones are tried again
+            # after another max_idle, rather than on every request.
+            oldest = next((last_used for lazy_app, last_used in self._entries.items()
+                           if lazy_app not in stuck), None)
+            self._next_sweep = (oldest if oldest is not None else now) + self.max_idle
+        for reason, over in ((COUNT, self._over_count), (MEMORY, self._over_budget)):
+            candidates = iter([lazy_app for lazy_app in self._entries if lazy_app is not keep])
+            while over():
+                lazy_app = next(candidates, None)
+                if lazy_app is None:
+                    break
+                evict(lazy_app, reason)
+        return evicted
+
+    def _over_count(self):
+        return self.max_apps is not None and len(self._entries) > self.max_apps
+
+    def _over_budget(self):
+        return self.memory_budget is not None and self._bytes > self.memory_budget
+
+    def _close(self, evicted):
+        for lazy_app, app in evicted:
+            log.debug("Evicted %s", lazy_app.name)
+            close = getattr(app, 'close', None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    log.exception("Error closing %s", lazy_app.name)
+            for hook in self.close_hooks:
+                try:
+                    hook(lazy_app.name, app)
+                except Exception:
+                    log.exception("Error in close hook for %s", lazy_app.name)
+
+    def stats(self):
+        """Returns the pool's counters and current size, as a dict."""
+        with self._lock:
+            return {
+                'apps': len(self._entries),
+                'bytes': self._bytes,
+                'loads': self.loads,
+                'rebuilds': self.rebuilds,
+                'evictions': dict(self.evictions),
+            }
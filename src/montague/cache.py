@@ -0,0 +1,247 @@
+from __future__ import absolute_import
+
+import hashlib
+import marshal
+import os
+import os.path
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+import six
+
+# os.replace is atomic on all platforms, but only exists on Python 3.3+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def file_identity(path):
+    """Returns a tuple identifying a particular version of the file at path,
+       or None if the path does not refer to a file we can stat (config loaders
+       are allowed to use paths which don't exist on disk)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    mtime = getattr(st, 'st_mtime_ns', st.st_mtime)
+    return (os.path.abspath(path), st.st_dev, st.st_ino, st.st_size, mtime)
+
+
+class ConfigLoaderCache(object):
+    """A process-wide cache of config loaders, so that loading the app,
+       server and logging config from the same file only parses it once.
+
+       Entries are keyed by the resolved path plus the file's identity
+       (device, inode, size and mtime), so an edited file is parsed afresh.
+       The least recently used entries are evicted once maxsize is reached."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path, factory, variant=()):
+        """Returns the config loader for path, calling factory(path) to create
+           it if there isn't a cached loader for the current version of the file.
+           variant is folded into the cache key, so loaders constructed with
+           different options don't collide."""
+        identity = file_identity(path)
+        if identity is None:
+            return factory(path)
+        key = identity + tuple(variant)
+        with self._lock:
+            config_loader = self._entries.pop(key, None)
+            if config_loader is not None:
+                self._entries[key] = config_loader
+                self.hits += 1
+                return config_loader
+            self.misses += 1
+        config_loader = factory(path)
+        with self._lock:
+            # Any older version of this file is now stale.
+            self._discard(identity[0])
+            self._entries[key] = config_loader
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return config_loader
+
+    def _discard(self, abspath):
+        for key in [k for k in self._entries if k[0] == abspath]:
+            del self._entries[key]
+
+    def invalidate(self, path):
+        """Drop any cached config loaders for path."""
+        with self._lock:
+            self._discard(os.path.abspath(path))
+
+    def clear(self):
+        """Drop all cached config loaders and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+config_cache = ConfigLoaderCache()
+
+
+class FactoryCache(object):
+    """A process-wide cache of resolved factories, keyed by (scheme, resource,
+       factory groups), so a factory referenced by many sections, or by many
+       Loaders, is only looked up, imported and adapted once."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, resolve):
+        """Returns the cached value for key, calling resolve() to produce it
+           if necessary. Exceptions from resolve() are not cached."""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+        value = resolve()
+        with self._lock:
+            self.misses += 1
+            # If another thread got there first, everybody uses its value.
+            return self._entries.setdefault(key, value)
+
+    def discard_scheme(self, scheme):
+        """Forget the factories resolved for one scheme, such as 'egg'."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == scheme]:
+                del self._entries[key]
+
+    def reset(self):
+        """Forget all resolved factories and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+factory_cache = FactoryCache()
+
+
+COMPILED_CACHE_SUFFIX = '.montague-cache'
+
+# Changes whenever the format of the cache file does.
+COMPILED_CACHE_FORMAT = b'marshal-1'
+
+# Stands in for OrderedDicts, which marshal doesn't support.
+_ORDERED_DICT = '__montague_ordered_dict__'
+
+_SCALARS = six.string_types + (six.binary_type, bool, float, type(None)) + six.integer_types
+
+
+def compiled_cache_path(path):
+    """Returns the path of the compiled config cache for the config file at path.
+       It lives next to the config file, as a hidden file."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, '.{0}{1}'.format(filename, COMPILED_CACHE_SUFFIX))
+
+
+def _source_digest(path):
+    from . import __version__
+    digest = hashlib.sha1(__version__.encode('ascii'))
+    digest.update(COMPILED_CACHE_FORMAT)
+    # The config holds here, __file__ and whatever was interpolated from
+    # them, so a copy of the file elsewhere mustn't use this one's cache.
+    abspath = os.path.abspath(path)
+    if isinstance(abspath, six.text_type):
+        abspath = abspath.encode('utf-8', 'surrogateescape' if six.PY3 else 'strict')
+    digest.update(abspath)
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest().encode('ascii')
+
+
+def _encode(value):
+    # The cache holds plain data only, so loading it can't run code.
+    if isinstance(value, OrderedDict):
+        return (_ORDERED_DICT, [(_encode(k), _encode(v)) for k, v in six.iteritems(value)])
+    if type(value) is dict:
+        return dict((_encode(k), _encode(v)) for k, v in six.iteritems(value))
+    if type(value) in (list, tuple):
+        return type(value)(_encode(v) for v in value)
+    if isinstance(value, _SCALARS):
+        return value
+    raise TypeError("Can't cache a {0}".format(type(value).__name__))
+
+
+def _decode(value):
+    if type(value) is tuple:
+        if len(value) == 2 and value[0] == _ORDERED_DICT:
+            return OrderedDict((_decode(k), _decode(v)) for k, v in value[1])
+        return tuple(_decode(v) for v in value)
+    if type(value) is dict:
+        return dict((_decode(k), _decode(v)) for k, v in six.iteritems(value))
+    if type(value) is list:
+        return [_decode(v) for v in value]
+    return value
+
+
+def _trusted(f):
+    # Only a file this user wrote, and nobody else can change, is trusted.
+    st = os.fstat(f.fileno())
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        return False
+    return not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def load_compiled_config(path):
+    """Returns a (digest, config) tuple for the config file at path. config is the
+       Montague Standard Format dict from the compiled cache, or None if there is
+       no cache, it was compiled from a different version of the file (or of
+       Montague) or from a file at another path, or it isn't owned by this user or is writable by
+       anybody else. Pass the digest to store_compiled_config()."""
+    digest = _source_digest(path)
+    try:
+        with open(compiled_cache_path(path), 'rb') as f:
+            if not _trusted(f) or f.readline().rstrip(b'\n') != digest:
+                return digest, None
+            return digest, _decode(marshal.loads(f.read()))
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return digest, None
+
+
+def store_compiled_config(path, digest, config):
+    """Writes config to the compiled cache for path, atomically, so concurrent
+       readers see either the old cache or the new one. Returns False if the
+       config isn't plain data (logging args may refer to arbitrary objects)
+       or the cache can't be written."""
+    try:
+        data = marshal.dumps(_encode(config))
+    except (TypeError, ValueError):
+        return False
+    cache_path = compiled_cache_path(path)
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path), prefix=os.path.basename(cache_path))
+    except (IOError, OSError):
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(digest + b'\n')
+            f.write(data)
+        _replace(temp_path, cache_path)
+    except (IOError, OSError):
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        return False
+    return True
@@ -0,0 +1,50 @@
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import sys
+from .profiler import KINDS, profile, format_tree
+
+
+def _profile_command(args):
+    profiler = profile(args.config, kind=args.kind, name=args.name, lazy=args.lazy)
+    if args.json:
+        json.dump(profiler.root.as_dict(), sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print('{0:>10} {1:>10}  {2}'.format('total ms', 'self ms', 'phase'))
+        for line in format_tree(profiler.root):
+            print(line)
+    return 0
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='montague')
+    subparsers = parser.add_subparsers(dest='command')
+
+    profile_parser = subparsers.add_parser(
+        'profile', help='show where the time goes when loading from a config file')
+    profile_parser.add_argument('config', help='path to the config file')
+    profile_parser.add_argument('--kind', choices=KINDS, default='app',
+                                help='what to load (default: app)')
+    profile_parser.add_argument('--name', default=None,
+                                help='the section to load (default: main)')
+    profile_parser.add_argument('--lazy', action='store_true',
+                                help='use the lazy INI loader')
+    profile_parser.add_argument('--json', action='store_true',
+                                help='print the phase tree as JSON')
+    profile_parser.set_defaults(func=_profile_command)
+    return parser
+
+
+def main(argv=None):
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'func', None) is None:
+        parser.print_help()
+        return 2
+    return args.func(args)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,115 @@
+from __future__ import absolute_import
+
+import re
+import threading
+import six
+from .cache import factory_cache
+from .structs import loadable_type_entry_points, async_loadable_type_entry_points
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # pragma: no cover
+    importlib_metadata = None
+
+CONFIG_LOADER_GROUP = 'montague.config_loader'
+
+
+def normalize_name(name):
+    """Normalizes a distribution name the way PEP 503 does, so that
+       'montague_testapps' and 'Montague-TestApps' find the same thing."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _importlib_distributions():
+    for dist in importlib_metadata.distributions():
+        name = dist.metadata['Name']
+        if not name:
+            # broken or partially-installed distribution
+            continue
+        entry_map = {}
+        for ep in dist.entry_points:
+            entry_map.setdefault(ep.group, {})[ep.name] = ep
+        yield name, entry_map
+
+
+def _pkg_resources_distributions(working_set):
+    for dist in working_set:
+        yield dist.project_name, dist.get_entry_map()
+
+
+def _iter_distributions():
+    """Yields (project name, {group: {name: entry point}}) for each installed
+       distribution, in sys.path order."""
+    if importlib_metadata is None:  # pragma: no cover
+        import pkg_resources
+        return _pkg_resources_distributions(pkg_resources.working_set)
+    return _importlib_distributions()
+
+
+class EntryPointIndex(object):
+    """An index of the entry points Montague cares about. Scanning every
+       installed distribution is expensive, so it's only done once, the first
+       time the index is consulted; after that, lookups are dict lookups.
+
+       Call invalidate() if distributions are installed or removed at runtime."""
+
+    def __init__(self, groups):
+        self.groups = frozenset(groups)
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _build(self):
+        by_group = {}
+        by_dist = {}
+        for dist_name, entry_map in _iter_distributions():
+            dist_key = normalize_name(dist_name)
+            if dist_key in by_dist:
+                # shadowed by an earlier entry on sys.path
+                continue
+            dist_map = by_dist[dist_key] = {}
+            for group, group_map in six.iteritems(entry_map):
+                if group not in self.groups:
+                    continue
+                dist_map[group] = dict(group_map)
+                for name, ep in six.iteritems(group_map):
+                    by_group.setdefault((group, name), []).append(ep)
+        return by_group, by_dist
+
+    def _get_index(self):
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build()
+                index = self._index
+        return index
+
+    def get(self, group, name):
+        """Returns a tuple of all entry points named name in group."""
+        by_group, _ = self._get_index()
+        return tuple(by_group.get((group, name), ()))
+
+    def get_entry_map(self, dist_name):
+        """Returns {group: {name: entry point}} for the given distribution,
+           restricted to the indexed groups. Unknown distributions get an empty map."""
+        _, by_dist = self._get_index()
+        return by_dist.get(normalize_name(dist_name), {})
+
+    def invalidate(self):
+        """Re-index on next use, say after installing or removing a
+           distribution. Factories resolved from egg: entry points are
+           forgotten too."""
+        with self._lock:
+            self._index = None
+        factory_cache.discard_scheme('egg')
+
+
+def _indexed_groups():
+    groups = set([CONFIG_LOADER_GROUP])
+    for entry_points in (loadable_type_entry_points, async_loadable_type_entry_points):
+        for group_list in six.itervalues(entry_points):
+            groups.update(group_list)
+    return groups
+
+
+entry_point_index = EntryPointIndex(_indexed_groups())
@@ -5,3 +5,9 @@ class ConfigNotFound(LookupError):
     """Raise this exception to signal that a requested config item
        was not found in the config."""
     pass
+
+
+class CyclicConfigReference(ValueError):
+    """Raised when config sections refer to each other in a cycle, such as
+       an app which uses, or is filtered with, something that leads back to it."""
+    pass
@@ -0,0 +1,144 @@
+from __future__ import absolute_import
+
+import six
+from .exceptions import CyclicConfigReference
+
+# Edge kinds. 'use' and 'filter-with' edges are resolved into a single chain
+# of Loadables; 'child' edges are composites asking the Loader for other apps,
+# which have to be constructed before the composite itself.
+USE = 'use'
+FILTER_WITH = 'filter-with'
+CHILD = 'child'
+
+
+def _section_config(loader, node):
+    kind, name = node
+    if kind == 'app':
+        return loader.app_config(name)
+    return loader.filter_config(name)
+
+
+def _is_app_section(loader, value):
+    if not isinstance(value, six.string_types) or not value or ':' in value or value.split() != [value]:
+        return False
+    try:
+        loader.app_config(value)
+    except LookupError:
+        return False
+    return True
+
+
+def _edges(loader, node):
+    kind, name = node
+    if name is not None and ':' in name:
+        # a factory rather than a section
+        return []
+    section = _section_config(loader, node)
+    edges = []
+    use = section.config.get('use', '')
+    if ':' not in use:
+        edges.append((USE, (kind, use)))
+    filter_with = section.config.get('filter-with')
+    if filter_with is not None:
+        edges.append((FILTER_WITH, ('filter', filter_with)))
+    if section.loadable_type == 'composite':
+        # Composite factories look their children up by name at construction
+        # time, so treat any value which names an app section as a child.
+        for key, value in sorted(six.iteritems(section.config)):
+            if key not in ('use', 'filter-with') and _is_app_section(loader, value):
+                edges.append((CHILD, ('app', value)))
+    return edges
+
+
+def build_graph(loader, kind='app', name=None):
+    """Returns {node: [(edge kind, node), ...]} for the app (or filter, if kind
+       is 'filter') called name and everything it refers to. Nodes are
+       ('app', name) or ('filter', name) tuples. Raises CyclicConfigReference
+       if the references form a cycle."""
+    root = (kind, name or 'main')
+    graph = {}
+    # Iterative depth-first search, tracking the current path to spot cycles.
+    path = [root]
+    on_path = set([root])
+    graph[root] = _edges(loader, root)
+    iterators = [iter(graph[root])]
+    while iterators:
+        try:
+            _, target = next(iterators[-1])
+        except StopIteration:
+            iterators.pop()
+            on_path.discard(path.pop())
+            continue
+        if target in on_path:
+            cycle = path[path.index(target):] + [target]
+            raise CyclicConfigReference(
+                "Config references form a cycle: {0}".format(
+                    ' -> '.join('{0}:{1}'.format(*node) for node in cycle)))
+        if target in graph:
+            continue
+        graph[target] = _edges(loader, target)
+        path.append(target)
+        on_path.add(target)
+        iterators.append(iter(graph[target]))
+    return graph
+
+
+def construction_dependencies(graph, root):
+    """Collapses the 'use' and 'filter-with' edges of graph, returning
+       {app node: set(app nodes which must be constructed first)} for root and
+       every app reachable from it through composites."""
+    units = {}
+    pending = [root]
+    while pending:
+        unit = pending.pop()
+        if unit in units:
+            continue
+        children = units[unit] = set()
+        seen = set([unit])
+        stack = [unit]
+        while stack:
+            node = stack.pop()
+            for edge, target in graph.get(node, ()):
+                if edge == CHILD:
+                    children.add(target)
+                    pending.append(target)
+                elif target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+    return units
+
+
+def load_app_parallel(loader, name=None, max_workers=4):
+    """Loads the app called name, constructing independent apps (the children
+       of composites) concurrently on a pool of max_workers threads, and each
+       composite once all of its children are ready. Without
+       concurrent.futures (on Python 2, without the futures backport), the
+       app is loaded serially instead."""
+    try:
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    except ImportError:
+        return loader.load_app(name)
+
+    root = ('app', name or 'main')
+    graph = build_graph(loader, 'app', name)
+    remaining = construction_dependencies(graph, root)
+    done = set()
+    results = {}
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while remaining or running:
+                for unit, dependencies in list(remaining.items()):
+                    if dependencies <= done:
+                        del remaining[unit]
+                        running[executor.submit(loader._load_and_keep, unit[1], unit != root)] = unit
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    unit = running.pop(future)
+                    results[unit] = future.result()
+                    done.add(unit)
+    finally:
+        # Children are handed to every composite which asks for them during
+        # this load, and are of no further use after it
+        loader._prebuilt.clear()
+    return results[root]
@@ -1,11 +1,15 @@
 from __future__ import absolute_import
 
-from six.moves.configparser import SafeConfigParser, InterpolationError
 from characteristic import attributes
+from .iniparser import IniParser
 from .structs import LoadableConfig
+from .warmup import WARMUP_KEYS
+from .cache import load_compiled_config, store_compiled_config
 from .logging import convert_loggers, convert_handlers, convert_formatters, combine
+from collections import OrderedDict
 import six
 import os.path
+import re
 
 SCHEMEMAP = {
     'application': 'application',
@@ -21,96 +25,217 @@ SCHEMEMAP = {
 LOGGING_SECTIONS = ('loggers', 'handlers', 'formatters')
 MSF_KEYS = ('globals', 'application', 'composite', 'filter', 'server', 'logging')
 
+FILTER_APP_FILTER_NAME = '_montague_filter_{0}'
+FILTER_APP_FILTER_RE = re.compile(r'^_montague_filter_(\d+)$')
+PIPELINE_FILTER_NAME = '_montague_pipeline_{0}_filter_{1}'
+PIPELINE_FILTER_RE = re.compile(r'^_montague_pipeline_(.+)_filter_\d+$')
+
 
 @attributes(['path'], apply_with_init=False, apply_immutable=True)
 class IniConfigLoader(object):
     """This config loader transforms a traditional INI file into
        a Montague Standard Format dictionary. It is compatible with
-       most but not all PasteDeploy files."""
+       most but not all PasteDeploy files.
+
+       In lazy mode, sections are only interpolated when app_config(),
+       server_config(), filter_config() or logging_config() asks for them,
+       and the full MSF dictionary is only built if config() is called.
+
+       With compiled_cache, the MSF dictionary is saved next to the INI file
+       and reused for as long as the file (and Montague) is unchanged."""
 
-    def __init__(self, path):
+    def __init__(self, path, lazy=False, compiled_cache=False):
         self.path = path
-        self._data = self._read()
-        self._config = self._process()
+        self.lazy = lazy
+        self.compiled_cache = compiled_cache
+        if compiled_cache:
+            self._digest, self._config = load_compiled_config(path)
+            if self._config is not None:
+                # Everything's already processed; there's nothing to be lazy about.
+                self.lazy = False
+                return
+        self._parse()
+        if lazy:
+            self._sections = {}
+            self._section_index = self._index_sections()
+            self._logging = None
+            self._config = None
+        else:
+            self._data = self._read()
+            self._config = self._process()
+            if compiled_cache:
+                store_compiled_config(path, self._digest, self._config)
 
-    def _read(self):
+    def _parse(self):
         # We need to keep the parser around so the logging conversion can use it.
-        path_defaults = {
+        self._path_defaults = {
             'here': os.path.dirname(self.path),
             '__file__': self.path,
         }
-        self._parser = SafeConfigParser()
+        self._parser = IniParser()
         self._parser.read(self.path)
         self._globals = self._parser.defaults()
-        data = {}
+        self._merged_globals = None
+
+    def _read_section(self, section):
+        return dict(self._parser.read_section(
+            section, vars=self._path_defaults, exclude=self._globals))
+
+    def _read(self):
+        data = OrderedDict()
         for section in self._parser.sections():
-            section_data = data.setdefault(section, {})
-            for option in self._parser.options(section):
-                if option in self._globals:
-                    continue
-                try:
-                    section_data[option] = self._parser.get(section, option, vars=path_defaults)
-                except InterpolationError:
-                    section_data[option] = self._parser.get(section, option, raw=True)
+            data[section] = self._read_section(section)
         return data
 
+    def _global_config(self):
+        # Built once and shared by every section; Loadables layer over it
+        # rather than changing it.
+        if self._merged_globals is None:
+            global_config = dict(self._path_defaults)
+            global_config.update(self._globals)
+            self._merged_globals = global_config
+        return self._merged_globals
+
+    @staticmethod
+    def _expand_filter_app(filter_app, filter_name):
+        filter_config = dict(filter_app)
+        use = filter_config.pop('next')
+        return {'use': use, 'filter-with': filter_name}, filter_config
+
+    @staticmethod
+    def _expand_pipeline(name, pipeline):
+        items = pipeline['pipeline'].split()
+        pipeline_app = items[-1]
+        pipeline_filters = items[:-1]
+        pipeline_filters.reverse()
+        app_config = {'use': pipeline_app}
+        # Warmup requests are made of the whole pipeline, so they go with its app
+        for key in WARMUP_KEYS:
+            if key in pipeline:
+                app_config[key] = pipeline[key]
+        filters = {}
+        last_item = app_config
+        for count, use_filter in enumerate(pipeline_filters, start=1):
+            filter_name = PIPELINE_FILTER_NAME.format(name, count)
+            filters[filter_name] = {'use': use_filter}
+            last_item['filter-with'] = filter_name
+            last_item = filters[filter_name]
+        return app_config, filters
+
+    def _has_logging(self):
+        return all([self._parser.has_section(section_name) for section_name in LOGGING_SECTIONS])
+
+    def _convert_logging(self):
+        loggers = convert_loggers(self._parser)
+        handlers = convert_handlers(self._parser)
+        formatters = convert_formatters(self._parser)
+        return combine(loggers, handlers, formatters)
+
     def _process(self):
         orig = self._data
         config = {}
         for key in six.iterkeys(orig):
             if ':' in key:
                 scheme, name = key.split(':', 1)
-                kind_config = config.setdefault(SCHEMEMAP[scheme], {})
+                kind_config = config.setdefault(SCHEMEMAP[scheme], OrderedDict())
                 kind_config[name] = orig[key]
             else:
                 config[key] = orig[key]
-        config['globals'] = {
-            'here': os.path.dirname(self.path),
-            '__file__': self.path,
-        }
-        for key, value in six.iteritems(self._globals):
-            config['globals'][key] = value
+        config['globals'] = self._global_config()
         apps = config.setdefault('application', {})
         filters = config.setdefault('filter', {})
-        generated_filter_count = 0
         filter_apps = config.pop('filter-app', {})
-        for name, filter_app in six.iteritems(filter_apps):
-            use = filter_app.pop('next')
-            generated_filter_count += 1
-            filter_name = '_montague_filter_{0}'.format(generated_filter_count)
-            apps[name] = {'use': use, 'filter-with': filter_name}
-            filters[filter_name] = filter_app
+        for count, (name, filter_app) in enumerate(six.iteritems(filter_apps), start=1):
+            filter_name = FILTER_APP_FILTER_NAME.format(count)
+            apps[name], filters[filter_name] = self._expand_filter_app(filter_app, filter_name)
         pipelines = config.pop('pipeline', {})
         for name, pipeline in six.iteritems(pipelines):
-            items = pipeline['pipeline'].split()
-            pipeline_app = items[-1]
-            pipeline_filters = items[:-1]
-            pipeline_filters.reverse()
-            apps[name] = {'use': pipeline_app}
-            last_item = apps[name]
-            for count, use_filter in enumerate(pipeline_filters, start=1):
-                filter_name = '_montague_pipeline_{0}_filter_{1}'.format(name, count)
-                filters[filter_name] = {'use': use_filter}
-                last_item['filter-with'] = filter_name
-                last_item = filters[filter_name]
-        if all([self._parser.has_section(section_name) for section_name in LOGGING_SECTIONS]):
-            loggers = convert_loggers(self._parser)
-            handlers = convert_handlers(self._parser)
-            formatters = convert_formatters(self._parser)
-
-            config['logging'] = {'main': combine(loggers, handlers, formatters)}
+            apps[name], pipeline_filters = self._expand_pipeline(name, pipeline)
+            filters.update(pipeline_filters)
+        if self._has_logging():
+            config['logging'] = {'main': self._convert_logging()}
 
         for key in MSF_KEYS:
             config.setdefault(key, {})
         return config
 
     def config(self):
+        if self._config is None:
+            # lazy mode; build the whole thing on demand
+            self._data = self._read()
+            self._config = self._process()
+            if self.compiled_cache:
+                store_compiled_config(self.path, self._digest, self._config)
         return self._config
 
+    # Lazy mode support
+
+    def _index_sections(self):
+        # Generated filter names for filter-apps are numbered in file order,
+        # just as _process() numbers them.
+        index = {}
+        self._filter_app_names = []
+        for section in self._parser.sections():
+            if ':' not in section:
+                continue
+            scheme, name = section.split(':', 1)
+            kind = SCHEMEMAP[scheme]
+            index[(kind, name)] = section
+            if kind == 'filter-app':
+                self._filter_app_names.append(name)
+        return index
+
+    def _section(self, kind, name):
+        section = self._section_index.get((kind, name))
+        if section is None:
+            return None
+        if section not in self._sections:
+            self._sections[section] = self._read_section(section)
+        return self._sections[section]
+
+    def _lazy_app_config(self, name):
+        pipeline = self._section('pipeline', name)
+        if pipeline is not None:
+            return LoadableConfig.app, self._expand_pipeline(name, pipeline)[0]
+        filter_app = self._section('filter-app', name)
+        if filter_app is not None:
+            number = self._filter_app_names.index(name) + 1
+            filter_name = FILTER_APP_FILTER_NAME.format(number)
+            return LoadableConfig.app, self._expand_filter_app(filter_app, filter_name)[0]
+        local_config = self._section('application', name)
+        if local_config is not None:
+            return LoadableConfig.app, local_config
+        local_config = self._section('composite', name)
+        if local_config is not None:
+            return LoadableConfig.composite, local_config
+        raise KeyError(name)
+
+    def _lazy_filter_config(self, name):
+        match = FILTER_APP_FILTER_RE.match(name)
+        if match is not None and 0 < int(match.group(1)) <= len(self._filter_app_names):
+            filter_app_name = self._filter_app_names[int(match.group(1)) - 1]
+            filter_app = self._section('filter-app', filter_app_name)
+            return self._expand_filter_app(filter_app, name)[1]
+        match = PIPELINE_FILTER_RE.match(name)
+        if match is not None:
+            pipeline = self._section('pipeline', match.group(1))
+            if pipeline is not None:
+                filters = self._expand_pipeline(match.group(1), pipeline)[1]
+                if name in filters:
+                    return filters[name]
+        local_config = self._section('filter', name)
+        if local_config is None:
+            raise KeyError(name)
+        return local_config
+
     def app_config(self, name):
         # This method isn't actually necessary, since montague can extract
         # the config information from the MSF dict returned by .config()
         # but it's a nice example of how to do it.
+        if self.lazy:
+            constructor, local_config = self._lazy_app_config(name)
+            return constructor(
+                name=name, config=local_config, global_config=self._global_config())
         if name in self._config['application']:
             constructor = LoadableConfig.app
             local_config = self._config['application'][name]
@@ -123,6 +248,12 @@ class IniConfigLoader(object):
             name=name, config=local_config, global_config=self._config['globals'])
 
     def server_config(self, name):
+        if self.lazy:
+            local_config = self._section('server', name)
+            if local_config is None:
+                raise KeyError(name)
+            return LoadableConfig.server(
+                name=name, config=local_config, global_config=self._global_config())
         if name in self._config['server']:
             constructor = LoadableConfig.server
             local_config = self._config['server'][name]
@@ -132,6 +263,10 @@ class IniConfigLoader(object):
             name=name, config=local_config, global_config=self._config['globals'])
 
     def filter_config(self, name):
+        if self.lazy:
+            local_config = self._lazy_filter_config(name)
+            return LoadableConfig.filter(
+                name=name, config=local_config, global_config=self._global_config())
         if name in self._config['filter']:
             constructor = LoadableConfig.filter
             local_config = self._config['filter'][name]
@@ -141,5 +276,10 @@ class IniConfigLoader(object):
             name=name, config=local_config, global_config=self._config['globals'])
 
     def logging_config(self, name):
-        # This is provided by .config(), so no need to implement it here.
-        raise NotImplementedError
+        if not self.lazy:
+            return self._config['logging'][name]
+        if name != 'main' or not self._has_logging():
+            raise KeyError(name)
+        if self._logging is None:
+            self._logging = self._convert_logging()
+        return self._logging
@@ -0,0 +1,420 @@
+from __future__ import absolute_import
+
+import io
+import re
+import six
+from collections import OrderedDict
+from six.moves import configparser
+
+DEFAULT_SECTION = 'DEFAULT'
+MAX_INTERPOLATION_DEPTH = 10
+
+SECTION_RE = re.compile(r'\[(?P<header>.+)\]')
+PY2_SECTION_RE = re.compile(r'\[(?P<header>[^]]+)\]')
+REFERENCE_RE = re.compile(r'%\(([^)]+)\)s')
+COMMENT_PREFIXES = ('#', ';')
+
+# Python 2's ConfigParser quietly lets later options win.
+DuplicateOptionError = getattr(configparser, 'DuplicateOptionError', None)
+
+
+class IniParser(object):
+    """A single-pass INI reader with the same semantics as the standard
+       library's ConfigParser (as PasteDeploy uses it): DEFAULT inheritance,
+       continuation lines, case-insensitive option names and %(name)s
+       interpolation. It also has the parts of the ConfigParser API which
+       Montague's logging conversion uses.
+
+       Errors are the configparser module's own exception types.
+
+       With py2_semantics (the default on Python 2), it follows Python 2's
+       ConfigParser instead: values are native strs, blank and comment lines
+       are skipped even inside values, any indented line continues the
+       value before it, ' ;' starts an inline comment, and repeated sections
+       are merged."""
+
+    py2_semantics = six.PY2
+
+    def __init__(self):
+        self._defaults = OrderedDict()
+        self._sections = OrderedDict()
+        self._templates = {}
+        self._resolvers = {}
+
+    def read(self, path):
+        """Reads the file at path. Like ConfigParser, quietly ignores files
+           which can't be opened; returns whether the file was read."""
+        try:
+            if self.py2_semantics:
+                f = open(path)
+            else:
+                f = io.open(path, encoding='utf-8')
+        except (IOError, OSError):
+            return False
+        with f:
+            self._read(f, path)
+        return True
+
+    def read_string(self, text, source='<string>'):
+        self._read(io.StringIO(text), source)
+
+    def _read(self, lines, source):
+        if self.py2_semantics:
+            self._read_py2(lines, source)
+        else:
+            self._read_py3(lines, source)
+        for values in [self._defaults] + list(self._sections.values()):
+            for key, value in values.items():
+                if isinstance(value, list):
+                    values[key] = '\n'.join(value).rstrip()
+        self._resolvers.clear()
+
+    def _read_py3(self, lines, source):
+        section = None
+        section_name = None
+        option = None
+        indent_level = 0
+        errors = None
+        for lineno, line in enumerate(lines, start=1):
+            stripped = line.strip()
+            if not stripped:
+                # Blank lines belong to a multi-line value if an indented line
+                # follows; trailing ones are stripped when the value is joined.
+                if option is not None:
+                    section[option].append('')
+                continue
+            if stripped.startswith(COMMENT_PREFIXES):
+                continue
+            current_indent = len(line) - len(line.lstrip())
+            if option is not None and current_indent > indent_level:
+                section[option].append(stripped)
+                continue
+            indent_level = current_indent
+            match = SECTION_RE.match(stripped) if stripped[0] == '[' else None
+            if match is not None:
+                section_name = match.group('header')
+                if section_name == DEFAULT_SECTION:
+                    section = self._defaults
+                elif section_name in self._sections:
+                    raise configparser.DuplicateSectionError(section_name)
+                else:
+                    section = self._sections[section_name] = OrderedDict()
+                option = None
+                continue
+            if section is None:
+                raise configparser.MissingSectionHeaderError(source, lineno, line)
+            # The option name ends at the first delimiter
+            equals = stripped.find('=')
+            colon = stripped.find(':')
+            delimiter = equals if colon < 0 or 0 <= equals < colon else colon
+            if delimiter <= 0:
+                if errors is None:
+                    errors = configparser.ParsingError(source)
+                errors.append(lineno, repr(line))
+                option = None
+                continue
+            option = stripped[:delimiter].rstrip().lower()
+            if option in section and DuplicateOptionError is not None:
+                raise DuplicateOptionError(section_name, option, source, lineno)
+            section[option] = [stripped[delimiter + 1:].strip()]
+        if errors is not None:
+            raise errors
+
+    def _read_py2(self, lines, source):
+        # Follows Python 2's RawConfigParser._read line for line.
+        section = None
+        option = None
+        errors = None
+        for lineno, line in enumerate(lines, start=1):
+            stripped = line.strip()
+            if not stripped or line[0] in '#;':
+                continue
+            if line.split(None, 1)[0].lower() == 'rem' and line[0] in 'rR':
+                continue
+            if line[0].isspace() and section is not None and option is not None:
+                section[option].append(stripped)
+                continue
+            match = PY2_SECTION_RE.match(line)
+            if match is not None:
+                section_name = match.group('header')
+                if section_name in self._sections:
+                    section = self._sections[section_name]
+                elif section_name == DEFAULT_SECTION:
+                    section = self._defaults
+                else:
+                    section = self._sections[section_name] = OrderedDict()
+                option = None
+                continue
+            if section is None:
+                raise configparser.MissingSectionHeaderError(source, lineno, line)
+            equals = line.find('=')
+            colon = line.find(':')
+            delimiter = equals if colon < 0 or 0 <= equals < colon else colon
+            if line[0].isspace() or delimiter <= 0:
+                if errors is None:
+                    errors = configparser.ParsingError(source)
+                errors.append(lineno, repr(line))
+                continue
+            option = line[:delimiter].rstrip().lower()
+            value = line[delimiter + 1:].lstrip().rstrip('\n')
+            comment = value.find(';')
+            if comment != -1 and value[comment - 1].isspace():
+                value = value[:comment]
+            value = value.strip()
+            if value == '""':
+                value = ''
+            section[option] = [value]
+        if errors is not None:
+            raise errors
+
+    # The ConfigParser API
+
+    def defaults(self):
+        return self._defaults
+
+    def sections(self):
+        return list(self._sections)
+
+    def has_section(self, section):
+        return section in self._sections
+
+    def _section(self, section):
+        try:
+            return self._sections[section]
+        except KeyError:
+            raise configparser.NoSectionError(section)
+
+    def options(self, section):
+        options = OrderedDict(self._section(section))
+        options.update(self._defaults)
+        return list(options)
+
+    def _vars_key(self, vars):
+        if not vars:
+            return ()
+        return tuple(sorted((key.lower(), value) for key, value in vars.items()))
+
+    def _resolver(self, section, vars=None, vars_key=None):
+        """Returns the Resolver for section (None for DEFAULT alone) with vars.
+           Resolvers are kept until the next read(), so everything they have
+           expanded is reused."""
+        if vars_key is None:
+            vars_key = self._vars_key(vars)
+        key = (section, vars_key)
+        resolver = self._resolvers.get(key)
+        if resolver is None:
+            # vars win, then the section, then DEFAULT.
+            if section is None:
+                resolver = Resolver((dict(vars_key), self._defaults), self._templates)
+            else:
+                options = self._section(section)
+                fallback = self._resolver(None, vars_key=vars_key)
+                vars = fallback.layers[0]
+                resolver = Resolver(
+                    (vars, options, self._defaults), self._templates,
+                    own=frozenset(options).difference(vars) if vars else frozenset(options),
+                    fallback=fallback)
+            self._resolvers[key] = resolver
+        return resolver
+
+    def get(self, section, option, raw=False, vars=None):
+        resolver = self._resolver(section, vars)
+        option = option.lower()
+        value = resolver.raw(option)
+        if value is None:
+            raise configparser.NoOptionError(option, section)
+        if raw or '%' not in value:
+            return value
+        return resolver.get(option, section)
+
+    def items(self, section, raw=False, vars=None):
+        options = OrderedDict(self._defaults)
+        options.update(self._section(section))
+        if raw:
+            return list(options.items())
+        resolver = self._resolver(section, vars)
+        return [(option, resolver.get(option, section)) for option in options]
+
+    def read_section(self, section, vars=None, exclude=()):
+        """Returns an OrderedDict of the section's own options (less any in
+           exclude), interpolated where possible and raw where interpolation
+           fails, as PasteDeploy does."""
+        resolver = self._resolver(section, vars)
+        data = OrderedDict()
+        for option in self._sections[section]:
+            if option in exclude:
+                continue
+            value = resolver.raw(option)
+            if '%' in value:
+                try:
+                    value = resolver.resolve(option)[0]
+                except Unresolvable:
+                    pass
+            data[option] = value
+        return data
+
+
+class Template(object):
+    """An option value compiled once into a format string with a slot for
+       each reference, so expanding it is a single str.format() call.
+
+       names are the (lowercased) names referred to, in order. If the value
+       is malformed, error is ConfigParser's message for the first problem,
+       and names only go up to it."""
+
+    __slots__ = ('raw', 'format', 'names', 'name_set', 'error')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.error = None
+        pieces = REFERENCE_RE.split(raw)
+        if raw.count('%') == len(pieces) // 2:
+            # The usual case: every '%' starts a well-formed reference.
+            literal = pieces[::2]
+            if '{' in raw or '}' in raw:
+                literal = [piece.replace('{', '{{').replace('}', '}}') for piece in literal]
+            self.format = '{}'.join(literal)
+            self.names = tuple(name.lower() for name in pieces[1::2])
+            self.name_set = frozenset(self.names)
+            return
+        literal = []
+        names = []
+        rest = raw
+        while rest:
+            position = rest.find('%')
+            if position < 0:
+                literal.append(rest)
+                break
+            literal.append(rest[:position])
+            rest = rest[position:]
+            following = rest[1:2]
+            if following == '%':
+                literal.append('%')
+                rest = rest[2:]
+                continue
+            if following == '(':
+                match = REFERENCE_RE.match(rest)
+                if match is not None:
+                    literal.append(None)
+                    names.append(match.group(1).lower())
+                    rest = rest[match.end():]
+                    continue
+                self.error = "bad interpolation variable reference %r" % rest
+            else:
+                self.error = "'%%' must be followed by '%%' or '(', found: %r" % rest
+            break
+        self.format = ''.join(
+            '{}' if part is None else part.replace('{', '{{').replace('}', '}}')
+            for part in literal)
+        self.names = tuple(names)
+        self.name_set = frozenset(names)
+
+
+class Unresolvable(Exception):
+    """Raised (and memoized) when a name can't be interpolated. deps are the
+       names whose values the failure depends on."""
+
+    MISSING, SYNTAX, DEPTH = 'missing', 'syntax', 'depth'
+
+    def __init__(self, kind, detail, deps):
+        Exception.__init__(self, kind, detail)
+        self.kind = kind
+        self.detail = detail
+        self.deps = deps
+
+    def to_error(self, option, section, raw):
+        if self.kind == self.MISSING:
+            return configparser.InterpolationMissingOptionError(option, section, raw, self.detail)
+        if self.kind == self.SYNTAX:
+            return configparser.InterpolationSyntaxError(option, section, self.detail)
+        return configparser.InterpolationDepthError(option, section, raw)
+
+
+EMPTY = frozenset()
+
+
+class Resolver(object):
+    """Expands names in one scope (the defaults, or a section on top of them)
+       with memoization: each name is expanded at most once, after the names it
+       refers to. Results from the fallback (the defaults' scope) are reused
+       unless they depend on something this scope overrides, so a default
+       such as %(here)s is expanded once per file, not once per option.
+
+       layers are the mappings to look names up in, first match wins."""
+
+    def __init__(self, layers, templates, own=(), fallback=None):
+        self.layers = layers
+        self.own = own
+        self.fallback = fallback
+        self._templates = templates
+        self._memo = {}
+
+    def raw(self, name):
+        for layer in self.layers:
+            if name in layer:
+                return layer[name]
+        return None
+
+    def _template(self, raw):
+        template = self._templates.get(raw)
+        if template is None:
+            template = self._templates[raw] = Template(raw)
+        return template
+
+    def get(self, option, section):
+        """Returns the expanded value of option, raising ConfigParser's errors."""
+        try:
+            return self.resolve(option)[0]
+        except Unresolvable as e:
+            raise e.to_error(option, section, self.raw(option))
+
+    def resolve(self, name, active=EMPTY):
+        """Returns (value, nesting, deps) for name, or raises Unresolvable.
+           deps are the names referred to, directly or not, in expanding it."""
+        entry = self._memo.get(name)
+        if entry is None:
+            entry = self._memo[name] = self._resolve(name, active)
+        if isinstance(entry, Unresolvable):
+            raise entry
+        return entry
+
+    def _resolve(self, name, active):
+        if name in active:
+            # A cycle; ConfigParser would run out of depth.
+            return Unresolvable(Unresolvable.DEPTH, name, EMPTY)
+        if self.fallback is not None and name not in self.own:
+            try:
+                entry = self.fallback.resolve(name)
+            except Unresolvable as e:
+                entry = e
+            if (entry.deps if isinstance(entry, Unresolvable) else entry[2]).isdisjoint(self.own):
+                return entry
+        raw = self.raw(name)
+        if raw is None:
+            return Unresolvable(Unresolvable.MISSING, name, EMPTY)
+        if '%' not in raw:
+            return raw, 0, EMPTY
+        template = self._template(raw)
+        values = []
+        nesting = 0
+        deps = template.name_set
+        if template.names:
+            active = active.union((name,))
+            for reference in template.names:
+                try:
+                    value, referenced_nesting, referenced_deps = self.resolve(reference, active)
+                except Unresolvable as e:
+                    return Unresolvable(e.kind, e.detail, deps.union(e.deps))
+                values.append(value)
+                if referenced_nesting > nesting:
+                    nesting = referenced_nesting
+                if referenced_deps:
+                    deps = deps.union(referenced_deps)
+        if template.error is not None:
+            return Unresolvable(Unresolvable.SYNTAX, template.error, deps)
+        # Like ConfigParser, count every value containing '%' (even if only
+        # as '%%') towards the nesting limit.
+        nesting += 1
+        if nesting > MAX_INTERPOLATION_DEPTH:
+            return Unresolvable(Unresolvable.DEPTH, name, deps)
+        return template.format.format(*values), nesting, deps
@@ -0,0 +1,211 @@
+"""Per-layer latency histograms for composed apps.
+
+Give a Loader a LayerTimings (Loader(path, layer_timings=LayerTimings()))
+and every layer of the chains it composes, each filter (including the ones
+generated for pipelines and filter-apps) and the app at the bottom, is
+wrapped in a timing shim. For each response a layer handles, the shim
+records its inclusive time (from the call until the response is closed,
+counting the time spent producing the body) and its exclusive time (the
+same, less the time spent in the layers inside it) in a histogram under the
+layer's section name. A filter section used in several chains is counted
+once for all of them.
+
+Pull the numbers with LayerTimings.stats(). Timings are recorded when the
+response is closed, which WSGI servers always do. The shims hide responses'
+types from the layers above them (wsgi.file_wrapper responses are iterated
+like any other), so this is for diagnosis rather than for every deployment."""
+from __future__ import absolute_import
+
+import bisect
+import threading
+import timeit
+
+# Bucket upper bounds, in seconds: four per doubling from 1us to about 134s,
+# so a percentile is accurate to within 19%.
+DEFAULT_BOUNDS = tuple(1e-6 * 2 ** (i / 4.0) for i in range(4 * 27 + 1))
+
+PERCENTILES = (50, 90, 99)
+
+_local = threading.local()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Histogram(object):
+    """Counts durations in buckets with the given upper bounds, plus one
+       for anything longer."""
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def record(self, seconds):
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the given percentile
+           (or the longest duration seen, if that's less), or None if
+           nothing's been recorded."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = self.count * percent / 100.0
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= rank:
+                    break
+            if index < len(self.bounds):
+                return min(self.bounds[index], self.max)
+            return self.max
+
+    def snapshot(self):
+        """Returns the count, total, mean, max, percentiles and non-empty
+           buckets (as (upper bound, count) pairs; None is unbounded)."""
+        percentiles = dict(('p{0}'.format(p), self.percentile(p)) for p in PERCENTILES)
+        with self._lock:
+            bounds = self.bounds + (None,)
+            snapshot = {
+                'count': self.count,
+                'total': self.total,
+                'mean': self.total / self.count if self.count else None,
+                'max': self.max,
+                'buckets': [(bounds[i], c) for i, c in enumerate(self.counts) if c],
+            }
+        snapshot.update(percentiles)
+        return snapshot
+
+
+class LayerTimings(object):
+    """Inclusive and exclusive latency histograms for each layer of the
+       chains a Loader composes; see the module docs."""
+
+    def __init__(self, clock=timeit.default_timer, bounds=DEFAULT_BOUNDS):
+        self.clock = clock
+        self.bounds = bounds
+        # layer name -> (inclusive, exclusive)
+        self._layers = {}
+        self._lock = threading.Lock()
+
+    def histograms(self, name):
+        """Returns the (inclusive, exclusive) Histograms for a layer."""
+        with self._lock:
+            histograms = self._layers.get(name)
+            if histograms is None:
+                histograms = self._layers[name] = (Histogram(self.bounds), Histogram(self.bounds))
+        return histograms
+
+    def wrap(self, app, name):
+        """Returns app wrapped in a shim which times it as the layer name."""
+        return TimingShim(app, name, self)
+
+    def stats(self):
+        """Returns {layer name: {'inclusive': snapshot, 'exclusive': snapshot}},
+           with snapshots as from Histogram.snapshot()."""
+        with self._lock:
+            layers = list(self._layers.items())
+        return dict((name, {'inclusive': inclusive.snapshot(), 'exclusive': exclusive.snapshot()})
+                    for name, (inclusive, exclusive) in layers)
+
+    def reset(self):
+        with self._lock:
+            layers = list(self._layers.values())
+        for inclusive, exclusive in layers:
+            inclusive.reset()
+            exclusive.reset()
+
+
+class TimingShim(object):
+    """A WSGI app which times app as one layer of a chain."""
+
+    def __init__(self, app, name, timings):
+        self.app = app
+        self.name = name
+        self.clock = timings.clock
+        self.inclusive, self.exclusive = timings.histograms(name)
+
+    def __call__(self, environ, start_response):
+        response = _TimedResponse(self)
+        try:
+            response.app_iter = response.time(self.app, environ, start_response)
+        except BaseException:
+            response.record()
+            raise
+        return response
+
+    def __repr__(self):
+        return '<TimingShim {0!r} for {1!r}>'.format(self.name, self.app)
+
+
+class _TimedResponse(object):
+    # The time a layer spends on a response is split over its call, each
+    # chunk of the body and close(). Each is timed separately; whatever the
+    # layers inside take during it is subtracted to get the exclusive time.
+
+    def __init__(self, shim):
+        self.shim = shim
+        self.app_iter = None
+        self._iterator = None
+        self._inclusive = 0.0
+        self._exclusive = 0.0
+        self._recorded = False
+
+    def time(self, function, *args):
+        stack = _stack()
+        stack.append(0.0)  # time taken by inner layers
+        clock = self.shim.clock
+        start = clock()
+        try:
+            return function(*args)
+        finally:
+            elapsed = clock() - start
+            inner = stack.pop()
+            self._inclusive += elapsed
+            self._exclusive += elapsed - inner
+            if stack:
+                stack[-1] += elapsed
+
+    def __iter__(self):
+        if self._iterator is None:
+            self._iterator = self.time(iter, self.app_iter)
+        return self
+
+    def __next__(self):
+        if self._iterator is None:
+            iter(self)
+        return self.time(next, self._iterator)
+
+    next = __next__
+
+    def close(self):
+        try:
+            close = getattr(self.app_iter, 'close', None)
+            if close is not None:
+                self.time(close)
+        finally:
+            self.record()
+
+    def record(self):
+        if not self._recorded:
+            self._recorded = True
+            self.shim.inclusive.record(self._inclusive)
+            self.shim.exclusive.record(self._exclusive)
@@ -0,0 +1,118 @@
+"""Proxies which put off loading a composite's children until they're used.
+
+With Loader(path, lazy_children=True), composites are given a LazyApp for
+each child they ask for, and the child is only loaded when the first request
+reaches it. Apps which never see a request in a process are never built.
+Loaded children can be evicted again by an AppPool (see montague.apppool)."""
+from __future__ import absolute_import
+
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class LazyApp(object):
+    """A WSGI app which stands in for the app called name. The first request
+       (or call to load()) loads it through the Loader; concurrent first
+       requests wait for that one load rather than starting their own. If
+       loading fails, the error is raised and the next request tries again.
+
+       With a pool, the app is reported to the pool when loaded and on each
+       request, and requests in flight (until their response is closed) are
+       counted, so that the pool can unload it while it's idle."""
+
+    def __init__(self, loader, name, pool=None):
+        self.loader = loader
+        self.name = name
+        self.pool = pool
+        self._app = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._app is not None
+
+    def load(self):
+        """Returns the real app, loading it if need be."""
+        app = self._app
+        if app is None:
+            with self._lock:
+                app = self._app
+                if app is None:
+                    app = self._app = self.loader.load_app(self.name)
+                    if self.pool is not None:
+                        self.pool.loaded(self, app)
+        return app
+
+    def unload(self):
+        """Forgets the loaded app, unless requests are using it, and returns
+           it (or None if it's busy or wasn't loaded)."""
+        with self._active_lock:
+            if self._active:
+                return None
+            app, self._app = self._app, None
+        return app
+
+    def _finished(self):
+        with self._active_lock:
+            self._active -= 1
+
+    def __call__(self, environ, start_response):
+        if self.pool is None:
+            return self.load()(environ, start_response)
+        with self._active_lock:
+            self._active += 1
+            app = self._app
+        try:
+            if app is None:
+                app = self.load()
+            self.pool.touch(self)
+            app_iter = app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        return _ClosingIterator(app_iter, self._finished)
+
+    def __repr__(self):
+        return '<LazyApp {0!r} ({1})>'.format(
+            self.name, 'loaded' if self.loaded else 'not loaded')
+
+
+class _ClosingIterator(object):
+    def __init__(self, app_iter, finished):
+        self.app_iter = app_iter
+        self.finished = finished
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        finished, self.finished = self.finished, None
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            if finished is not None:
+                finished()
+
+
+def prewarm(lazy_apps, background=True):
+    """Loads each of lazy_apps, one after another, on a daemon thread (which
+       is returned), or in this thread if background is false. Failures are
+       logged; the app will be tried again on its first request."""
+    def run():
+        for lazy_app in lazy_apps:
+            try:
+                lazy_app.load()
+            except Exception:
+                log.exception("Unable to prewarm %s", lazy_app.name)
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name='montague-prewarm')
+    thread.daemon = True
+    thread.start()
+    return thread
@@ -1,12 +1,24 @@
 from __future__ import absolute_import
 
+import functools
 import os.path
-import pkg_resources
+import threading
+import six
 from characteristic import attributes
 from .ini import IniConfigLoader
 from .vendor import reify
-from .structs import LoadableConfig, Loadable, loadable_type_entry_points
-from .exceptions import ConfigNotFound
+from .structs import (LoadableConfig, Loadable, layered, intern_config, loadable_type_entry_points,
+                      async_loadable_type_entry_points, composite_entry_points)
+from .exceptions import ConfigNotFound, CyclicConfigReference
+from .cache import config_cache, factory_cache
+from .entrypoints import entry_point_index, CONFIG_LOADER_GROUP
+from .registry import InstanceRegistry
+from .prefork import ForkHooks, prepare_heap
+from .graph import build_graph, load_app_parallel
+from .queuelogging import QueueLogging, queue_logging_config
+from .logreconfig import incremental_logging
+from .lazyapp import LazyApp, prewarm
+from .warmup import Warmup, run_warmup
 
 
 scheme_loadable_types = {
@@ -16,6 +28,11 @@ scheme_loadable_types = {
     'filter': 'filter',
 }
 
+CONFIG_SCHEME = 'config:'
+
+# Globals which describe the file a section comes from.
+_LOCATION_KEYS = ('here', '__file__')
+
 
 def lookup_object(spec):
     """
@@ -31,37 +48,228 @@ def lookup_object(spec):
     return module
 
 
+def _adapt_entry_point_factory(factory, entry_point_group):
+    # TODO: use decorator or something to preserve signatures
+    if entry_point_group in ['paste.server_runner', 'paste.filter_app_factory']:
+        def outer(global_conf, **local_conf):
+            def inner(wsgi_app):
+                return factory(wsgi_app, global_conf, **local_conf)
+            return inner
+        outer.__wrapped__ = factory
+        return outer
+    return factory
+
+
+def _resolve_entry_point_factory(resource, entry_point_groups):
+    """Loads the factory for an egg: or package: resource. Returns the factory
+       (adapted, unless it's a composite factory) and the group it was found in."""
+    if "#" in resource:
+        pkg, name = resource.split('#')
+    else:
+        pkg, name = resource, "main"
+    entry_point_map = entry_point_index.get_entry_map(pkg)
+    for group in entry_point_groups:
+        if group in entry_point_map:
+            group_map = entry_point_map[group]
+            if name in group_map:
+                factory = group_map[name].load()
+                return _adapt_entry_point_factory(factory, group), group
+    raise Exception('TODO')
+
+
+class _Delegation(object):
+    """What a Loader shares with the Loaders for the files it delegates to
+       (through use = config:...): one Loader per file, and the sections (and
+       apps) each thread is in the middle of resolving (and constructing), to
+       catch cycles."""
+
+    def __init__(self, root, options):
+        self.options = options
+        self.loaders = {os.path.abspath(root.path): root}
+        self.lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self, name):
+        stack = getattr(self._local, name, None)
+        if stack is None:
+            stack = []
+            setattr(self._local, name, stack)
+        return stack
+
+    @property
+    def active(self):
+        return self._stack('active')
+
+    @property
+    def constructing(self):
+        return self._stack('constructing')
+
+
+def _check_cycle(stack, node, description):
+    if node in stack:
+        cycle = stack[stack.index(node):] + [node]
+        raise CyclicConfigReference("{0} form a cycle: {1}".format(
+            description, ' -> '.join('{0}#{2} ({1})'.format(*n) for n in cycle)))
+
+
 class CompositeHelper(object):
     def __init__(self, loader):
         self.loader = loader
 
     def get_app(self, name='main', global_conf=None):
+        if self.loader.lazy_children:
+            return self.loader.lazy_app(name)
         return self.loader.load_app(name)
 
+    def get_app_async(self, name='main', global_conf=None):
+        """For async composite factories; returns a coroutine."""
+        if self.loader.lazy_children:
+            from .aio import lazy_app_async
+            return lazy_app_async(self.loader, name)
+        return self.loader.load_app_async(name)
+
 
 @attributes(['path'], apply_with_init=False, apply_immutable=True)
 class Loader(object):
-    def __init__(self, path):
+    """Loads apps, filters, servers and logging config from a config file.
+
+       With share_instances, an app or filter section whose resolved
+       configuration is identical (say, the same app mounted five times by a
+       composite, or the same filter in several pipelines) is only constructed
+       once per Loader. Differently named sections aren't shared, however
+       alike their config; sections which just use another without changing
+       anything share its instance. Sections named in unshared are always
+       constructed afresh.
+
+       Apps, filters and servers can be delegated to another file with
+       use = config:path#name, where the path is relative to this file's
+       directory and name defaults to main. Each file's config loader comes
+       from the config cache, so a file shared by many configs is only
+       parsed once. Settings in the delegating section override the
+       delegated section's, and its globals override the other file's
+       (except here and __file__), as PasteDeploy's do.
+
+       With lazy_children, composites get a LazyApp for each child, which
+       loads the child on its first request; the apps named in prewarm are
+       loaded on a background thread once the first app has been loaded.
+       Given an app_pool (a montague.apppool.AppPool), children are lazy and
+       can be evicted again when idle. An app_pool can't be combined with
+       share_instances, since children sharing an instance couldn't be
+       evicted one at a time.
+
+       Given layer_timings (a montague.layertiming.LayerTimings), each layer
+       of every app and filter chain is wrapped in a shim which records its
+       latency."""
+    def __init__(self, path, lazy=False, compiled_cache=False,
+                 share_instances=False, unshared=(), lazy_children=False, prewarm=(),
+                 app_pool=None, layer_timings=None):
+        if app_pool is not None and share_instances:
+            raise ValueError("app_pool can't be combined with share_instances")
         self.path = path
-        self.config_loader = Loader._find_config_loader(path)
+        self.layer_timings = layer_timings
+        self.app_pool = app_pool
+        self.lazy_children = lazy_children or app_pool is not None
+        self.prewarm_names = tuple(prewarm)
+        self._lazy_apps = {}
+        self._lazy_lock = threading.Lock()
+        self._prewarm_started = False
+        self.warmup_results = {}
+        self.registry = InstanceRegistry() if share_instances else None
+        self.unshared = frozenset(unshared)
+        self.fork_hooks = ForkHooks()
+        self._composite_adapters = {}
+        self._prebuilt = {}
+        self._delegation = _Delegation(self, dict(
+            lazy=lazy, compiled_cache=compiled_cache, unshared=unshared,
+            lazy_children=lazy_children, app_pool=app_pool, layer_timings=layer_timings))
+        # Only options which are switched on get passed to the config loader,
+        # so config loaders which don't support them keep working.
+        config_options = {}
+        if lazy:
+            config_options['lazy'] = True
+        if compiled_cache:
+            config_options['compiled_cache'] = True
+        self.config_loader = config_cache.get(
+            path, functools.partial(Loader._find_config_loader, **config_options),
+            variant=tuple(sorted(six.iteritems(config_options))))
 
     @staticmethod
-    def _find_config_loader(config_path):
+    def _find_config_loader(config_path, **options):
         suffix = os.path.splitext(config_path)[1]  # returns ".ext"
         suffix = suffix[1:]  # we just want "ext"
-        entry_point_name = "montague.config_loader"
-        eps = tuple(pkg_resources.iter_entry_points(entry_point_name, suffix))
+        eps = entry_point_index.get(CONFIG_LOADER_GROUP, suffix)
         if len(eps) == 0:
             # TODO log warning
             loader_cls = IniConfigLoader
         else:
             loader_cls = eps[0].load()
-        return loader_cls(config_path)
+        return loader_cls(config_path, **options)
 
     @reify
     def config(self):
         return self.config_loader.config()
 
+    def config_files(self):
+        """Returns the paths of the files this Loader's config was read from,
+           including those delegated to so far."""
+        paths = [self.path]
+        with self._delegation.lock:
+            loaders = list(self._delegation.loaders.values())
+        for loader in loaders:
+            if loader.path not in paths:
+                paths.append(loader.path)
+        return paths
+
+    def _delegate_loader(self, path):
+        path = os.path.join(os.path.dirname(self.path), path)
+        delegation = self._delegation
+        key = os.path.abspath(path)
+        with delegation.lock:
+            loader = delegation.loaders.get(key)
+            if loader is None:
+                loader = Loader(path, **delegation.options)
+                loader.registry = self.registry
+                loader.fork_hooks = self.fork_hooks
+                loader._delegation = delegation
+                delegation.loaders[key] = loader
+        return loader
+
+    def _load_delegated(self, kind, resource, asynchronous=False):
+        """Returns the Loadable for the app, filter or server (kind) which
+           resource, in config:path#name form, refers to."""
+        path, _, name = resource[len(CONFIG_SCHEME):].partition('#')
+        name = name or 'main'
+        loader = self._delegate_loader(path)
+        # The other Loader shares our stack of sections being resolved, so
+        # it catches any cycle.
+        if kind == 'server':
+            return loader._load_server(name, asynchronous)
+        load = loader._load_app if kind == 'app' else loader._load_filter
+        return load(name, asynchronous)
+
+    def _enter(self, kind, name):
+        # Marks a section as being resolved, unless it already is, which
+        # means its references have come back round to it.
+        active = self._delegation.active
+        node = (os.path.abspath(self.path), kind, name or 'main')
+        _check_cycle(active, node, "Config references")
+        active.append(node)
+
+    @staticmethod
+    def _override(loadable, local_conf, global_conf):
+        # The delegated section is the innermost of the chain it comes back
+        # as, and the delegating section's settings win over its own. So do
+        # the delegating file's globals, layered over the other file's rather
+        # than copied into them, except that here and __file__ still point at
+        # the file each section comes from.
+        chain = loadable.chain()
+        chain[-1].local_conf.update(local_conf)
+        for node in chain:
+            location = dict((key, node.global_conf[key])
+                            for key in _LOCATION_KEYS if key in node.global_conf)
+            node.global_conf = layered(location, global_conf, node.global_conf)
+        return loadable
+
     def _fallback_config_loader(self, schemes, kind, name):
         _configs = []
         global_config = self.config.get('globals', {})
@@ -91,52 +299,35 @@ class Loader(object):
             app_config = self._fallback_config_loader(schemes, 'application', name)
             return app_config
 
-    def _adapt_entry_point_factory(self, factory, entry_point_group):
-        # TODO: use decorator or something to preserve signatures
-        if entry_point_group in ['paste.composite_factory', 'paste.composit_factory']:
+    def _adapt_composite_factory(self, key, factory):
+        # Composite factories need this Loader, so unlike everything else they
+        # can't be adapted once for the whole process; they're adapted once per Loader.
+        adapter = self._composite_adapters.get(key)
+        if adapter is None or adapter.__wrapped__ is not factory:
             def adapter(global_conf, **local_conf):
                 helper = CompositeHelper(self)
                 return factory(helper, global_conf, **local_conf)
-            return adapter
-        if entry_point_group in ['paste.server_runner', 'paste.filter_app_factory']:
-            def outer(global_conf, **local_conf):
-                def inner(wsgi_app):
-                    return factory(wsgi_app, global_conf, **local_conf)
-                return inner
-            return outer
-        return factory
+            adapter.__wrapped__ = factory
+            self._composite_adapters[key] = adapter
+        return adapter
 
     def _load_entry_point_factory(self, resource, entry_point_groups):
-        if "#" in resource:
-            pkg, name = resource.split('#')
-        else:
-            pkg, name = resource, "main"
-        entry_point_map = pkg_resources.get_entry_map(pkg)
-        factory = None
-        for group in entry_point_groups:
-            if group in entry_point_map:
-                group_map = entry_point_map[group]
-                if name in group_map:
-                    factory = group_map[name].load()
-                    factory = self._adapt_entry_point_factory(factory, group)
-                    break
-        if factory is None:
-            raise Exception('TODO')
+        key = ('egg', resource, tuple(entry_point_groups))
+        factory, group = factory_cache.get(
+            key, functools.partial(_resolve_entry_point_factory, resource, entry_point_groups))
+        if group in composite_entry_points:
+            return self._adapt_composite_factory(key, factory)
         return factory
 
-    def _adapt_call_factory(self, factory, factory_type):
+    def _load_call_factory(self, resource, factory_type):
         # PasteDeploy assumes a call-type factory will meet the specification
         # for {type}_factory. That is, server_runner is not allowed.
-        if factory_type == 'paste.composite_factory':
-            def adapter(global_conf, **local_conf):
-                helper = CompositeHelper(self)
-                return factory(helper, global_conf, **local_conf)
-            return adapter
+        key = ('call', resource, factory_type)
+        factory = factory_cache.get(key, functools.partial(lookup_object, resource))
+        if factory_type in composite_entry_points:
+            return self._adapt_composite_factory(key, factory)
         return factory
 
-    def _load_call_factory(self, resource, factory_type):
-        return self._adapt_call_factory(lookup_object(resource), factory_type)
-
     def _load_factory(self, location, factory_types):
         scheme, resource = location.split(':', 1)
         if scheme in ('egg', 'package'):
@@ -144,44 +335,216 @@ class Loader(object):
         elif scheme == 'call':
             factory_type = [f for f in factory_types if f.endswith('_factory')][0]
             factory = self._load_call_factory(resource, factory_type)
-        elif scheme == 'config':
-            raise NotImplementedError("haven't implemented config delegation yet")
         else:
             raise NotImplementedError("assuming this is the 'import some code' type")
         return factory
 
-    def _load_app_from_config(self, app_config):
-        local_conf = dict(app_config.config)
-        # resolve nested uses
-        use = local_conf.pop('use')
-        if ':' not in use:
-            loadable = self._load_app(use)
-            loadable.local_conf.update(local_conf)
-            loadable.global_conf.update(app_config.global_config)
+    @staticmethod
+    def _entry_point_groups(loadable_type, entry_point_groups, asynchronous):
+        if asynchronous:
+            return async_loadable_type_entry_points[loadable_type] + list(entry_point_groups)
+        return entry_point_groups
+
+    def _section_loadable(self, kind, section, use, local_conf, asynchronous):
+        # The innermost section of a chain of nested uses: either a factory or
+        # a delegation to another file.
+        if use.startswith(CONFIG_SCHEME):
+            return self._override(self._load_delegated(kind, use, asynchronous),
+                                  local_conf, section.global_config)
+        if kind == 'app':
+            factory = self._load_factory(use, self._entry_point_groups(
+                section.loadable_type, section.entry_point_groups, asynchronous))
+            return Loadable(factory=factory, is_app=True, global_conf=section.global_config,
+                            local_conf=local_conf, name=section.name)
+        scheme, resource = use.split(':', 1)
+        entry_point_groups = self._entry_point_groups(
+            'filter', section.entry_point_groups, asynchronous)
+        if scheme in ('egg', 'package'):
+            factory = self._load_entry_point_factory(resource, entry_point_groups)
+        elif scheme == 'call':
+            factory = self._load_call_factory(resource, entry_point_groups[0])
         else:
-            factory = self._load_factory(use, app_config.entry_point_groups)
-            loadable = Loadable(factory=factory, is_app=True,
-                                global_conf=app_config.global_config,
-                                local_conf=local_conf)
-        filter_with = loadable.local_conf.pop('filter-with', None)
-        loadable = loadable.normalize()
-        if filter_with is not None:
-            loadable.outer = self._load_filter(name=filter_with)
-        return loadable
+            raise Exception('TODO: scheme type {}'.format(scheme))
+        return Loadable(factory=factory, global_conf=section.global_config,
+                        local_conf=local_conf, name=section.name)
 
-    def _load_app(self, name):
-        if name is not None and name is not 'main' and ':' in name:
+    def _resolve(self, kind, name, asynchronous=False):
+        """Returns the normalized Loadable for the app or filter (kind) called
+           name, and the name of the filter it's to be wrapped in (its
+           filter-with), if any. Nested uses are followed with a loop, and
+           the filter-with is left to the caller, so that neither long chains
+           of uses nor long pipelines recurse."""
+        if name is not None and name.startswith(CONFIG_SCHEME):
+            return self._load_delegated(kind, name, asynchronous), None
+        if name is not None and name != 'main' and ':' in name:
             # not a config section name, let's handle this
-            factory = self._load_factory(name, loadable_type_entry_points['app'])
-            loadable = Loadable(
-                factory=factory, global_conf={}, local_conf={})
-            return loadable
-        app_config = self.app_config(name)
-        return self._load_app_from_config(app_config)
+            factory = self._load_factory(name, self._entry_point_groups(
+                kind, loadable_type_entry_points[kind], asynchronous))
+            return Loadable(factory=factory, global_conf={}, local_conf={}, is_app=kind == 'app'), None
+        get_config = self.app_config if kind == 'app' else self.filter_config
+        active = self._delegation.active
+        depth = len(active)
+        try:
+            # Follow the uses down to the innermost section...
+            sections = []
+            use = name
+            while True:
+                self._enter(kind, use)
+                section = get_config(use)
+                local_conf = intern_config(section.config)
+                use = local_conf.pop('use')
+                warmup = Warmup.from_config(local_conf) if kind == 'app' else None
+                sections.append((section, local_conf, warmup))
+                if ':' in use:
+                    break
+            # ...then apply each section's settings over the ones it uses.
+            loadable = None
+            filter_with = None
+            for section, local_conf, warmup in reversed(sections):
+                if loadable is None:
+                    loadable = self._section_loadable(kind, section, use, local_conf, asynchronous)
+                else:
+                    loadable = self._attach_filters(loadable, filter_with, asynchronous)
+                    loadable.local_conf.update(local_conf)
+                    loadable.global_conf = layered(section.global_config, loadable.global_conf)
+                if warmup is None:
+                    # inherited from the section this one uses, if any
+                    warmup = loadable.warmup
+                filter_with = loadable.local_conf.pop('filter-with', None)
+                loadable = loadable.normalize()
+                loadable.warmup = warmup
+            return loadable, filter_with
+        finally:
+            del active[depth:]
+
+    def _attach_filters(self, loadable, filter_with, asynchronous=False):
+        # Wraps a normalized loadable in its filter-with, that filter in its
+        # own filter-with, and so on, in a loop.
+        node = loadable
+        seen = []
+        while filter_with is not None:
+            if filter_with in seen:
+                cycle = seen[seen.index(filter_with):] + [filter_with]
+                raise CyclicConfigReference(
+                    "filter-with forms a cycle: {0}".format(' -> '.join(cycle)))
+            seen.append(filter_with)
+            node.outer, filter_with = self._resolve('filter', filter_with, asynchronous)
+            node = node.outer
+        return loadable
+
+    def _load_app(self, name, asynchronous=False):
+        loadable, filter_with = self._resolve('app', name, asynchronous)
+        return self._attach_filters(loadable, filter_with, asynchronous)
+
+    @staticmethod
+    def _chain_key(loadable):
+        return ('chain',) + tuple(node.key() for node in loadable.chain())
+
+    def component_key(self, kind, name=None):
+        """Returns the registry key for the app or filter (kind is 'app' or
+           'filter') called name, without constructing anything."""
+        load = self._load_app if kind == 'app' else self._load_filter
+        return self._chain_key(load(name).normalize())
+
+    def _get(self, loadable, label):
+        if self.registry is None:
+            return loadable.get(layer_timings=self.layer_timings)
+        chain = loadable.chain()
+        for node in chain:
+            if node.name in self.unshared:
+                node.shareable = False
+        key = self._chain_key(loadable)
+        if not all(node.shareable for node in chain):
+            self.registry.record_dependency(key, label)
+            return loadable.get(self.registry, self.layer_timings)
+        return self.registry.get_or_create(
+            key, functools.partial(loadable.get, self.registry, self.layer_timings), label=label)
+
+    def load_app(self, name=None, max_workers=None):
+        """Loads the app called name. With max_workers, apps which don't depend
+           on each other (such as the children of a composite) are constructed
+           concurrently on that many threads; see montague.graph. (With
+           lazy_children, there are no children to construct up front.)
+
+           If the app's section has warmup requests, they're made before the
+           app is returned, and their results kept in warmup_results[name];
+           see montague.warmup."""
+        if max_workers is not None and max_workers > 1 and not self.lazy_children:
+            return load_app_parallel(self, name, max_workers)
+        prebuilt = self._prebuilt.get(name or 'main')
+        if prebuilt is not None:
+            return prebuilt
+        # Composites load their children while they're being constructed, so
+        # a composite which (eventually) contains itself would never finish.
+        constructing = self._delegation.constructing
+        node = (os.path.abspath(self.path), 'app', name or 'main')
+        _check_cycle(constructing, node, "Composite apps")
+        constructing.append(node)
+        try:
+            loadable = self._load_app(name)
+            app = self._get(loadable.normalize(), ('app', name or 'main'))
+        finally:
+            constructing.pop()
+        if loadable.warmup is not None:
+            self._warm_up(app, loadable.warmup, name)
+        if self.prewarm_names and not self._prewarm_started:
+            with self._lazy_lock:
+                start, self._prewarm_started = not self._prewarm_started, True
+            if start:
+                self.prewarm()
+        return app
+
+    def _warm_up(self, app, warmup, name):
+        name = name or 'main'
+        self.warmup_results[name] = run_warmup(app, warmup, name)
+
+    def lazy_app(self, name=None):
+        """Returns the LazyApp for the app called name; there's one per name."""
+        name = name or 'main'
+        with self._lazy_lock:
+            lazy_app = self._lazy_apps.get(name)
+            if lazy_app is None:
+                lazy_app = self._lazy_apps[name] = LazyApp(self, name, self.app_pool)
+        return lazy_app
+
+    def prewarm(self, names=None, background=True):
+        """Loads the lazy apps called names (by default, those given as the
+           prewarm option) ahead of their first requests; see
+           montague.lazyapp.prewarm. Returns the background thread, if any."""
+        if names is None:
+            names = self.prewarm_names
+        return prewarm([self.lazy_app(name) for name in names], background=background)
 
-    def load_app(self, name=None):
-        loadable = self._load_app(name)
-        return loadable.normalize().get()
+    def load_app_async(self, name=None):
+        """Returns a coroutine which loads the app called name, awaiting async
+           factories and running the others in the event loop's executor, so
+           the factories of a chain are called concurrently. Factories
+           registered under the montague.async_* entry point groups are
+           preferred here. Requires Python 3.5+; see montague.aio."""
+        from .aio import load_app_async
+        return load_app_async(self, name)
+
+    def _load_and_keep(self, name, keep):
+        # Used by parallel loading. Without a registry to hold on to them, the
+        # children of composites are kept until the whole app is loaded.
+        app = self.load_app(name)
+        if keep and self.registry is None:
+            self._prebuilt[name] = app
+        return app
+
+    def dependency_graph(self, name=None, kind='app'):
+        """Returns the graph of config references from the app (or filter) called
+           name. Raises CyclicConfigReference if they form a cycle."""
+        return build_graph(self, kind, name)
+
+    def preload_app(self, name=None, freeze=False):
+        """Loads an app in a master process, before forking workers which share
+           it. Unreachable objects are collected first; with freeze, the heap is
+           also frozen (see montague.prefork.prepare_heap). Register anything
+           workers need to reset after the fork with fork_hooks."""
+        app = self.load_app(name)
+        prepare_heap(freeze=freeze)
+        return app
 
     def server_config(self, name=None):
         try:
@@ -193,19 +556,38 @@ class Loader(object):
             server_config = self._fallback_config_loader(schemes, 'server', name)
             return server_config
 
-    def load_server(self, name=None):
+    def _load_server(self, name, asynchronous=False):
         server_config = self.server_config(name)
-        scheme, resource = server_config.config['use'].split(':', 1)
+        local_conf = intern_config(server_config.config)
+        use = local_conf.pop('use')
+        if use.startswith(CONFIG_SCHEME):
+            active = self._delegation.active
+            self._enter('server', name)
+            try:
+                return self._override(self._load_delegated('server', use, asynchronous),
+                                      local_conf, server_config.global_config)
+            finally:
+                active.pop()
+        scheme, resource = use.split(':', 1)
+        entry_point_groups = self._entry_point_groups(
+            'server', server_config.entry_point_groups, asynchronous)
         if scheme in ('egg', 'package'):
-            factory = self._load_entry_point_factory(
-                resource, server_config.entry_point_groups)
+            factory = self._load_entry_point_factory(resource, entry_point_groups)
         elif scheme == 'call':
-            factory = self._load_call_factory(resource, server_config.loadable_type)
+            factory = self._load_call_factory(resource, entry_point_groups[0])
         else:
             raise Exception('TODO: scheme type {}'.format(scheme))
-        local_conf = dict(server_config.config)
-        del local_conf['use']
-        return factory(server_config.global_config, **local_conf)
+        return Loadable(factory=factory, global_conf=server_config.global_config,
+                        local_conf=local_conf, name=server_config.name)
+
+    def load_server(self, name=None):
+        return self._load_server(name)._call_factory()
+
+    def load_server_async(self, name=None):
+        """Returns a coroutine which loads the server called name.
+           See load_app_async."""
+        from .aio import load_server_async
+        return load_server_async(self, name)
 
     def filter_config(self, name=None):
         try:
@@ -217,50 +599,56 @@ class Loader(object):
             filter_config = self._fallback_config_loader(schemes, 'filter', name)
             return filter_config
 
-    def _load_filter_from_config(self, filter_config):
-        local_conf = dict(filter_config.config)
-        # resolve nested uses
-        use = local_conf.pop('use')
-        if ':' not in use:
-            loadable = self._load_filter(use)
-            loadable.local_conf.update(local_conf)
-            loadable.global_conf.update(filter_config.global_config)
-        else:
-            scheme, resource = filter_config.config['use'].split(':', 1)
-            if scheme in ('egg', 'package'):
-                factory = self._load_entry_point_factory(
-                    resource, filter_config.entry_point_groups)
-            elif scheme == 'call':
-                factory = self._load_call_factory(resource, filter_config.loadable_type)
-            else:
-                raise Exception('TODO: scheme type {}'.format(scheme))
-            loadable = Loadable(
-                factory=factory,
-                global_conf=filter_config.global_config,
-                local_conf=local_conf)
-        filter_with = loadable.local_conf.pop('filter-with', None)
-        loadable = loadable.normalize()
-        if filter_with is not None:
-            loadable.outer = self._load_filter(name=filter_with)
-        return loadable
-
-    def _load_filter(self, name):
-        if name is not None and name is not 'main' and ':' in name:
-            # not a config section name, let's handle this
-            factory = self._load_factory(name, loadable_type_entry_points['filter'])
-            loadable = Loadable(
-                factory=factory, global_conf={}, local_conf={})
-            return loadable
-        filter_config = self.filter_config(name)
-        return self._load_filter_from_config(filter_config)
+    def _load_filter(self, name, asynchronous=False):
+        loadable, filter_with = self._resolve('filter', name, asynchronous)
+        return self._attach_filters(loadable, filter_with, asynchronous)
 
     def load_filter(self, name=None):
-        return self._load_filter(name).normalize().get()
+        return self._get(self._load_filter(name).normalize(), ('filter', name or 'main'))
+
+    def load_filter_async(self, name=None):
+        """Returns a coroutine which loads the filter called name.
+           See load_app_async."""
+        from .aio import load_filter_async
+        return load_filter_async(self, name)
+
+    def logging_config(self, name=None, queue=False):
+        """Returns the logging config called name, for logging.config.dictConfig.
 
-    def logging_config(self, name=None):
+           With queue, every handler is replaced by a QueueHandler, and the
+           real handlers are run on a listener thread (see
+           montague.queuelogging), so logging doesn't block on I/O. The
+           listener is stopped around forks (see fork_hooks) and by close()."""
         if name is None:
             name = 'main'
         try:
-            return self.config_loader.logging_config(name)
+            config = self.config_loader.logging_config(name)
         except (NotImplementedError, AttributeError):
-            return self.config['logging'][name]
+            config = self.config['logging'][name]
+        if queue:
+            config = queue_logging_config(config, self.queue_logging)
+        return config
+
+    def apply_logging_config(self, name=None, state=None):
+        """Configures logging with the logging config called name, changing
+           only what differs from the config applied last (see
+           montague.logreconfig), and returns the LoggingChanges made. state
+           defaults to the process-wide montague.logreconfig.incremental_logging."""
+        if state is None:
+            state = incremental_logging
+        return state.apply(self.logging_config(name))
+
+    @reify
+    def queue_logging(self):
+        manager = QueueLogging()
+        self.fork_hooks.register_pre_fork(manager.stop)
+        self.fork_hooks.register_post_fork(manager.start)
+        self.fork_hooks.register_post_fork_parent(manager.start)
+        return manager
+
+    def close(self):
+        """Releases the resources the Loader manages: stops the queue logging
+           listener (handling anything still queued) and closes its handlers."""
+        manager = self.__dict__.get('queue_logging')
+        if manager is not None:
+            manager.close()
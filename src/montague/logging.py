@@ -1,9 +1,16 @@
 from __future__ import absolute_import
 
+import ast
 import logging
 import logging.handlers
 import inspect
 
+# Handler classes and their argument names, by class path. Config files
+# usually have many handlers of only a few classes.
+_resolved = {}
+_argnames = {}
+_logging_names = {}
+
 
 def convert_loggers(configparser):
     names = configparser.get('loggers', 'keys')
@@ -42,27 +49,71 @@ def _resolve(name):
     return found
 
 
-def adapt_args(args, name):
-    try:
-        callable = _resolve(name)
-    except ImportError:
-        raise ValueError("unable to locate {0}".format(name))
-    if inspect.isclass(callable):
-        callable = callable.__init__
-        skipself = True
-    else:
-        if not hasattr(callable, '__call__'):
+def _positional_argnames(callable):
+    signature = getattr(inspect, 'signature', None)
+    if signature is None:  # pragma: no cover
+        # Python 2
+        if inspect.isclass(callable):
+            argnames = inspect.getargspec(callable.__init__).args
+            return argnames[1:] if argnames and argnames[0] == 'self' else argnames
+        return inspect.getargspec(callable).args
+    # For a class, signature() leaves out self.
+    return [parameter.name for parameter in signature(callable).parameters.values()
+            if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)]
+
+
+def resolve_argnames(name):
+    """Returns the names of the positional arguments taken by the class or
+       callable at the dotted path name. Cached per name."""
+    argnames = _argnames.get(name)
+    if argnames is None:
+        callable = _resolved.get(name)
+        if callable is None:
+            try:
+                callable = _resolved[name] = _resolve(name)
+            except ImportError:
+                raise ValueError("unable to locate {0}".format(name))
+        if not inspect.isclass(callable) and not hasattr(callable, '__call__'):
             raise ValueError("{0} is not callable; can't process args".format(name))
-        skipself = False
-    argnames = inspect.getargspec(callable).args
-    if skipself:
-        if argnames[0] == 'self':
-            argnames = argnames[1:]
+        argnames = _argnames[name] = tuple(_positional_argnames(callable))
+    return argnames
+
+
+def adapt_args(args, name):
+    argnames = resolve_argnames(name)
     if len(argnames) < len(args):
         raise Exception("Too many args for {0}".format(name))
     return dict(zip(argnames, args))
 
 
+def evaluate_args(value):
+    """Evaluates a handler's args. Literals (the usual case) don't need
+       eval(); anything else, such as (sys.stdout,), is evaluated in the
+       logging module's namespace, as logging.config.fileConfig does."""
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return eval(value, vars(logging))
+
+
+def _in_logging_namespace(klass):
+    # Whether klass names something in the logging module's namespace, such
+    # as StreamHandler or handlers.SysLogHandler.
+    found = _logging_names.get(klass)
+    if found is None:
+        parts = klass.split('.')
+        try:
+            obj = vars(logging)[parts[0]]
+            for part in parts[1:]:
+                obj = getattr(obj, part)
+        except (KeyError, AttributeError):
+            found = False
+        else:
+            found = True
+        _logging_names[klass] = found
+    return found
+
+
 def convert_handlers(configparser):
     names = configparser.get('handlers', 'keys')
     names = [x.strip() for x in names.split(',')]
@@ -73,19 +124,17 @@ def convert_handlers(configparser):
         args = tuple()
         for key, value in items:
             if key == 'args':
-                args = eval(value, vars(logging))
+                args = evaluate_args(value)
                 continue
             if key == 'class':
                 klass = value
                 continue
             section[key] = value
-        try:
-            # check in the logging namespace first
-            eval(klass, vars(logging))
-        except (AttributeError, NameError):
-            section['class'] = klass
-        else:
+        # check in the logging namespace first
+        if _in_logging_namespace(klass):
             section['class'] = 'logging.{0}'.format(klass)
+        else:
+            section['class'] = klass
         section.update(adapt_args(args, section['class']))
         retval[name] = section
     return retval
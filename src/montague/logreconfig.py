@@ -0,0 +1,210 @@
+"""Applies changes to a logging config without tearing logging down.
+
+logging.config.dictConfig() closes and reopens every handler, and disables
+existing loggers while it works. IncrementalLogging applies the first config
+with dictConfig(), and each one after that by diffing it with the one before:
+levels, formatters and filters are changed in place, handlers whose class or
+arguments changed are rebuilt, and loggers only have the handlers which
+changed attached or detached. Unchanged handlers keep their open files and
+sockets."""
+from __future__ import absolute_import
+
+import logging
+import logging.config
+import threading
+from characteristic import attributes
+
+# Handler settings which can be changed on a live handler; a change to
+# anything else in a handler's config means building a new handler.
+LIVE_SETTINGS = ('level', 'formatter', 'filters')
+
+ROOT = 'root'
+
+
+@attributes(['added', 'removed', 'rebuilt', 'updated', 'loggers'], apply_immutable=True)
+class LoggingChanges(object):
+    """What differs between two logging configs: the names of the handlers
+       added, removed, rebuilt and updated in place, and of the loggers whose
+       config or handlers changed ('root' for the root logger)."""
+
+    def __bool__(self):
+        return any((self.added, self.removed, self.rebuilt, self.updated, self.loggers))
+
+    __nonzero__ = __bool__
+
+
+def _loggers(config):
+    loggers = dict(config.get('loggers', {}))
+    if 'root' in config:
+        loggers[ROOT] = config['root']
+    return loggers
+
+
+def _changed(old, new):
+    return set(name for name in set(old) | set(new) if old.get(name) != new.get(name))
+
+
+def diff_logging_config(old, new):
+    """Returns the LoggingChanges needed to get from the logging config old to
+       new (both as for logging.config.dictConfig)."""
+    old_handlers = old.get('handlers', {})
+    new_handlers = new.get('handlers', {})
+    formatters = _changed(old.get('formatters', {}), new.get('formatters', {}))
+    filters = _changed(old.get('filters', {}), new.get('filters', {}))
+    added = set(new_handlers).difference(old_handlers)
+    removed = set(old_handlers).difference(new_handlers)
+    rebuilt = set()
+    updated = set()
+    for name in set(new_handlers).intersection(old_handlers):
+        old_handler = old_handlers[name]
+        new_handler = new_handlers[name]
+        if any(old_handler.get(key) != new_handler.get(key)
+               for key in set(old_handler) | set(new_handler) if key not in LIVE_SETTINGS):
+            rebuilt.add(name)
+        elif (old_handler != new_handler or new_handler.get('formatter') in formatters or
+              filters.intersection(new_handler.get('filters', ()))):
+            updated.add(name)
+    # A handler which sends records on to a rebuilt one must be rebuilt too.
+    while True:
+        replaced = rebuilt | added
+        dependent = set(name for name in updated
+                        if new_handlers[name].get('target') in replaced)
+        if not dependent:
+            break
+        updated -= dependent
+        rebuilt |= dependent
+    old_loggers = _loggers(old)
+    new_loggers = _loggers(new)
+    loggers = _changed(old_loggers, new_loggers)
+    for name, logger in new_loggers.items():
+        if (rebuilt.intersection(logger.get('handlers', ())) or
+                filters.intersection(logger.get('filters', ()))):
+            loggers.add(name)
+    return LoggingChanges(added=sorted(added), removed=sorted(removed),
+                          rebuilt=sorted(rebuilt), updated=sorted(updated),
+                          loggers=sorted(loggers))
+
+
+def _copy(value):
+    # Configs can contain callables (such as '()' factories), so only the
+    # dicts and lists are copied.
+    if isinstance(value, dict):
+        return dict((k, _copy(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+class IncrementalLogging(object):
+    """Applies successive logging configs, each as a change to the last."""
+
+    def __init__(self):
+        self.config = None
+        self.handlers = {}
+        self._lock = threading.RLock()
+
+    def apply(self, config):
+        """Configures logging with config (as for logging.config.dictConfig),
+           returning the LoggingChanges made. If anything can't be built,
+           the exception is raised before logging is changed."""
+        with self._lock:
+            if self.config is None:
+                logging.config.dictConfig(config)
+                # dictConfig() registers each handler under its name
+                self.handlers = dict((name, logging._handlers[name])
+                                     for name in config.get('handlers', {}))
+                changes = LoggingChanges(added=sorted(self.handlers), removed=[], rebuilt=[],
+                                         updated=[], loggers=sorted(_loggers(config)))
+            else:
+                changes = diff_logging_config(self.config, config)
+                if changes:
+                    self._apply(config, changes)
+            self.config = _copy(config)
+            return changes
+
+    def _apply(self, config, changes):
+        configurator = logging.config.DictConfigurator(config)
+        converted = configurator.config
+        handler_configs = converted.get('handlers', {})
+        new_names = set(changes.added) | set(changes.rebuilt)
+        # configure_handler() looks formatters, filters and target handlers up
+        # by name, and expects them to have been built already.
+        formatter_names = set()
+        filter_names = set()
+        for name in new_names | set(changes.updated):
+            handler_config = handler_configs[name]
+            if handler_config.get('formatter') is not None:
+                formatter_names.add(handler_config['formatter'])
+            filter_names.update(handler_config.get('filters', ()))
+        loggers = _loggers(config)
+        for name in changes.loggers:
+            filter_names.update(loggers.get(name, {}).get('filters', ()))
+        formatters = converted.get('formatters', {})
+        for name in formatter_names:
+            formatters[name] = configurator.configure_formatter(formatters[name])
+        filters = converted.get('filters', {})
+        for name in filter_names:
+            filters[name] = configurator.configure_filter(filters[name])
+        for name, handler in self.handlers.items():
+            if name in handler_configs and name not in new_names:
+                handler_configs[name] = handler
+        # Build targets before the handlers which refer to them
+        built = {}
+        for name in sorted(new_names, key=lambda n: ('target' in handler_configs[n], n)):
+            handler = configurator.configure_handler(handler_configs[name])
+            built[name] = handler
+            handler_configs[name] = handler
+
+        # Everything's been built, so now change what's live.
+        for name in changes.updated:
+            handler = self.handlers[name]
+            handler_config = config['handlers'][name]
+            handler.setLevel(handler_config.get('level', logging.NOTSET))
+            formatter = handler_config.get('formatter')
+            handler.setFormatter(None if formatter is None else formatters[formatter])
+            handler.filters = [filters[f] for f in handler_config.get('filters', ())]
+        old_handlers = self.handlers
+        self.handlers = dict((name, handler) for name, handler in old_handlers.items()
+                             if name in handler_configs)
+        self.handlers.update(built)
+        managed = set(old_handlers.values()) | set(built.values())
+        for name in changes.loggers:
+            logger = logging.getLogger() if name == ROOT else logging.getLogger(name)
+            logger_config = loggers.get(name)
+            if logger_config is None:
+                # No longer configured
+                self._reset_logger(logger, managed, config)
+                continue
+            logger.setLevel(logger_config.get('level', logging.NOTSET))
+            wanted = [self.handlers[h] for h in logger_config.get('handlers', ())]
+            # Attach before detaching, so records aren't dropped in between
+            for handler in wanted:
+                if handler not in logger.handlers:
+                    logger.addHandler(handler)
+            for handler in list(logger.handlers):
+                if handler in managed and handler not in wanted:
+                    logger.removeHandler(handler)
+            logger.filters = [filters[f] for f in logger_config.get('filters', ())]
+            if name != ROOT:
+                logger.propagate = logger_config.get('propagate', True)
+                logger.disabled = False
+        for name, handler in old_handlers.items():
+            if self.handlers.get(name) is not handler:
+                handler.close()
+        # Named after closing the handlers they replace, which unregisters the name
+        for name, handler in built.items():
+            handler.name = name
+
+    def _reset_logger(self, logger, managed, config):
+        logger.setLevel(logging.NOTSET)
+        for handler in list(logger.handlers):
+            if handler in managed:
+                logger.removeHandler(handler)
+        logger.filters = []
+        if logger is not logging.getLogger():
+            logger.propagate = True
+            logger.disabled = config.get('disable_existing_loggers', True)
+
+
+# The process's logging is a singleton, so its state is too.
+incremental_logging = IncrementalLogging()
@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+import gc
+import os
+
+
+class ForkHooks(object):
+    """Callbacks to run around fork(), for servers which load the app once in a
+       master process and then fork workers from it.
+
+       Pre-fork hooks run in the master, just before each fork; close sockets and
+       stop threads there. Post-fork hooks run in each worker, just after the fork;
+       reopen file handles, reset connection pools and reseed generators there.
+       Parent hooks run in the master, just after each fork; restart whatever
+       the pre-fork hooks stopped there. Hooks run in the order they were
+       registered."""
+
+    def __init__(self):
+        self.pre_fork_hooks = []
+        self.post_fork_hooks = []
+        self.parent_hooks = []
+        self._installed = False
+
+    def register_pre_fork(self, hook):
+        self.pre_fork_hooks.append(hook)
+        return hook
+
+    def register_post_fork(self, hook):
+        self.post_fork_hooks.append(hook)
+        return hook
+
+    def register_post_fork_parent(self, hook):
+        self.parent_hooks.append(hook)
+        return hook
+
+    def pre_fork(self):
+        for hook in self.pre_fork_hooks:
+            hook()
+
+    def post_fork(self):
+        for hook in self.post_fork_hooks:
+            hook()
+
+    def post_fork_parent(self):
+        for hook in self.parent_hooks:
+            hook()
+
+    def install(self):
+        """Arranges for the hooks to run around every os.fork() in this process,
+           where the platform supports it (Python 3.7+ on POSIX). Otherwise,
+           call pre_fork(), post_fork() and post_fork_parent() from your
+           server's own fork hooks.
+           Returns whether the hooks were installed."""
+        if self._installed:
+            return True
+        register_at_fork = getattr(os, 'register_at_fork', None)
+        if register_at_fork is None:
+            return False
+        register_at_fork(before=self.pre_fork, after_in_child=self.post_fork,
+                         after_in_parent=self.post_fork_parent)
+        self._installed = True
+        return True
+
+
+def prepare_heap(freeze=False):
+    """Collects garbage left over from loading, so it isn't copied into every
+       worker. With freeze, also moves everything that survives into the
+       permanent generation (Python 3.7+), so the collector in each worker
+       doesn't touch, and therefore copy, the pages shared with the master."""
+    gc.collect()
+    if freeze and hasattr(gc, 'freeze'):
+        gc.freeze()
@@ -0,0 +1,162 @@
+from __future__ import absolute_import
+
+import contextlib
+import functools
+import threading
+import timeit
+from .structs import describe_factory
+
+KINDS = ('app', 'server', 'filter', 'logging')
+
+
+class Phase(object):
+    """One timed step of loading, with the steps it contains."""
+
+    def __init__(self, name, label=None):
+        self.name = name
+        self.label = label
+        self.duration = 0.0
+        self.children = []
+
+    @property
+    def exclusive(self):
+        """Time spent in this phase but not in any of its children."""
+        return self.duration - sum(child.duration for child in self.children)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'label': self.label,
+            'duration': self.duration,
+            'exclusive': self.exclusive,
+            'children': [child.as_dict() for child in self.children],
+        }
+
+
+class Profiler(object):
+    """Times the phases of loading a config file: finding the config loader,
+       reading and interpolating the file, expanding pipelines and filter-apps,
+       converting logging config, importing factories and calling them.
+       Phases nest, so composites contain the loading of their children.
+
+       Use instrument() to time everything Montague does while it's active."""
+
+    def __init__(self, clock=timeit.default_timer):
+        self.clock = clock
+        self.root = Phase('total')
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            # Phases in other threads (such as parallel loading) hang off the root.
+            stack = self._local.stack = [self.root]
+        return stack
+
+    @contextlib.contextmanager
+    def phase(self, name, label=None):
+        stack = self._stack()
+        phase = Phase(name, label)
+        stack[-1].children.append(phase)
+        stack.append(phase)
+        start = self.clock()
+        try:
+            yield phase
+        finally:
+            phase.duration = self.clock() - start
+            stack.pop()
+            if len(stack) == 1:
+                self.root.duration = sum(child.duration for child in self.root.children)
+
+    def wrap(self, func, name, label=None):
+        """Returns func wrapped in a phase. label, if given, is called with
+           func's arguments to describe each call."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.phase(name, label(*args, **kwargs) if label else None):
+                return func(*args, **kwargs)
+        return wrapper
+
+    @contextlib.contextmanager
+    def instrument(self):
+        """Patches Montague's loading steps to record phases, for the duration
+           of the with block. Not thread-safe with respect to other loading."""
+        patched = []
+        try:
+            for owner, attr, name, label in _instrumented():
+                original = owner.__dict__[attr]
+                if isinstance(original, staticmethod):
+                    wrapped = staticmethod(self.wrap(original.__func__, name, label))
+                else:
+                    wrapped = self.wrap(original, name, label)
+                setattr(owner, attr, wrapped)
+                patched.append((owner, attr, original))
+            yield self
+        finally:
+            for owner, attr, original in reversed(patched):
+                setattr(owner, attr, original)
+
+
+def _describe_loadable(loadable):
+    factory = describe_factory(loadable.factory)
+    if loadable.name is None:
+        return factory
+    return '{0} ({1})'.format(loadable.name, factory)
+
+
+def _instrumented():
+    # (owner, attribute, phase name, label function)
+    from . import loadwsgi, ini, entrypoints, structs
+    return [
+        (loadwsgi.Loader, '_find_config_loader', 'config loader',
+         lambda path, **options: path),
+        (entrypoints.EntryPointIndex, 'get', 'discover',
+         lambda self, group, name: '{0}:{1}'.format(group, name)),
+        (ini.IniConfigLoader, '_parse', 'read', lambda self: self.path),
+        (ini.IniConfigLoader, '_read_section', 'interpolate',
+         lambda self, section: section),
+        (ini.IniConfigLoader, '_expand_pipeline', 'expand',
+         lambda name, pipeline: 'pipeline:{0}'.format(name)),
+        (ini.IniConfigLoader, '_expand_filter_app', 'expand',
+         lambda filter_app, filter_name: filter_name),
+        (ini.IniConfigLoader, '_convert_logging', 'convert logging', None),
+        (loadwsgi, '_resolve_entry_point_factory', 'import',
+         lambda resource, entry_point_groups: resource),
+        (loadwsgi, 'lookup_object', 'import', lambda spec: spec),
+        (structs.Loadable, '_call_factory', 'factory', _describe_loadable),
+    ]
+
+
+def profile(path, kind='app', name=None, **loader_options):
+    """Loads the app, server, filter or logging config (according to kind)
+       called name from the config file at path, and returns a Profiler
+       describing where the time went.
+
+       Parsed config files and resolved factories are cached process-wide, so
+       for a true picture of startup, profile in a fresh process (as the
+       montague profile command does)."""
+    from .loadwsgi import Loader
+
+    if kind not in KINDS:
+        raise ValueError("kind must be one of {0}".format(', '.join(KINDS)))
+    profiler = Profiler()
+    with profiler.instrument():
+        with profiler.phase('load {0}'.format(kind), name or 'main'):
+            loader = Loader(path, **loader_options)
+            if kind == 'logging':
+                loader.logging_config(name)
+            else:
+                getattr(loader, 'load_{0}'.format(kind))(name)
+    return profiler
+
+
+def format_tree(phase, depth=0):
+    """Returns lines describing phase and its children: inclusive and
+       exclusive times in milliseconds, then the phase indented by depth."""
+    lines = []
+    description = phase.name if phase.label is None else '{0} {1}'.format(phase.name, phase.label)
+    lines.append('{0:10.2f} {1:10.2f}  {2}{3}'.format(
+        phase.duration * 1000, phase.exclusive * 1000, '  ' * depth, description))
+    for child in phase.children:
+        lines.extend(format_tree(child, depth + 1))
+    return lines
@@ -0,0 +1,107 @@
+"""Moves logging I/O off the threads doing the logging.
+
+queue_logging_config() rewrites a logging.config.dictConfig dict so that
+each handler becomes a QueueHandler, and the real handler (built from the
+original config) is driven by a QueueListener thread belonging to a
+QueueLogging manager. Requires Python 3.2+."""
+from __future__ import absolute_import
+
+import atexit
+import logging.config
+import logging.handlers
+import threading
+from six.moves import queue
+
+# Handler config keys which stay with the QueueHandler, so records are
+# filtered in the logging thread before they're queued.
+FRONT_KEYS = ('level', 'filters')
+
+
+class _TargetedQueueHandler(logging.handlers.QueueHandler):
+    """Queues records along with the handler they're meant for, so one
+       listener thread can serve every handler."""
+
+    def __init__(self, queue, target):
+        logging.handlers.QueueHandler.__init__(self, queue)
+        self.target = target
+
+    def enqueue(self, record):
+        self.queue.put_nowait((self.target, record))
+
+
+class _DispatchingQueueListener(logging.handlers.QueueListener):
+    def handle(self, item):
+        target, record = item
+        record = self.prepare(record)
+        if record.levelno >= target.level:
+            target.handle(record)
+
+
+class QueueLogging(object):
+    """A queue and a listener thread shared by the handlers of a rewritten
+       logging config. The listener starts when the first handler is built;
+       stop() drains the queue and stops it, and start() starts it again
+       (say, in a worker after a fork)."""
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+        self.handlers = []
+        self._listener = None
+        self._lock = threading.Lock()
+        self._atexit = False
+
+    @property
+    def running(self):
+        return self._listener is not None
+
+    def make_handler(self, handler):
+        """Builds the real handler from its config, which dictConfig passes
+           in, and returns a QueueHandler which feeds it."""
+        configurator = getattr(handler, 'configurator', None)
+        if configurator is None:
+            configurator = logging.config.DictConfigurator({})
+            handler = configurator.convert(handler)
+        target = configurator.configure_handler(handler)
+        self.handlers.append(target)
+        self.start()
+        return _TargetedQueueHandler(self.queue, target)
+
+    def start(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = _DispatchingQueueListener(self.queue)
+            self._listener.start()
+            if not self._atexit:
+                # Don't lose whatever's still queued at exit
+                atexit.register(self.stop)
+                self._atexit = True
+
+    def stop(self):
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+    def close(self):
+        """Stops the listener and closes the real handlers."""
+        self.stop()
+        for handler in self.handlers:
+            handler.close()
+        del self.handlers[:]
+
+
+def queue_logging_config(config, manager):
+    """Returns a copy of the dictConfig dict config in which every handler
+       is replaced by a QueueHandler feeding manager's listener thread."""
+    config = dict(config)
+    handlers = {}
+    for name, handler_config in config.get('handlers', {}).items():
+        real = dict(handler_config)
+        front = {'()': manager.make_handler, 'handler': real}
+        for key in FRONT_KEYS:
+            if key in real:
+                front[key] = real.pop(key)
+        handlers[name] = front
+    config['handlers'] = handlers
+    return config
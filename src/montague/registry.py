@@ -0,0 +1,150 @@
+from __future__ import absolute_import
+
+import threading
+import six
+
+try:
+    from collections.abc import Mapping, Set
+except ImportError:  # pragma: no cover
+    from collections import Mapping, Set
+
+
+def freeze(value):
+    """Converts a config value (usually a dict of strings, but JSON configs
+       can nest dicts and lists) into something hashable, for use as a key."""
+    if isinstance(value, Mapping):
+        return ('dict', tuple(sorted(((k, freeze(v)) for k, v in six.iteritems(value)),
+                                     key=lambda item: str(item[0]))))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(freeze(v) for v in value))
+    if isinstance(value, Set):
+        return ('set', frozenset(freeze(v) for v in value))
+    try:
+        hash(value)
+    except TypeError:
+        # Not much we can do; only the very same object will match.
+        return ('id', id(value))
+    return value
+
+
+class InstanceRegistry(object):
+    """Constructed apps and filters, keyed by their resolved configuration,
+       so that identical components are only built once per registry.
+
+       If two threads ask for the same key at once, one of them builds the
+       instance and the other waits for it.
+
+       The registry also notes what each instance needed while it was being
+       built (a composite needs its child apps), so a reload can tell which
+       instances are still good."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._instances = {}
+        self._dependencies = {}
+        self._building = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._instances)
+
+    def __contains__(self, key):
+        return key in self._instances
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record_dependency(self, key, label=None):
+        """Notes that whatever is currently being built depends on key. If label
+           is given (say, ('app', 'main')), it also depends on label continuing
+           to resolve to key."""
+        stack = self._stack()
+        if stack:
+            with self._lock:
+                self._dependencies.setdefault(stack[-1], set()).add((label, key))
+
+    def get_or_create(self, key, create, label=None):
+        self.record_dependency(key, label)
+        with self._lock:
+            if key in self._instances:
+                self.hits += 1
+                return self._instances[key]
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                if key in self._instances:
+                    self.hits += 1
+                    return self._instances[key]
+            stack = self._stack()
+            stack.append(key)
+            try:
+                instance = create()
+            except Exception:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+            finally:
+                stack.pop()
+            with self._lock:
+                self.misses += 1
+                self._instances[key] = instance
+                self._building.pop(key, None)
+        return instance
+
+    def dependencies(self, key):
+        """Returns a frozenset of (label, key) pairs which the instance for key
+           depended on when it was built."""
+        with self._lock:
+            return frozenset(self._dependencies.get(key, ()))
+
+    def adopt(self, key, instance, dependencies=()):
+        """Adds an already-constructed instance, such as one carried over from
+           another registry."""
+        with self._lock:
+            self._instances[key] = instance
+            if dependencies:
+                self._dependencies[key] = set(dependencies)
+
+    def prune(self, roots):
+        """Drops every instance which isn't one of the roots or something they
+           depended on, and returns the dropped instances."""
+        with self._lock:
+            live = set()
+            pending = [key for key in roots if key in self._instances]
+            while pending:
+                key = pending.pop()
+                if key in live:
+                    continue
+                live.add(key)
+                pending.extend(dependency for _, dependency in self._dependencies.get(key, ()))
+            dropped = []
+            for key in list(self._instances):
+                if key not in live:
+                    dropped.append(self._instances.pop(key))
+                    self._dependencies.pop(key, None)
+            return dropped
+
+    def discard(self, key):
+        with self._lock:
+            self._dependencies.pop(key, None)
+            return self._instances.pop(key, None)
+
+    def items(self):
+        with self._lock:
+            return list(six.iteritems(self._instances))
+
+    def instances(self):
+        with self._lock:
+            return list(six.itervalues(self._instances))
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+            self._dependencies.clear()
+            self.hits = 0
+            self.misses = 0
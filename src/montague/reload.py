@@ -0,0 +1,318 @@
+from __future__ import absolute_import
+
+import hashlib
+import logging
+import os.path
+import threading
+import six
+
+from .cache import config_cache, file_identity
+from .loadwsgi import Loader
+
+try:
+    import inotify_simple
+except ImportError:  # pragma: no cover
+    inotify_simple = None
+
+log = logging.getLogger(__name__)
+
+DIFFED_KINDS = ('application', 'composite', 'filter', 'server', 'logging')
+
+
+def diff_config(old, new):
+    """Returns the set of (kind, name) pairs for sections which differ between
+       two Montague Standard Format dicts. A change to the globals, which affects
+       everything, is reported as ('globals', None)."""
+    changed = set()
+    if old.get('globals') != new.get('globals'):
+        changed.add(('globals', None))
+    for kind in DIFFED_KINDS:
+        old_kind = old.get(kind, {})
+        new_kind = new.get(kind, {})
+        for name in set(old_kind) | set(new_kind):
+            if old_kind.get(name) != new_kind.get(name):
+                changed.add((kind, name))
+    return changed
+
+
+def carry_over(old_loader, new_loader):
+    """Adopts every instance in old_loader's registry which is still good under
+       new_loader's config into new_loader's registry. An instance is still good
+       if its own config is unchanged (which is implied by its key) and
+       everything it needed when it was built is still good and still resolves
+       the same way."""
+    old = old_loader.registry
+    new = new_loader.registry
+    valid = {}
+
+    def still_valid(key):
+        if key not in valid:
+            valid[key] = True  # provisionally, in case of cycles
+            for label, dependency in old.dependencies(key):
+                if label is not None:
+                    try:
+                        current = new_loader.component_key(*label)
+                    except Exception:
+                        current = None
+                    if current != dependency:
+                        valid[key] = False
+                        break
+                if not still_valid(dependency):
+                    valid[key] = False
+                    break
+        return valid[key]
+
+    for key, instance in old.items():
+        if still_valid(key):
+            new.adopt(key, instance, old.dependencies(key))
+
+
+class _Generation(object):
+    """One version of the app, with a count of the requests still using it."""
+
+    def __init__(self, loader, app):
+        self.loader = loader
+        self.app = app
+        self.active = 0
+        self._retired = None
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """Counts a request in, unless the generation has been retired (in
+           which case it returns False and the request should use the new one)."""
+        with self._lock:
+            if self._retired is not None:
+                return False
+            self.active += 1
+            return True
+
+    def exit(self):
+        with self._lock:
+            self.active -= 1
+            release = self.active == 0 and self._retired is not None
+        if release:
+            self._release()
+
+    def retire(self, instances):
+        with self._lock:
+            self._retired = instances
+            release = self.active == 0
+        if release:
+            self._release()
+
+    def _release(self):
+        instances, self._retired = self._retired, []
+        for instance in instances:
+            close = getattr(instance, 'close', None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    log.exception("Error closing %r", instance)
+        self.app = None
+        self.loader = None
+
+
+class _ClosingIterator(object):
+    def __init__(self, app_iter, generation):
+        self.app_iter = app_iter
+        self.generation = generation
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        generation, self.generation = self.generation, None
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            if generation is not None:
+                generation.exit()
+
+
+class ReloadingApp(object):
+    """A WSGI app which stands in for the app called name in the config file at
+       path, and can reload it without restarting the process.
+
+       On reload, only the apps, filters and composites whose config (or whose
+       dependencies' config) changed are rebuilt; everything else is carried
+       over. The new app is swapped in atomically. Requests already in flight
+       finish on the old app, and once they have, components which weren't
+       carried over are released, calling their close() methods if they have them.
+
+       Call start_watching() to reload automatically when a config file changes.
+       Extra keyword arguments are passed on to the Loader. Instances are
+       always shared (that's how unchanged ones are carried over), so
+       share_instances can't be switched off, and app_pool, which can't be
+       combined with it, isn't supported."""
+
+    def __init__(self, path, name=None, interval=1.0, **loader_options):
+        if not loader_options.pop('share_instances', True):
+            raise ValueError("ReloadingApp always shares instances")
+        if loader_options.get('app_pool') is not None:
+            raise ValueError("ReloadingApp doesn't support app_pool")
+        self.path = path
+        self.name = name
+        self.interval = interval
+        self.loader_options = loader_options
+        loader = self._make_loader()
+        self._generation = _Generation(loader, loader.load_app(name))
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def _make_loader(self):
+        return Loader(self.path, share_instances=True, **self.loader_options)
+
+    @property
+    def loader(self):
+        return self._generation.loader
+
+    @property
+    def app(self):
+        return self._generation.app
+
+    def __call__(self, environ, start_response):
+        # A reload swaps in the new generation before retiring the old one,
+        # so a request which reads the old one just before the swap will find
+        # the new one when it tries again.
+        generation = self._generation
+        while not generation.enter():
+            generation = self._generation
+        try:
+            app_iter = generation.app(environ, start_response)
+        except BaseException:
+            generation.exit()
+            raise
+        return _ClosingIterator(app_iter, generation)
+
+    def reload(self):
+        """Reloads the config and swaps in the rebuilt app. Returns the set of
+           sections which changed (see diff_config)."""
+        with self._reload_lock:
+            old = self._generation
+            # An edit which keeps a file's size within one mtime tick looks
+            # like the cached version, so parse every file afresh.
+            for path in old.loader.config_files():
+                config_cache.invalidate(path)
+            new_loader = self._make_loader()
+            changed = diff_config(old.loader.config, new_loader.config)
+            carry_over(old.loader, new_loader)
+            app = new_loader.load_app(self.name)
+            # Drop anything carried over which the new app doesn't use
+            registry = new_loader.registry
+            registry.prune([new_loader.component_key('app', self.name)])
+            # The same object can be registered under several keys (a lone app
+            # is both a chain and a node), so compare identities.
+            kept = set(id(instance) for instance in registry.instances())
+            retired = [instance for instance in old.loader.registry.instances()
+                       if id(instance) not in kept]
+            self._generation = _Generation(new_loader, app)
+            old.retire(retired)
+            return changed
+
+    def _reload_quietly(self):
+        try:
+            changed = self.reload()
+        except Exception:
+            log.exception("Unable to reload %s; still using the old config", self.path)
+        else:
+            log.info("Reloaded %s (changed: %s)", self.path, sorted(changed, key=repr))
+
+    def start_watching(self):
+        if self._watcher is None:
+            self._watcher = make_watcher(
+                lambda: self.loader.config_files(), self._reload_quietly, self.interval)
+            self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+
+def _content_digest(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (IOError, OSError):
+        return None
+
+
+class PollingWatcher(object):
+    """Calls callback from a background thread whenever one of the files
+       returned by get_paths() changes, checking every interval seconds."""
+
+    def __init__(self, get_paths, callback, interval=1.0):
+        self.get_paths = get_paths
+        self.callback = callback
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _snapshot(self):
+        # An edit which keeps the size within one mtime tick only shows up
+        # in the contents.
+        return dict((path, (file_identity(path), _content_digest(path)))
+                    for path in self.get_paths())
+
+    def start(self):
+        self._stop.clear()
+        self._initial = self._snapshot()
+        self._thread = threading.Thread(target=self._run, name='montague-reload')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        snapshot = self._initial
+        while not self._stop.wait(self.interval):
+            current = self._snapshot()
+            if current != snapshot:
+                self.callback()
+                # the callback may have changed the set of files
+                snapshot = self._snapshot()
+
+
+class InotifyWatcher(PollingWatcher):
+    """Like PollingWatcher, but woken by inotify rather than by polling.
+       Directories are watched rather than files, since editors usually
+       replace files instead of writing to them."""
+
+    def _run(self):
+        notifier = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+        try:
+            names = self._watch(notifier, mask)
+            while not self._stop.is_set():
+                events = notifier.read(timeout=int(self.interval * 1000))
+                if any(event.name in names for event in events):
+                    self.callback()
+                    names = self._watch(notifier, mask)
+        finally:
+            notifier.close()
+
+    def _watch(self, notifier, mask):
+        names = set()
+        directories = set()
+        for path in self.get_paths():
+            directory, name = os.path.split(os.path.abspath(path))
+            directories.add(directory)
+            names.add(name)
+        for directory in directories:
+            notifier.add_watch(directory, mask)
+        return names
+
+
+def make_watcher(get_paths, callback, interval=1.0):
+    """Returns an InotifyWatcher where inotify is available (on Linux, with the
+       inotify_simple package installed), and a PollingWatcher otherwise."""
+    if inotify_simple is not None and six.PY3 and os.path.exists('/proc/sys/fs/inotify'):
+        return InotifyWatcher(get_paths, callback, interval)
+    return PollingWatcher(get_paths, callback, interval)
@@ -1,8 +1,14 @@
 from __future__ import absolute_import
 
 from itertools import tee
-from six.moves import zip as izip
-from characteristic import attributes, Attribute
+from six.moves import intern, zip as izip
+from characteristic import attributes
+from .registry import freeze
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
 
 
 loadable_type_entry_points = {
@@ -12,10 +18,59 @@ loadable_type_entry_points = {
     'filter': ['paste.filter_factory', 'paste.filter_app_factory'],
 }
 
+# Factories in these groups may be coroutine functions. They're only used by
+# the async loading methods (see montague.aio), which try them first.
+async_loadable_type_entry_points = {
+    'app': ['montague.async_app_factory'],
+    'composite': ['montague.async_composite_factory'],
+    'server': ['montague.async_server_factory'],
+    'filter': ['montague.async_filter_factory'],
+}
+
+composite_entry_points = frozenset(
+    loadable_type_entry_points['composite'] + async_loadable_type_entry_points['composite'])
+
+
+class _Struct(object):
+    """Equality and a repr for the __slots__ classes below, which are kept
+       compact because a process can hold thousands of them."""
+
+    __slots__ = ()
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<{0}({1})>'.format(self.__class__.__name__, ', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+
+class LoadableConfig(_Struct):
+    __slots__ = ('name', 'entry_point_groups', 'loadable_type', 'config', 'global_config')
+
+    def __init__(self, name, entry_point_groups, loadable_type, config, global_config):
+        set_attribute = super(LoadableConfig, self).__setattr__
+        set_attribute('name', name)
+        set_attribute('entry_point_groups', entry_point_groups)
+        set_attribute('loadable_type', loadable_type)
+        set_attribute('config', config)
+        set_attribute('global_config', global_config)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "Attribute '{0}' of class '{1}' is immutable.".format(name, self.__class__.__name__))
 
-@attributes(['name', 'entry_point_groups', 'loadable_type',
-             'config', 'global_config'], apply_immutable=True)
-class LoadableConfig(object):
     @classmethod
     def app(cls, name, config, global_config):
         return cls(name=name, config=config, global_config=global_config,
@@ -43,27 +98,54 @@ class LoadableConfig(object):
 
 @attributes(['filters'], apply_with_init=False)
 class ComposedFilter(object):
-    def __init__(self):
+    """Filters composed innermost first. With layer_timings (see
+       montague.layertiming), each filtered app is wrapped in a timing shim
+       named after its filter."""
+
+    def __init__(self, layer_timings=None):
         self.filters = []
+        self.names = []
+        self.layer_timings = layer_timings
 
-    def add_filter(self, filter):
+    def add_filter(self, filter, name=None):
         self.filters.append(filter)
+        self.names.append(name)
 
     def __call__(self, app):
-        for filter in self.filters:
+        for filter, name in zip(self.filters, self.names):
             app = filter(app)
+            if self.layer_timings is not None:
+                app = self.layer_timings.wrap(app, name)
         return app
 
 
-@attributes(['factory', 'local_conf', 'global_conf',
-             Attribute('inner', default_value=None),
-             Attribute('outer', default_value=None),
-             Attribute('is_app', default_value=False)])
-class Loadable(object):
+class Loadable(_Struct):
     """A chain of Loadables is built from the config files. An app or filter with
        filter-with will become an Loadable with another Loadable as the 'outer'
        attribute, while a filter-app with a next property will become a Loadable
-       with another Loadable as an 'inner' property."""
+       with another Loadable as an 'inner' property.
+
+       global_conf is a LayeredConfig (a plain mapping is wrapped in one), so
+       it can be shared between Loadables without being copied; the factory
+       is given a dict copy of it, which it may change as PasteDeploy's
+       factories do. warmup is the montague.warmup.Warmup of the app section
+       it was loaded for."""
+
+    __slots__ = ('factory', 'local_conf', 'global_conf', 'inner', 'outer',
+                 'is_app', 'name', 'shareable', 'warmup')
+
+    def __init__(self, factory, local_conf, global_conf, inner=None, outer=None,
+                 is_app=False, name=None, shareable=True, warmup=None):
+        self.factory = factory
+        self.local_conf = local_conf
+        self.global_conf = layered(global_conf)
+        self.inner = inner
+        self.outer = outer
+        self.is_app = is_app
+        self.name = name
+        self.shareable = shareable
+        self.warmup = warmup
+
     def normalize(self):
         # The desired end state is a chain of loadables, starting with
         # the outermost filter, each with an inner property; the final
@@ -73,8 +155,7 @@ class Loadable(object):
         # of a binary tree, perform an in-order traversal to get the chain,
         # and then reconstruct the chain as (effectively) a linked list.
 
-        chain = []
-        self._make_chain(chain)
+        chain = self._make_chain()
         for node in chain:
             node.inner = None
             node.outer = None
@@ -82,30 +163,168 @@ class Loadable(object):
             parent.inner = child
         return chain[0]
 
-    def _make_chain(self, chain):
-        if self.outer is not None:
-            self.outer._make_chain(chain)
-        chain.append(self)
-        if self.inner is not None:
-            self.inner._make_chain(chain)
-
-    def get(self):
-        loaded = self.factory(self.global_conf, **self.local_conf)
-        if self.inner is None:
-            if self.is_app:
-                return loaded
-            else:
-                # Need to compose these filters
-                composed = ComposedFilter()
-                composed.add_filter(loaded)
-                return composed
-        val = self.inner.get()
-        if isinstance(val, ComposedFilter):
-            # still composing
-            val.add_filter(loaded)
-            return val
-        else:
-            return loaded(val)
+    def _make_chain(self):
+        # Iterative in-order traversal, with outer on the left and inner on the
+        # right, so arbitrarily deep filter chains don't hit the recursion limit.
+        chain = []
+        stack = []
+        node = self
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.outer
+            node = stack.pop()
+            chain.append(node)
+            node = node.inner
+        return chain
+
+    def chain(self):
+        """Returns the loadables of a normalized chain, outermost first."""
+        chain = []
+        node = self
+        while node is not None:
+            chain.append(node)
+            node = node.inner
+        return chain
+
+    def layout(self):
+        """Describes a normalized chain, outermost first, for diagnostics."""
+        return [{'name': node.name,
+                 'factory': describe_factory(node.factory),
+                 'is_app': node.is_app}
+                for node in self.chain()]
+
+    def key(self):
+        """Identifies what this loadable's factory would produce, for sharing
+           instances through an InstanceRegistry: its section (the innermost
+           of any nested uses) and resolved config."""
+        return (getattr(self.factory, '__wrapped__', self.factory), self.is_app, self.name,
+                freeze(self.global_conf), freeze(self.local_conf))
+
+    def _call_factory(self):
+        return self.factory(self.global_conf.copy(), **self.local_conf)
+
+    def _load(self, registry):
+        if registry is None or not self.shareable:
+            return self._call_factory()
+        return registry.get_or_create(self.key(), self._call_factory)
+
+    def layer_name(self):
+        """The name this loadable's layer is timed under (see
+           montague.layertiming): its section name, or its factory's."""
+        return self.name or describe_factory(self.factory)
+
+    def get(self, registry=None, layer_timings=None):
+        """Instantiates a normalized chain. If an InstanceRegistry is given,
+           factory results are shared with anything else loaded through it.
+           With layer_timings, each layer is wrapped in a timing shim."""
+        chain = self.chain()
+        # Factories are called outermost first, then composed innermost first.
+        loaded = [node._load(registry) for node in chain]
+        return compose(loaded, chain[-1].is_app, layer_timings,
+                       [node.layer_name() for node in chain])
+
+
+class LayeredConfig(Mapping):
+    """An immutable view of config dicts layered on top of one another, where
+       the first layer with a key wins, like collections.ChainMap. The layers
+       are shared, not copied, and since nothing can be changed through the
+       view, a layer (which may belong to a cached config loader) can be
+       shared by any number of components. copy() returns a plain dict, which
+       is what factories are given."""
+
+    __slots__ = ('layers',)
+
+    def __init__(self, *layers):
+        self.layers = layers
+
+    def __getitem__(self, key):
+        for layer in self.layers:
+            if key in layer:
+                return layer[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return any(key in layer for layer in self.layers)
+
+    def __iter__(self):
+        seen = set()
+        for layer in self.layers:
+            for key in layer:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return len(set().union(*self.layers))
+
+    def copy(self):
+        merged = {}
+        for layer in reversed(self.layers):
+            merged.update(layer)
+        return merged
+
+    def __repr__(self):
+        return 'LayeredConfig({0!r})'.format(self.copy())
+
+
+EMPTY_CONFIG = LayeredConfig()
+
+
+def layered(*layers):
+    """Returns a LayeredConfig of layers, first wins. Layers which are
+       LayeredConfigs themselves are flattened, and empty ones dropped."""
+    flat = []
+    for layer in layers:
+        if isinstance(layer, LayeredConfig):
+            flat.extend(layer.layers)
+        elif layer:
+            flat.append(layer)
+    if len(layers) == 1 and isinstance(layers[0], LayeredConfig):
+        return layers[0]
+    return LayeredConfig(*flat) if flat else EMPTY_CONFIG
+
+
+def intern_config(config):
+    """Returns a copy of a section's config dict with its string keys and
+       values interned, so the many components which repeat them share one
+       copy of each."""
+    return dict((intern(key) if type(key) is str else key,
+                 intern(value) if type(value) is str else value)
+                for key, value in config.items())
+
+
+def compose(loaded, is_app, layer_timings=None, names=None):
+    """Composes the results of calling a chain's factories, outermost first.
+       Returns the wrapped app, or a ComposedFilter if the chain has no app.
+       With layer_timings, each layer is wrapped in a timing shim, named from
+       names (outermost first, like loaded)."""
+    loaded = loaded[::-1]
+    names = names[::-1] if names is not None else [None] * len(loaded)
+    if is_app:
+        app = loaded[0]
+        if layer_timings is not None:
+            app = layer_timings.wrap(app, names[0])
+        for filter, name in zip(loaded[1:], names[1:]):
+            app = filter(app)
+            if layer_timings is not None:
+                app = layer_timings.wrap(app, name)
+        return app
+    # Need to compose these filters
+    composed = ComposedFilter(layer_timings)
+    for filter, name in zip(loaded, names):
+        composed.add_filter(filter, name)
+    return composed
+
+
+def describe_factory(factory):
+    """Returns a dotted name for a factory, looking through Montague's adapters."""
+    factory = getattr(factory, '__wrapped__', factory)
+    name = getattr(factory, '__qualname__', None) or getattr(factory, '__name__', None)
+    if name is None:
+        return repr(factory)
+    module = getattr(factory, '__module__', None)
+    return '{0}:{1}'.format(module, name) if module else name
 
 
 def pairwise(iterable):
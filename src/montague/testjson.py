@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import json
+from .cache import load_compiled_config, store_compiled_config
 
 
 class JSONConfigLoader(object):
@@ -8,8 +9,15 @@ class JSONConfigLoader(object):
        the JSON document is already in Montague Standard Format,
        and that no adjustments or error checking is required."""
 
-    def __init__(self, path):
+    def __init__(self, path, compiled_cache=False):
         self.path = path
+        self.compiled_cache = compiled_cache
 
     def config(self):
-        return json.load(open(self.path))
+        if not self.compiled_cache:
+            return json.load(open(self.path))
+        digest, config = load_compiled_config(self.path)
+        if config is None:
+            config = json.load(open(self.path))
+            store_compiled_config(self.path, digest, config)
+        return config
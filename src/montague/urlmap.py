@@ -0,0 +1,195 @@
+"""A composite app which dispatches on URL prefix (and optionally host), like
+PasteDeploy's urlmap, with its mounts compiled into a prefix trie so finding
+the app for a request costs the same however many apps are mounted.
+
+Use it from a config file as::
+
+    [composite:main]
+    use = egg:montague#urlmap
+    / = home
+    /blog = blog
+    domain docs.example.com /static = static
+    domain api.example.com port 8080 /v1 = api
+    not_found_app = missing
+
+(INI option names end at the first colon, so hosts can't be given in URL
+form there.) The longest matching prefix wins, and mounts for the request's
+host win over mounts for any host. The matched prefix is moved from
+PATH_INFO to SCRIPT_NAME."""
+from __future__ import absolute_import
+
+import six
+
+
+def parse_path_expression(path):
+    """Converts a mount expression such as 'domain example.com port 8080 /blog'
+       into URL form ('http://example.com:8080/blog')."""
+    parts = path.split()
+    domain = port = path = None
+    while parts:
+        if parts[0] in ('domain', 'port', 'path'):
+            if len(parts) < 2:
+                raise ValueError("'{0}' must be followed by a value".format(parts[0]))
+            keyword, value = parts.pop(0), parts.pop(0)
+            if keyword == 'domain':
+                domain = value
+            elif keyword == 'port':
+                port = value
+            else:
+                path = value
+        elif path is None:
+            path = parts.pop(0)
+        else:
+            raise ValueError("Only one path is allowed (got {0!r} and {1!r})".format(path, parts[0]))
+    url = ''
+    if domain:
+        url = 'http://' + domain
+    if port:
+        if not domain:
+            raise ValueError("A port ({0}) was given without a domain".format(port))
+        url += ':' + port
+    if path:
+        if url and not path.startswith('/'):
+            url += '/'
+        url += path
+    return url
+
+
+def normalize_url(url):
+    """Returns (domain, path) for a mount URL. domain is None for mounts which
+       apply to any host; path has no trailing slash, so the root is ''."""
+    domain = None
+    for scheme in ('http://', 'https://'):
+        if url.startswith(scheme):
+            rest = url[len(scheme):]
+            domain, slash, path = rest.partition('/')
+            domain = domain.lower()
+            url = slash + path
+            break
+    if url and not url.startswith('/'):
+        raise ValueError("URL mounts must start with / or http:// (got {0!r})".format(url))
+    return domain, url.rstrip('/')
+
+
+class _Node(object):
+    __slots__ = ('children', 'app', 'prefix')
+
+    def __init__(self):
+        self.children = {}
+        self.app = None
+        self.prefix = None
+
+
+def not_found_app(environ, start_response):
+    body = 'No app is mounted at {0}'.format(environ.get('PATH_INFO', '')).encode('utf-8')
+    start_response('404 Not Found', [('Content-Type', 'text/plain; charset=utf-8'),
+                                     ('Content-Length', str(len(body)))])
+    return [body]
+
+
+class URLMap(object):
+    """A WSGI app which dispatches to the app mounted at the longest prefix
+       of the request path; see the module docs. Mount apps with
+       urlmap[url] = app, where url is a path or http://host/path."""
+
+    def __init__(self, not_found_app=not_found_app):
+        self.not_found_app = not_found_app
+        self._mounts = {}
+        # domain (None for any host) -> root _Node
+        self._roots = {}
+
+    def __setitem__(self, url, app):
+        domain, path = normalize_url(url)
+        node = self._roots.get(domain)
+        if node is None:
+            node = self._roots[domain] = _Node()
+        if path:
+            for segment in path[1:].split('/'):
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _Node()
+                node = child
+        node.app = app
+        node.prefix = path
+        self._mounts[(domain, path)] = app
+
+    def __getitem__(self, url):
+        return self._mounts[normalize_url(url)]
+
+    def __delitem__(self, url):
+        domain, path = normalize_url(url)
+        del self._mounts[(domain, path)]
+        # Rebuild the affected trie, so no empty branches are left behind.
+        del self._roots[domain]
+        for (mount_domain, mount_path), app in list(self._mounts.items()):
+            if mount_domain == domain:
+                del self._mounts[(mount_domain, mount_path)]
+                self['http://' + domain + mount_path if domain else mount_path] = app
+
+    def __len__(self):
+        return len(self._mounts)
+
+    def keys(self):
+        return list(self._mounts)
+
+    @staticmethod
+    def _longest_match(node, path_info):
+        # Walks one trie node per path segment, remembering the deepest mount.
+        match = node if node.app is not None else None
+        if path_info:
+            for segment in path_info[1:].split('/'):
+                node = node.children.get(segment)
+                if node is None:
+                    break
+                if node.app is not None:
+                    match = node
+        return match
+
+    def match(self, host, path_info):
+        """Returns (app, matched prefix) for a request, or (None, None)."""
+        candidates = []
+        if host:
+            host = host.lower()
+            candidates.append(host)
+            if ':' in host:
+                candidates.append(host.split(':', 1)[0])
+        candidates.append(None)
+        for domain in candidates:
+            root = self._roots.get(domain)
+            if root is None:
+                continue
+            node = self._longest_match(root, path_info)
+            if node is not None:
+                return node.app, node.prefix
+        return None, None
+
+    def __call__(self, environ, start_response):
+        host = environ.get('HTTP_HOST') or environ.get('SERVER_NAME')
+        if host and ':' not in host and environ.get('SERVER_PORT'):
+            host = '{0}:{1}'.format(host, environ['SERVER_PORT'])
+        path_info = environ.get('PATH_INFO', '')
+        app, prefix = self.match(host, path_info)
+        if app is None:
+            return self.not_found_app(environ, start_response)
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + prefix
+        environ['PATH_INFO'] = path_info[len(prefix):]
+        return app(environ, start_response)
+
+
+def urlmap_factory(loader, global_conf, **local_conf):
+    """paste.composite_factory for URLMap. Each key is a mount (see
+       parse_path_expression) and each value the name of an app, which is
+       loaded through the Loader; an app mounted several times is only loaded
+       once. not_found_app names the app for unmatched requests."""
+    apps = {}
+
+    def get_app(name):
+        if name not in apps:
+            apps[name] = loader.get_app(name, global_conf=global_conf)
+        return apps[name]
+
+    missing = local_conf.pop('not_found_app', None) or global_conf.get('not_found_app')
+    urlmap = URLMap(not_found_app=get_app(missing) if missing else not_found_app)
+    for expression, app_name in six.iteritems(local_conf):
+        urlmap[parse_path_expression(expression)] = get_app(app_name)
+    return urlmap
@@ -1,13 +1,17 @@
 from __future__ import absolute_import
 
-import collections
 import types
 
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
+
 
 def validate_montague_standard_format(config):
     for key in ('globals', 'application', 'composite', 'filter', 'server', 'logging'):
         assert key in config
-        assert isinstance(config[key], collections.Mapping)
+        assert isinstance(config[key], Mapping)
 
 
 def validate_config_loader_methods(config_loader):
@@ -0,0 +1,173 @@
+"""Synthetic requests which warm an app up before it's handed out.
+
+An app, composite or pipeline section can list requests to be made of the
+fully composed app (filters and all) as soon as it has been loaded::
+
+    [app:main]
+    use = egg:myapp
+    filter-with = auth
+    warmup = /
+        /search?q=warmup
+        POST /api/ping | Content-Type: application/json | X-Warmup: 1
+    warmup-workers = 4
+
+Each line is an optional method (GET by default), a path with an optional
+query string, and any headers, separated by |. Loader.load_app() makes the
+requests, on warmup-workers threads if that's given, and logs each one's
+status and latency before it returns the app; the results are also kept
+in Loader.warmup_results. A request which fails is logged, not raised, so
+a broken warmup never stops an app from loading. The environ of a warmup
+request has montague.warmup set, for apps which want to tell."""
+from __future__ import absolute_import
+
+import io
+import logging
+import sys
+import timeit
+import wsgiref.util
+from characteristic import attributes
+from six.moves.urllib.parse import unquote
+
+log = logging.getLogger(__name__)
+
+WARMUP = 'warmup'
+WARMUP_WORKERS = 'warmup-workers'
+WARMUP_KEYS = (WARMUP, WARMUP_WORKERS)
+
+# Headers which WSGI passes without the HTTP_ prefix.
+_UNPREFIXED = ('CONTENT_TYPE', 'CONTENT_LENGTH')
+
+
+@attributes(['method', 'path', 'headers'], apply_immutable=True)
+class WarmupRequest(object):
+    """A synthetic request; headers is a tuple of (name, value) pairs."""
+
+    @classmethod
+    def parse(cls, line):
+        """Parses a line of a warmup setting, such as
+           'POST /api/ping | Content-Type: application/json'."""
+        parts = [part.strip() for part in line.split('|')]
+        words = parts[0].split()
+        if len(words) == 1:
+            method, path = 'GET', words[0]
+        elif len(words) == 2:
+            method, path = words[0].upper(), words[1]
+        else:
+            raise ValueError("Expected '[METHOD] /path' in warmup request {0!r}".format(line))
+        if not path.startswith('/'):
+            raise ValueError("Warmup paths must start with / (got {0!r})".format(path))
+        headers = []
+        for header in parts[1:]:
+            name, colon, value = header.partition(':')
+            if not colon or not name.strip():
+                raise ValueError("Expected 'Name: value' in warmup request {0!r}".format(line))
+            headers.append((name.strip(), value.strip()))
+        return cls(method=method, path=path, headers=tuple(headers))
+
+
+@attributes(['request', 'status', 'seconds', 'error'], apply_immutable=True)
+class WarmupResult(object):
+    """The outcome of a WarmupRequest: the status line (None if the app
+       didn't get as far as starting a response), the time taken to get the
+       whole response body, and the exception raised, if any."""
+
+    @property
+    def ok(self):
+        return self.error is None and self.status is not None and self.status[:1] in ('2', '3')
+
+
+@attributes(['requests', 'workers'], apply_immutable=True)
+class Warmup(object):
+    """The warmup requests of an app section, and how many threads to make
+       them on (None to make them one at a time)."""
+
+    @classmethod
+    def from_config(cls, local_conf):
+        """Removes the warmup settings from a section's local_conf, returning
+           a Warmup, or None if the section doesn't have any."""
+        requests = local_conf.pop(WARMUP, None)
+        workers = local_conf.pop(WARMUP_WORKERS, None)
+        if not requests:
+            return None
+        if isinstance(requests, (list, tuple)):
+            lines = requests
+        else:
+            lines = requests.splitlines()
+        requests = tuple(WarmupRequest.parse(line) for line in lines if line.strip())
+        return cls(requests=requests, workers=int(workers) if workers else None)
+
+
+def make_environ(request):
+    """Returns a WSGI environ for a WarmupRequest."""
+    path, _, query = request.path.partition('?')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote(path),
+        'QUERY_STRING': query,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'montague.warmup': True,
+    }
+    for name, value in request.headers:
+        key = name.upper().replace('-', '_')
+        if key not in _UNPREFIXED:
+            key = 'HTTP_' + key
+        environ[key] = value
+    wsgiref.util.setup_testing_defaults(environ)
+    return environ
+
+
+def run_request(app, request, clock=timeit.default_timer):
+    """Makes a WarmupRequest of app, reading and closing the whole response,
+       and returns a WarmupResult."""
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status[:] = [status_line]
+        return lambda data: None
+
+    start = clock()
+    error = None
+    try:
+        app_iter = app(make_environ(request), start_response)
+        try:
+            for _ in app_iter:
+                pass
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+    except Exception as e:
+        error = e
+    return WarmupResult(request=request, status=status[0] if status else None,
+                        seconds=clock() - start, error=error)
+
+
+def _report(name, result):
+    request = result.request
+    if result.error is not None:
+        log.warning("Warmup request %s %s to %s failed after %.1fms: %r", request.method,
+                    request.path, name, result.seconds * 1000, result.error)
+    else:
+        log.info("Warmup request %s %s to %s: %s in %.1fms", request.method,
+                 request.path, name, result.status, result.seconds * 1000)
+
+
+def run_warmup(app, warmup, name='main'):
+    """Makes each of a Warmup's requests of app, concurrently if it has
+       workers (and concurrent.futures is available), logging each result.
+       Returns the WarmupResults in the order the requests were given."""
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:  # Python 2, without the futures backport
+        ThreadPoolExecutor = None
+    if (ThreadPoolExecutor is not None and warmup.workers is not None and
+            warmup.workers > 1 and len(warmup.requests) > 1):
+        with ThreadPoolExecutor(max_workers=warmup.workers) as executor:
+            results = list(executor.map(lambda request: run_request(app, request),
+                                        warmup.requests))
+    else:
+        results = [run_request(app, request) for request in warmup.requests]
+    for result in results:
+        _report(name, result)
+    return results
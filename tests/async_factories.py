@@ -0,0 +1,20 @@
+"""Coroutine factories for test_aio, which is only collected on Python 3.5+."""
+import asyncio
+from counting_factories import CountedApp
+
+
+async def make_async_app(global_conf, **local_conf):
+    await asyncio.sleep(0)
+    return CountedApp(local_conf)
+
+
+async def make_async_composite(loader, global_conf, **local_conf):
+    names = sorted(key for key in local_conf if key.startswith('app.'))
+    apps = await asyncio.gather(*[loader.get_app_async(local_conf[key]) for key in names])
+    return dict(zip(names, apps))
+
+
+async def make_async_server(global_conf, **local_conf):
+    def serve(app):
+        return (app, local_conf)
+    return serve
@@ -1,7 +1,13 @@
+import sys
 import pytest
 import pkg_resources
 import mock
 import montague.testjson
+from montague.cache import config_cache
+from montague import entrypoints
+
+# async def is a syntax error before Python 3.5.
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 5) else []
 
 
 @pytest.yield_fixture(scope='function')
@@ -28,5 +34,15 @@ def working_set():
                                   iter_entry_points=mock_ws.iter_entry_points,
                                   require=mock_ws.require)
     patcher.start()
+    ep_patcher = mock.patch.object(
+        entrypoints, '_iter_distributions',
+        lambda: entrypoints._pkg_resources_distributions(mock_ws))
+    ep_patcher.start()
+    entrypoints.entry_point_index.invalidate()
+    # Config loaders chosen under the real working set mustn't leak in, or out.
+    config_cache.clear()
     yield
+    ep_patcher.stop()
     patcher.stop()
+    entrypoints.entry_point_index.invalidate()
+    config_cache.clear()
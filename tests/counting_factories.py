@@ -0,0 +1,70 @@
+"""Factories which keep track of how many times they've been called."""
+import itertools
+
+serials = itertools.count()
+
+
+class CountedApp(object):
+    def __init__(self, conf):
+        self.conf = conf
+        self.serial = next(serials)
+        self.closed = False
+
+    def __call__(self, environ, start_response):
+        start_response('200 OK', [('Content-type', 'text/plain')])
+        return [self.conf.get('body', 'counted').encode('ascii')]
+
+    def close(self):
+        self.closed = True
+
+
+class CountedFilter(object):
+    def __init__(self, app, conf):
+        self.app = app
+        self.conf = conf
+
+    def __call__(self, environ, start_response):
+        return self.app(environ, start_response)
+
+
+def make_app(global_conf, **local_conf):
+    return CountedApp(local_conf)
+
+
+class RecordingApp(CountedApp):
+    """Remembers the environ of each request, and fails requests for /fail."""
+
+    def __init__(self, conf):
+        CountedApp.__init__(self, conf)
+        self.environs = []
+
+    def __call__(self, environ, start_response):
+        self.environs.append(environ)
+        if environ['PATH_INFO'] == '/fail':
+            raise ValueError('failed on purpose')
+        return CountedApp.__call__(self, environ, start_response)
+
+
+def make_recording_app(global_conf, **local_conf):
+    return RecordingApp(local_conf)
+
+
+def make_filter(global_conf, **local_conf):
+    serial = next(serials)
+
+    def filter(app):
+        wrapped = CountedFilter(app, local_conf)
+        wrapped.serial = serial
+        return wrapped
+    return filter
+
+
+# Set this to a threading.Barrier to make make_barrier_app wait for the
+# other apps using it to be under construction at the same time.
+barrier = None
+
+
+def make_barrier_app(global_conf, **local_conf):
+    if barrier is not None:
+        barrier.wait()
+    return CountedApp(local_conf)
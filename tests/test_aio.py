@@ -0,0 +1,82 @@
+import asyncio
+import os
+import mock
+import pytest
+import counting_factories
+from montague import entrypoints
+from montague.aio import is_async_factory
+from montague.loadwsgi import Loader
+from montague.structs import ComposedFilter
+from montague_testapps.servers import TestServer
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files/async.ini')
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def test_load_app_async():
+    app = run(Loader(config_path).load_app_async())
+    assert sorted(app) == ['app.a', 'app.b']
+    tagged = app['app.a']
+    assert isinstance(tagged, counting_factories.CountedFilter)
+    assert tagged.conf == {'colour': 'red'}
+    assert tagged.app.conf == {'body': 'async'}
+    assert app['app.b'].conf == {'body': 'sync'}
+
+
+def test_sync_factories_run_in_executor():
+    loader = Loader(config_path)
+    assert not is_async_factory(loader._load_app('sync_app').factory)
+    assert is_async_factory(loader._load_app('async_app').factory)
+    # A composite's adapter is async if the composite factory is
+    assert is_async_factory(loader._load_app('main').factory)
+    app = run(loader.load_app_async('sync_app'))
+    assert app.conf == {'body': 'sync'}
+
+
+def test_load_filter_async():
+    filter = run(Loader(config_path).load_filter_async('tag'))
+    assert isinstance(filter, ComposedFilter)
+    app = filter(counting_factories.CountedApp({}))
+    assert app.conf == {'colour': 'red'}
+
+
+def test_load_server_async():
+    loader = Loader(config_path)
+    server = run(loader.load_server_async())
+    assert server('app') == ('app', {'port': '8080'})
+    server = run(loader.load_server_async('sync'))
+    assert isinstance(server, TestServer)
+    assert isinstance(loader.load_server('sync'), TestServer)
+
+
+def test_shared_instances():
+    loader = Loader(config_path, share_instances=True)
+    first = run(loader.load_app_async('async_app'))
+    assert run(loader.load_app_async('async_app')) is first
+    assert Loader(config_path).load_app('sync_app') is not loader.load_app('sync_app')
+
+
+def test_async_entry_point_groups():
+    async def factory(global_conf, **local_conf):
+        return counting_factories.CountedApp(local_conf)
+
+    sync_ep = mock.Mock()
+    sync_ep.load.return_value = counting_factories.make_app
+    async_ep = mock.Mock()
+    async_ep.load.return_value = factory
+    distributions = [('fake_async', {
+        'paste.app_factory': {'main': sync_ep},
+        'montague.async_app_factory': {'main': async_ep},
+    })]
+    entrypoints.entry_point_index.invalidate()
+    with mock.patch.object(entrypoints, '_iter_distributions', lambda: iter(distributions)):
+        loader = Loader(config_path)
+        assert loader._load_app('egg:fake_async').factory is counting_factories.make_app
+        assert loader._load_app('egg:fake_async', asynchronous=True).factory is factory
+        app = run(loader.load_app_async('egg:fake_async'))
+    entrypoints.entry_point_index.invalidate()
+    assert isinstance(app, counting_factories.CountedApp)
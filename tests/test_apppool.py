@@ -0,0 +1,123 @@
+import os
+import pytest
+import counting_factories
+from montague.apppool import AppPool, approximate_size
+from montague.lazyapp import LazyApp
+from montague.loadwsgi import Loader
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files', 'shared.ini')
+
+OTHER, COUNTED, COUNTED_COPY = '0.0.0.0', '10.0.0.1', '10.0.0.3'
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def request(app, addr, close=True):
+    environ = {'REMOTE_ADDR': addr, 'PATH_INFO': '/'}
+    app_iter = app(environ, lambda status, headers: None)
+    body = b''.join(app_iter)
+    if close:
+        app_iter.close()
+    return body, app_iter
+
+
+def load(pool, **options):
+    loader = Loader(config_path, app_pool=pool, **options)
+    dispatcher = loader.load_app()
+    return loader, dispatcher, dispatcher.map
+
+
+def test_evict_by_count():
+    closed = []
+    pool = AppPool(max_apps=1)
+    pool.register_close_hook(lambda name, app: closed.append(name))
+    loader, dispatcher, children = load(pool)
+    assert isinstance(children[OTHER], LazyApp)
+    assert request(dispatcher, OTHER)[0] == b'other'
+    other = children[OTHER].load()
+    request(dispatcher, COUNTED)
+    assert not children[OTHER].loaded and children[COUNTED].loaded
+    assert other.closed
+    assert closed == ['other']
+    # Rebuilt on the next request
+    assert request(dispatcher, OTHER)[0] == b'other'
+    assert children[OTHER].load() is not other
+    assert pool.stats() == {'apps': 1, 'bytes': 0, 'loads': 3, 'rebuilds': 1,
+                            'evictions': {'idle': 0, 'count': 2, 'memory': 0}}
+
+
+def test_evict_idle():
+    clock = Clock()
+    pool = AppPool(max_idle=10, clock=clock)
+    loader, dispatcher, children = load(pool)
+    request(dispatcher, OTHER)
+    clock.now = 5
+    request(dispatcher, COUNTED)
+    clock.now = 12
+    request(dispatcher, COUNTED)
+    assert not children[OTHER].loaded and children[COUNTED].loaded
+    assert pool.evictions['idle'] == 1
+    clock.now = 30
+    assert pool.sweep() == 1
+    assert len(pool) == 0
+
+
+def test_busy_apps_not_evicted():
+    clock = Clock()
+    pool = AppPool(max_idle=10, clock=clock)
+    loader, dispatcher, children = load(pool)
+    _, app_iter = request(dispatcher, OTHER, close=False)
+    clock.now = 20
+    assert pool.sweep() == 0
+    assert children[OTHER].loaded
+    app_iter.close()
+    assert pool.sweep() == 1
+
+
+def test_busy_app_does_not_force_sweeps():
+    clock = Clock()
+    pool = AppPool(max_idle=10, clock=clock)
+    loader, dispatcher, children = load(pool)
+    _, app_iter = request(dispatcher, OTHER, close=False)
+    clock.now = 20
+    request(dispatcher, COUNTED)
+    assert children[OTHER].loaded
+    # The busy app is only looked at again once another max_idle has passed
+    assert pool._next_sweep == 30
+    clock.now = 25
+    request(dispatcher, COUNTED)
+    assert pool._next_sweep == 30
+    app_iter.close()
+    clock.now = 31
+    request(dispatcher, COUNTED)
+    assert not children[OTHER].loaded
+
+
+def test_memory_budget():
+    pool = AppPool(memory_budget=150, size_of=lambda app: 100)
+    loader, dispatcher, children = load(pool)
+    request(dispatcher, OTHER)
+    request(dispatcher, COUNTED_COPY)
+    assert not children[OTHER].loaded
+    assert pool.stats()['bytes'] == 100
+    assert pool.evictions['memory'] == 1
+
+
+def test_shared_instances_refused():
+    # counted and counted_alias would share an instance, which evicting either
+    # would close under the other
+    with pytest.raises(ValueError):
+        Loader(config_path, app_pool=AppPool(max_apps=1), share_instances=True)
+
+
+def test_approximate_size():
+    small = counting_factories.CountedApp({})
+    large = counting_factories.CountedApp({'data': [str(n) * 1000 for n in range(100)]})
+    assert approximate_size(large) > approximate_size(small) + 100000
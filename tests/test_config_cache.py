@@ -0,0 +1,175 @@
+import os
+import shutil
+import mock
+import pytest
+from montague import load_app, load_server, load_filter
+from montague.cache import ConfigLoaderCache, config_cache, compiled_cache_path, load_compiled_config
+from montague.ini import IniConfigLoader
+from montague.loadwsgi import Loader
+from montague.testjson import JSONConfigLoader
+
+here = os.path.dirname(__file__)
+
+
+@pytest.fixture
+def ini_path(tmpdir):
+    path = str(tmpdir.join('config.ini'))
+    shutil.copy(os.path.join(here, 'config_files', 'simple_config.ini'), path)
+    config_cache.clear()
+    return path
+
+
+def test_helpers_share_parse(ini_path):
+    load_app(ini_path)
+    load_server(ini_path, name='server_factory')
+    load_filter(ini_path, name='filter')
+    assert config_cache.misses == 1
+    assert config_cache.hits == 2
+    assert Loader(ini_path).config_loader is Loader(ini_path).config_loader
+
+
+def test_modified_file_is_reparsed(ini_path):
+    first = Loader(ini_path).config_loader
+    with open(ini_path, 'a') as f:
+        f.write('\n[app:extra]\nuse = egg:montague_testapps#other\n')
+    second = Loader(ini_path).config_loader
+    assert first is not second
+    assert 'extra' in second.config()['application']
+    assert len(config_cache) == 1
+
+
+def test_invalidate(ini_path):
+    first = Loader(ini_path).config_loader
+    config_cache.invalidate(ini_path)
+    assert Loader(ini_path).config_loader is not first
+    assert config_cache.misses == 2
+
+
+def test_lru_eviction(tmpdir):
+    cache = ConfigLoaderCache(maxsize=2)
+    paths = []
+    for name in ('a', 'b', 'c'):
+        path = str(tmpdir.join('{0}.ini'.format(name)))
+        shutil.copy(os.path.join(here, 'config_files', 'simple_config.ini'), path)
+        paths.append(path)
+    a = cache.get(paths[0], IniConfigLoader)
+    cache.get(paths[1], IniConfigLoader)
+    assert cache.get(paths[0], IniConfigLoader) is a
+    cache.get(paths[2], IniConfigLoader)
+    assert len(cache) == 2
+    # b was the least recently used
+    assert cache.get(paths[0], IniConfigLoader) is a
+    assert cache.misses == 3
+    cache.get(paths[1], IniConfigLoader)
+    assert cache.misses == 4
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == cache.misses == 0
+
+
+def test_missing_path_not_cached():
+    calls = []
+
+    def factory(path):
+        calls.append(path)
+        return object()
+
+    cache = ConfigLoaderCache()
+    cache.get('/no/such/file.redis', factory)
+    cache.get('/no/such/file.redis', factory)
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_compiled_cache(ini_path):
+    expected = IniConfigLoader(ini_path).config()
+    cache_path = compiled_cache_path(ini_path)
+    assert not os.path.exists(cache_path)
+    IniConfigLoader(ini_path, compiled_cache=True)
+    assert os.path.exists(cache_path)
+    with mock.patch.object(IniConfigLoader, '_parse') as parse:
+        config_loader = IniConfigLoader(ini_path, compiled_cache=True)
+        assert config_loader.config() == expected
+        assert config_loader.app_config('main').config == expected['application']['main']
+        assert not parse.called
+    loader = Loader(ini_path, compiled_cache=True)
+    assert loader.config == expected
+    assert loader.config_loader is not Loader(ini_path).config_loader
+
+
+def test_compiled_cache_mismatch(ini_path):
+    IniConfigLoader(ini_path, compiled_cache=True)
+    with open(ini_path, 'a') as f:
+        f.write('\n[app:extra]\nuse = egg:montague_testapps#other\n')
+    config_loader = IniConfigLoader(ini_path, compiled_cache=True)
+    assert 'extra' in config_loader.config()['application']
+    with mock.patch.object(IniConfigLoader, '_parse') as parse:
+        config_loader = IniConfigLoader(ini_path, compiled_cache=True)
+        assert 'extra' in config_loader.config()['application']
+        assert not parse.called
+
+
+def test_compiled_cache_copied_directory(tmpdir):
+    # Copying a deploy tree (cache files and all) mustn't point it at the
+    # old location
+    old = tmpdir.mkdir('a')
+    shutil.copy(os.path.join(here, 'config_files', 'simple_config.ini'), str(old))
+    IniConfigLoader(str(old.join('simple_config.ini')), compiled_cache=True)
+    assert os.path.exists(compiled_cache_path(str(old.join('simple_config.ini'))))
+    new = str(tmpdir.join('b'))
+    shutil.copytree(str(old), new)
+    path = os.path.join(new, 'simple_config.ini')
+    assert os.path.exists(compiled_cache_path(path))
+    globals_ = IniConfigLoader(path, compiled_cache=True).config()['globals']
+    assert globals_['here'] == new
+    assert globals_['__file__'] == path
+
+
+def test_compiled_cache_lazy(ini_path):
+    config_loader = IniConfigLoader(ini_path, lazy=True, compiled_cache=True)
+    config_loader.app_config('main')
+    assert not os.path.exists(compiled_cache_path(ini_path))
+    expected = config_loader.config()
+    assert os.path.exists(compiled_cache_path(ini_path))
+    config_loader = IniConfigLoader(ini_path, lazy=True, compiled_cache=True)
+    assert not config_loader.lazy
+    assert config_loader.config() == expected
+
+
+def test_compiled_cache_untrusted(ini_path):
+    expected = IniConfigLoader(ini_path).config()
+    IniConfigLoader(ini_path, compiled_cache=True)
+    cache_path = compiled_cache_path(ini_path)
+    digest, config = load_compiled_config(ini_path)
+    assert config == expected
+    assert list(config['application']) == list(expected['application'])
+    # Files anybody else can write to are ignored
+    os.chmod(cache_path, 0o620)
+    assert load_compiled_config(ini_path) == (digest, None)
+    # and so is anything which isn't plain data, such as a pickle
+    os.chmod(cache_path, 0o600)
+    with open(cache_path, 'wb') as f:
+        f.write(digest + b'\n' + b'cos\nsystem\n(S"exit 1"\ntR.')
+    assert load_compiled_config(ini_path) == (digest, None)
+    assert IniConfigLoader(ini_path, compiled_cache=True).config() == expected
+
+
+def test_compiled_cache_unpicklable(tmpdir):
+    # logging args can evaluate to things like sys.stdout
+    path = str(tmpdir.join('logging.ini'))
+    shutil.copy(os.path.join(here, 'config_files', 'logging.ini'), path)
+    config_loader = IniConfigLoader(path, compiled_cache=True)
+    assert 'main' in config_loader.config()['logging']
+    assert not os.path.exists(compiled_cache_path(path))
+    assert [p.basename for p in tmpdir.listdir()] == ['logging.ini']
+
+
+def test_compiled_cache_json(tmpdir):
+    path = str(tmpdir.join('simple_config.json'))
+    shutil.copy(os.path.join(here, 'config_files', 'simple_config.json'), path)
+    expected = JSONConfigLoader(path).config()
+    assert JSONConfigLoader(path, compiled_cache=True).config() == expected
+    assert os.path.exists(compiled_cache_path(path))
+    with mock.patch('json.load') as json_load:
+        assert JSONConfigLoader(path, compiled_cache=True).config() == expected
+        assert not json_load.called
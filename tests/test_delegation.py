@@ -0,0 +1,60 @@
+import os
+import pytest
+from montague.cache import config_cache
+from montague.exceptions import CyclicConfigReference
+from montague.loadwsgi import Loader
+from montague.structs import ComposedFilter
+from montague_testapps.apps import CapFilter
+from montague_testapps.configapps import SimpleApp
+
+here = os.path.dirname(__file__)
+delegation_dir = os.path.join(here, 'config_files', 'delegation')
+service_path = os.path.join(delegation_dir, 'service.ini')
+base_path = os.path.join(delegation_dir, 'shared', 'base.ini')
+
+
+def test_delegated_app():
+    loader = Loader(service_path)
+    app = loader.load_app()
+    # filter-with in the delegated section still applies
+    assert isinstance(app, CapFilter)
+    assert app.method_to_call == 'upper'
+    inner = app.app
+    assert isinstance(inner, SimpleApp)
+    assert inner.local_conf == {'greeting': 'hi'}
+    # The delegating file's globals win, but here is the delegated file's
+    assert inner.global_conf['region'] == 'us'
+    assert inner.global_conf['__file__'] == base_path
+    assert inner.global_conf['service'] == 'billing'
+    assert inner.global_conf['here'] == os.path.dirname(base_path)
+    assert loader.config_files() == [service_path, os.path.join(delegation_dir, 'shared/base.ini')]
+
+
+def test_delegated_named_sections():
+    loader = Loader(service_path)
+    assert loader.load_app('other') is not None
+    piped = loader.load_app('piped')
+    assert isinstance(piped, CapFilter)
+    upper = loader.load_filter('upper')
+    assert isinstance(upper, ComposedFilter)
+    server = loader.load_server()
+    assert server.local_conf == {'port': '9000'}
+
+
+def test_shared_file_parsed_once():
+    config_cache.clear()
+    base_loader = Loader(base_path)
+    base_globals = dict(base_loader.config['globals'])
+    for _ in range(5):
+        Loader(service_path).load_app()
+    # One parse each for service.ini and base.ini
+    assert config_cache.misses == 2
+    # and the cached config wasn't modified by the overrides
+    assert base_loader.config['globals'] == base_globals
+    assert base_loader.load_app().app.local_conf == {'greeting': 'hello'}
+
+
+def test_cycle():
+    loader = Loader(os.path.join(delegation_dir, 'cycle_a.ini'))
+    with pytest.raises(CyclicConfigReference):
+        loader.load_app()
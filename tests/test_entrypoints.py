@@ -0,0 +1,41 @@
+import mock
+import montague_testapps.apps
+from montague import entrypoints
+from montague.entrypoints import EntryPointIndex, normalize_name
+
+
+def test_normalize_name():
+    assert normalize_name('Montague_TestApps') == 'montague-testapps'
+    assert normalize_name('zope.interface') == 'zope-interface'
+
+
+def test_lookup():
+    index = EntryPointIndex(['paste.app_factory', 'paste.filter_factory'])
+    eps = index.get('paste.app_factory', 'basic_app')
+    assert len(eps) == 1
+    assert eps[0].load() is montague_testapps.apps.make_basic_app
+    assert index.get('paste.app_factory', 'no_such_app') == ()
+    # groups outside the index aren't indexed
+    assert index.get('paste.server_factory', 'main') == ()
+
+
+def test_entry_map():
+    index = EntryPointIndex(['paste.app_factory', 'paste.filter_factory'])
+    entry_map = index.get_entry_map('Montague-TestApps')
+    assert set(entry_map) == set(['paste.app_factory', 'paste.filter_factory'])
+    assert 'caps' in entry_map['paste.filter_factory']
+    assert index.get_entry_map('montague_testapps') is entry_map
+    assert index.get_entry_map('no_such_distribution') == {}
+
+
+def test_built_once_and_invalidated():
+    real = entrypoints._iter_distributions
+    with mock.patch.object(entrypoints, '_iter_distributions', side_effect=real) as scan:
+        index = EntryPointIndex(['paste.app_factory'])
+        assert scan.call_count == 0
+        index.get('paste.app_factory', 'main')
+        index.get_entry_map('montague_testapps')
+        assert scan.call_count == 1
+        index.invalidate()
+        index.get('paste.app_factory', 'main')
+        assert scan.call_count == 2
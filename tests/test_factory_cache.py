@@ -0,0 +1,81 @@
+import os
+import pytest
+import montague_testapps.apps
+from montague.cache import factory_cache
+from montague.entrypoints import entry_point_index
+from montague.loadwsgi import Loader
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files/multi_app.ini')
+
+
+@pytest.fixture(autouse=True)
+def reset_factory_cache():
+    factory_cache.reset()
+    yield
+    factory_cache.reset()
+
+
+def test_shared_across_loaders():
+    first = Loader(config_path)._load_entry_point_factory(
+        'montague_testapps#caps', ['paste.filter_factory'])
+    second = Loader(config_path)._load_entry_point_factory(
+        'montague_testapps#caps', ['paste.filter_factory'])
+    assert first is second is montague_testapps.apps.make_cap_filter
+    assert factory_cache.misses == 1
+    assert factory_cache.hits == 1
+
+
+def test_pipeline_resolves_once():
+    # The pipeline uses egg:montague_testapps#caps three times over
+    Loader(config_path).load_app()
+    assert factory_cache.misses == 2
+    assert factory_cache.hits == 2
+
+
+def test_adapted_once():
+    loader = Loader(config_path)
+    runner = loader._load_entry_point_factory(
+        'montague_testapps#caps2', ['paste.filter_factory', 'paste.filter_app_factory'])
+    assert runner is loader._load_entry_point_factory(
+        'montague_testapps#caps2', ['paste.filter_factory', 'paste.filter_app_factory'])
+    composite = loader._load_entry_point_factory(
+        'montague_testapps#remote_addr', ['paste.composite_factory', 'paste.composit_factory'])
+    assert composite is loader._load_entry_point_factory(
+        'montague_testapps#remote_addr', ['paste.composite_factory', 'paste.composit_factory'])
+    # but composites are bound to their Loader
+    other = Loader(config_path)._load_entry_point_factory(
+        'montague_testapps#remote_addr', ['paste.composite_factory', 'paste.composit_factory'])
+    assert other is not composite
+
+
+def test_call_factory():
+    loader = Loader(config_path)
+    factory = loader._load_call_factory('montague_testapps.apps:make_basic_app', 'paste.app_factory')
+    assert factory is montague_testapps.apps.make_basic_app
+    assert loader._load_call_factory('montague_testapps.apps:make_basic_app', 'paste.app_factory') is factory
+    assert factory_cache.misses == 1
+
+
+def test_failures_not_cached():
+    loader = Loader(config_path)
+    with pytest.raises(Exception):
+        loader._load_entry_point_factory('montague_testapps#nope', ['paste.app_factory'])
+    assert len(factory_cache) == 0
+
+
+def test_composite():
+    app = Loader(config_path).load_app('remote')
+    assert app.map['127.0.0.1'] is montague_testapps.apps.basic_app
+    assert app.map['0.0.0.0'].method_to_call == 'title'
+
+
+def test_reindex_forgets_egg_factories():
+    loader = Loader(config_path)
+    loader._load_entry_point_factory('montague_testapps#caps', ['paste.filter_factory'])
+    loader._load_call_factory('montague_testapps.apps:make_basic_app', 'paste.app_factory')
+    assert len(factory_cache) == 2
+    entry_point_index.invalidate()
+    assert [key[0] for key in factory_cache._entries] == ['call']
+    loader._load_entry_point_factory('montague_testapps#caps', ['paste.filter_factory'])
+    assert factory_cache.misses == 3
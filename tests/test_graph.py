@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import mock
+import pytest
+import counting_factories
+from montague.exceptions import CyclicConfigReference
+from montague.graph import construction_dependencies
+from montague.loadwsgi import Loader
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files/parallel.ini')
+
+
+@pytest.fixture
+def barrier():
+    counting_factories.barrier = threading.Barrier(3, timeout=5)
+    yield counting_factories.barrier
+    counting_factories.barrier = None
+
+
+def test_graph():
+    graph = Loader(config_path).dependency_graph()
+    assert graph[('app', 'main')] == [
+        ('child', ('app', 'slow_a')), ('child', ('app', 'slow_b')), ('child', ('app', 'slow_c'))]
+    assert graph[('app', 'slow_b')] == [('filter-with', ('filter', 'tag'))]
+    assert graph[('app', 'slow_c')] == [('use', ('app', 'slow_a'))]
+    assert construction_dependencies(graph, ('app', 'main')) == {
+        ('app', 'main'): set([('app', 'slow_a'), ('app', 'slow_b'), ('app', 'slow_c')]),
+        ('app', 'slow_a'): set(),
+        ('app', 'slow_b'): set(),
+        ('app', 'slow_c'): set(),
+    }
+
+
+def test_cycle():
+    loader = Loader(config_path)
+    with pytest.raises(CyclicConfigReference) as excinfo:
+        loader.dependency_graph('cyclic')
+    assert 'filter:f -> filter:g -> filter:f' in str(excinfo.value)
+    with pytest.raises(CyclicConfigReference):
+        loader.load_app('cyclic', max_workers=2)
+
+
+@pytest.mark.parametrize('name, cycle', [
+    ('cyclic', '#f (filter) -> '),
+    ('use_a', '#use_a (app) -> '),
+    ('looping', 'loop_1 -> loop_2 -> loop_1'),
+    ('contains_itself', '#contains_itself (app) -> '),
+])
+def test_serial_cycle(name, cycle):
+    # Without building the graph first
+    loader = Loader(config_path)
+    with pytest.raises(CyclicConfigReference) as excinfo:
+        loader.load_app(name)
+    assert cycle in str(excinfo.value)
+    # Nothing's left marked as in progress
+    assert loader._delegation.active == []
+    assert loader._delegation.constructing == []
+    assert loader.load_app('slow_a').conf == {'body': 'a'}
+
+
+def test_parallel(barrier):
+    # Each app waits until all three are under construction
+    dispatcher = Loader(config_path).load_app(max_workers=3)
+    apps = dispatcher.map
+    assert apps['10.0.0.1'].conf == {'body': 'a'}
+    assert apps['10.0.0.2'].app.conf == {'body': 'b'}
+    assert apps['0.0.0.0'].conf == {'body': 'c'}
+
+
+def test_parallel_shared(barrier):
+    loader = Loader(config_path, share_instances=True)
+    dispatcher = loader.load_app(max_workers=3)
+    assert loader.load_app('slow_a') is dispatcher.map['10.0.0.1']
+    assert not loader._prebuilt
+
+
+def test_parallel_mounted_twice():
+    # Without a registry, a child mounted twice is still only built once
+    loader = Loader(config_path)
+    apps = loader.load_app('mounted_twice', max_workers=2).map
+    assert apps['10.0.0.1'] is apps['10.0.0.2']
+    assert not loader._prebuilt
+
+
+def test_parallel_without_futures():
+    # Python 2 without the futures backport loads serially
+    loader = Loader(config_path)
+    with mock.patch.dict(sys.modules, {'concurrent.futures': None}):
+        apps = loader.load_app('mounted_twice', max_workers=2).map
+    assert apps['10.0.0.1'] is not apps['10.0.0.2']
+    assert apps['10.0.0.1'].conf == {}
+
+
+def test_serial():
+    dispatcher = Loader(config_path).load_app(max_workers=1)
+    assert dispatcher.map['0.0.0.0'].conf == {'body': 'c'}
@@ -7,6 +7,7 @@ from montague import load_app, load_server, load_filter, load_logging_config
 from montague.structs import ComposedFilter
 from montague.validation import validate_montague_standard_format, validate_config_loader_methods
 import montague_testapps
+import counting_factories
 
 here = os.path.dirname(__file__)
 
@@ -180,3 +181,73 @@ def test_validity():
     config_loader = IniConfigLoader(config_path)
     validate_montague_standard_format(config_loader.config())
     validate_config_loader_methods(config_loader)
+
+
+def test_pipeline():
+    config_path = os.path.join(here, 'config_files/multi_app.ini')
+    app = load_app(config_path)
+    assert app.method_to_call == 'lower'
+    assert app.app.method_to_call == 'upper'
+    assert app.app.app.method_to_call == 'upper'
+    assert app.app.app.app is montague_testapps.apps.basic_app
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_long_pipeline(tmpdir, lazy):
+    # Longer than the recursion limit allows, if resolving recursed
+    depth = max(1200, sys.getrecursionlimit() + 200)
+    path = tmpdir.join('long.ini')
+    lines = ['[pipeline:main]', 'pipeline = {0} app'.format(' '.join(['tag'] * depth)),
+             '[filter:tag]', 'use = call:counting_factories:make_filter',
+             '[app:app]', 'use = call:counting_factories:make_app',
+             '[app:nested]', 'use = nested_0']
+    for count in range(depth):
+        lines += ['[app:nested_{0}]'.format(count), 'use = nested_{0}'.format(count + 1)]
+    lines += ['[app:nested_{0}]'.format(depth), 'use = call:counting_factories:make_app',
+              'filter-with = tag']
+    path.write('\n'.join(lines) + '\n')
+    loader = Loader(str(path), lazy=lazy)
+    app = loader.load_app()
+    for _ in range(depth):
+        app = app.app
+    assert isinstance(app, counting_factories.CountedApp)
+    nested = loader.load_app('nested')
+    assert isinstance(nested.app, counting_factories.CountedApp)
+
+
+def test_lazy_config():
+    config_path = os.path.join(here, 'config_files/multi_app.ini')
+    eager = IniConfigLoader(config_path)
+    lazy = IniConfigLoader(config_path, lazy=True)
+    server_config = lazy.server_config('main')
+    assert server_config.config == {'use': 'egg:montague_testapps#server_factory', 'port': '8080'}
+    assert list(lazy._sections) == ['server:main']
+    for name in ('main', 'titled', 'app', 'unused'):
+        assert lazy.app_config(name) == eager.app_config(name)
+    for name in eager.config()['filter']:
+        assert lazy.filter_config(name) == eager.filter_config(name)
+    with pytest.raises(KeyError):
+        lazy.filter_config('_montague_filter_2')
+    with pytest.raises(KeyError):
+        lazy.logging_config('main')
+    assert lazy.config() == eager.config()
+    validate_config_loader_methods(lazy)
+
+
+def test_lazy_loader():
+    config_path = os.path.join(here, 'config_files/multi_app.ini')
+    loader = Loader(config_path, lazy=True)
+    assert loader.config_loader.lazy
+    app = loader.load_app('titled')
+    assert app.method_to_call == 'title'
+    assert app.app is montague_testapps.apps.basic_app
+    assert sorted(loader.config_loader._sections) == ['app:app', 'filter-app:titled']
+    app = loader.load_app()
+    assert app.app.app.app is montague_testapps.apps.basic_app
+    assert Loader(config_path).config_loader is not loader.config_loader
+
+
+def test_lazy_logging_config():
+    config_path = os.path.join(here, 'config_files/logging.ini')
+    lazy = IniConfigLoader(config_path, lazy=True)
+    assert lazy.logging_config('main') == IniConfigLoader(config_path).logging_config('main')
@@ -0,0 +1,183 @@
+import os
+import pytest
+import six
+from six.moves import configparser
+from montague.iniparser import IniParser
+from montague.ini import IniConfigLoader
+
+here = os.path.dirname(__file__)
+
+TRICKY = """\
+# a comment
+[DEFAULT]
+base = /srv
+Mixed_Case = yes
+
+[app:main]
+use = egg:montague_testapps#basic_app
+path = %(base)s/%(name)s
+name: main
+  ; an indented comment
+multi = first
+    second
+
+    third
+
+percent = 100%%
+broken = %(nope)s
+bad = 50%
+deep = %(deeper)s
+deeper = %(deep)s
+case = %(MIXED_CASE)s
+here_ref = %(here)s
+empty =
+
+[section with spaces]
+key=value
+"""
+
+
+@pytest.fixture
+def parsers(tmpdir):
+    path = str(tmpdir.join('tricky.ini'))
+    with open(path, 'w') as f:
+        f.write(TRICKY)
+    ours = IniParser()
+    assert ours.read(path)
+    theirs = configparser.ConfigParser()
+    theirs.read(path)
+    return ours, theirs
+
+
+def test_structure(parsers):
+    ours, theirs = parsers
+    assert ours.sections() == theirs.sections()
+    assert dict(ours.defaults()) == dict(theirs.defaults())
+    for section in theirs.sections():
+        assert ours.has_section(section)
+        assert ours.options(section) == theirs.options(section)
+        assert ours.items(section, raw=True) == theirs.items(section, raw=True)
+    assert not ours.has_section('DEFAULT')
+
+
+def test_interpolation(parsers):
+    ours, theirs = parsers
+    path_defaults = {'here': '/etc/app'}
+    for option in theirs.options('app:main'):
+        try:
+            expected = theirs.get('app:main', option, vars=path_defaults)
+        except configparser.InterpolationError as e:
+            with pytest.raises(type(e)):
+                ours.get('app:main', option, vars=path_defaults)
+        else:
+            assert ours.get('app:main', option, vars=path_defaults) == expected
+    assert ours.get('app:main', 'multi') == ('first\nsecond\nthird' if six.PY2 else
+                                             'first\nsecond\n\nthird')
+    assert ours.get('app:main', 'path') == '/srv/main'
+    with pytest.raises(configparser.NoOptionError):
+        ours.get('app:main', 'missing')
+    with pytest.raises(configparser.NoSectionError):
+        ours.get('app:missing', 'use')
+
+
+def test_read_section(parsers):
+    ours, _ = parsers
+    data = ours.read_section('app:main', vars={'here': '/etc/app'}, exclude=ours.defaults())
+    assert 'base' not in data
+    assert data['path'] == '/srv/main'
+    assert data['percent'] == '100%'
+    assert data['here_ref'] == '/etc/app'
+    # raw fallback
+    assert data['broken'] == '%(nope)s'
+    assert data['bad'] == '50%'
+    assert data['deep'] == '%(deeper)s'
+    assert data['empty'] == ''
+
+
+def test_errors():
+    parser = IniParser()
+    with pytest.raises(configparser.MissingSectionHeaderError):
+        parser.read_string('key = value\n')
+    with pytest.raises(configparser.ParsingError):
+        IniParser().read_string('[a]\nnot an option\n')
+    if not six.PY2:
+        with pytest.raises(configparser.DuplicateSectionError):
+            IniParser().read_string('[a]\n[a]\n')
+    assert not IniParser().read('/no/such/file.ini')
+
+
+def test_py2_semantics():
+    parser = IniParser()
+    parser.py2_semantics = True
+    parser.read_string(
+        '[a]\n'
+        'inline = value ; comment\n'
+        'kept = value;not a comment\n'
+        'quoted = ""\n'
+        'multi = first\n'
+        '\n'
+        '  # not a comment\n'
+        '    second\n'
+        '[b]\n'
+        'x = 1\n'
+        '[a]\n'
+        'merged = yes\n')
+    assert parser.sections() == ['a', 'b']
+    assert parser.items('a', raw=True) == [
+        ('inline', 'value'), ('kept', 'value;not a comment'), ('quoted', ''),
+        ('multi', 'first\n# not a comment\nsecond'), ('merged', 'yes')]
+    with pytest.raises(configparser.ParsingError):
+        parser.read_string('[c]\n  indented = option\n')
+
+
+def test_loader_matches_configparser():
+    # The INI loader's output is unchanged by the switch of reader
+    path = os.path.join(here, 'config_files', 'simple_config.ini')
+    theirs = configparser.ConfigParser()
+    theirs.read(path)
+    loader = IniConfigLoader(path)
+    path_defaults = {'here': os.path.dirname(path), '__file__': path}
+    for section in theirs.sections():
+        expected = dict((option, theirs.get(section, option, vars=path_defaults))
+                        for option in theirs.options(section) if option not in theirs.defaults())
+        assert loader._read_section(section) == expected
+
+
+def test_nesting_limit():
+    for depth in (9, 10, 11):
+        lines = ['[s]', 'v0 = end']
+        lines.extend('v{0} = %(v{1})s'.format(n, n - 1) for n in range(1, depth + 1))
+        text = '\n'.join(lines) + '\ncycle = %(cycle)s\n'
+        ours = IniParser()
+        ours.read_string(text)
+        theirs = configparser.ConfigParser()
+        theirs.read_string(text)
+        top = 'v{0}'.format(depth)
+        try:
+            expected = theirs.get('s', top)
+        except configparser.InterpolationDepthError:
+            with pytest.raises(configparser.InterpolationDepthError):
+                ours.get('s', top)
+        else:
+            assert ours.get('s', top) == expected
+        with pytest.raises(configparser.InterpolationDepthError):
+            ours.get('s', 'cycle')
+
+
+def test_compiled_once():
+    parser = IniParser()
+    parser.read_string('\n'.join(
+        ['[DEFAULT]', 'root = /srv', 'logs = %(root)s/logs'] +
+        ['[app:a{0}]\nlog = %(logs)s/a.log\ndir = %(here)s'.format(n) for n in range(50)] +
+        ['[app:override]', 'root = /opt', 'log = %(logs)s/a.log']))
+    vars = {'here': '/etc'}
+    for n in range(50):
+        assert parser.read_section('app:a{0}'.format(n), vars) == {
+            'log': '/srv/logs/a.log', 'dir': '/etc'}
+    # Identical values share a template, and the defaults are expanded once
+    assert sorted(parser._templates) == ['%(here)s', '%(logs)s/a.log', '%(root)s/logs']
+    defaults = parser._resolver(None, vars)
+    assert defaults.resolve('logs')[0] == '/srv/logs'
+    # Unless a section overrides something they depend on
+    assert parser.get('app:override', 'log', vars=vars) == '/opt/logs/a.log'
+    assert parser.get('app:override', 'logs') == '/opt/logs'
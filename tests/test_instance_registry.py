@@ -0,0 +1,56 @@
+import os
+from montague.loadwsgi import Loader
+from montague.registry import InstanceRegistry, freeze
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files/shared.ini')
+
+
+def test_freeze():
+    assert freeze({'b': [1, 2], 'a': {'c': 'd'}}) == freeze({'a': {'c': 'd'}, 'b': [1, 2]})
+    assert freeze({'a': [1, 2]}) != freeze({'a': (1, 2)})
+    hash(freeze({'a': [{'b': set([1])}]}))
+
+
+def test_registry():
+    registry = InstanceRegistry()
+    first = registry.get_or_create('key', object)
+    assert registry.get_or_create('key', object) is first
+    assert registry.hits == 1
+    assert registry.misses == 1
+    assert 'key' in registry
+    assert registry.instances() == [first]
+    assert registry.discard('key') is first
+    assert registry.get_or_create('key', object) is not first
+
+
+def test_not_shared_by_default():
+    dispatcher = Loader(config_path).load_app()
+    apps = dispatcher.map
+    assert apps['10.0.0.1'] is not apps['10.0.0.2']
+    assert apps['10.0.0.1'].app is not apps['10.0.0.2'].app
+
+
+def test_shared():
+    loader = Loader(config_path, share_instances=True)
+    apps = loader.load_app().map
+    # the same section is shared...
+    assert apps['10.0.0.1'] is apps['10.0.0.2']
+    # ...but a different section with identical config isn't
+    assert apps['10.0.0.3'] is not apps['10.0.0.1']
+    assert apps['10.0.0.3'].app is not apps['10.0.0.1'].app
+    # and a section which only uses another is the same section
+    assert loader.load_app('counted_alias') is loader.load_app('counted')
+    assert apps['0.0.0.0'] is not apps['10.0.0.1']
+    assert loader.load_app('counted') is apps['10.0.0.1']
+    assert loader.load_app('other') is apps['0.0.0.0']
+    assert loader.load_filter('tag') is loader.load_filter('tag')
+
+
+def test_unshared():
+    loader = Loader(config_path, share_instances=True, unshared=['tag'])
+    apps = loader.load_app().map
+    assert apps['10.0.0.1'] is not apps['10.0.0.2']
+    assert apps['10.0.0.1'].serial != apps['10.0.0.2'].serial
+    # the app inside the unshared filter is still shared
+    assert apps['10.0.0.1'].app is apps['10.0.0.2'].app
@@ -0,0 +1,140 @@
+import os
+import pytest
+from montague.layertiming import Histogram, LayerTimings, TimingShim
+from montague.loadwsgi import Loader
+from montague.structs import ComposedFilter, Loadable
+from montague.warmup import WarmupRequest, make_environ
+
+here = os.path.dirname(__file__)
+
+
+class Clock(object):
+    """A clock which only moves when the apps below say so."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+clock = Clock()
+
+
+def make_app(global_conf, fail=False):
+    def app(environ, start_response):
+        clock.now += 3
+        if fail:
+            raise ValueError('failed on purpose')
+        start_response('200 OK', [])
+
+        def body():
+            for chunk in (b'a', b'b'):
+                clock.now += 1
+                yield chunk
+        return body()
+    return app
+
+
+def make_filter(global_conf, cost):
+    def filter(app):
+        def filtered(environ, start_response):
+            clock.now += int(cost)
+            return app(environ, start_response)
+        return filtered
+    return filter
+
+
+def chain(fail=False):
+    app = Loadable(factory=make_app, global_conf={}, local_conf={'fail': fail}, is_app=True, name='app')
+    app.outer = Loadable(factory=make_filter, global_conf={}, local_conf={'cost': '1'}, name='inner')
+    app.outer.outer = Loadable(factory=make_filter, global_conf={}, local_conf={'cost': '2'}, name='outer')
+    return app.normalize()
+
+
+def call(app):
+    statuses = []
+    response = app(make_environ(WarmupRequest.parse('/')), lambda status, headers: statuses.append(status))
+    try:
+        body = b''.join(response)
+    finally:
+        response.close()
+    return statuses[0], body
+
+
+def totals(timings):
+    return dict((name, (layer['inclusive']['count'], layer['inclusive']['total'],
+                        layer['exclusive']['total']))
+                for name, layer in timings.stats().items())
+
+
+def test_inclusive_and_exclusive_times():
+    timings = LayerTimings(clock=clock)
+    app = chain().get(layer_timings=timings)
+    assert isinstance(app, TimingShim)
+    assert app.name == 'outer'
+    assert call(app) == ('200 OK', b'ab')
+    # The app's body counts towards every layer it passes through
+    assert totals(timings) == {
+        'outer': (1, 8.0, 2.0),
+        'inner': (1, 6.0, 1.0),
+        'app': (1, 5.0, 5.0),
+    }
+    call(app)
+    assert totals(timings)['outer'] == (2, 16.0, 4.0)
+    timings.reset()
+    assert totals(timings)['outer'] == (0, 0.0, 0.0)
+
+
+def test_failed_calls_recorded():
+    timings = LayerTimings(clock=clock)
+    app = chain(fail=True).get(layer_timings=timings)
+    with pytest.raises(ValueError):
+        call(app)
+    assert totals(timings) == {
+        'outer': (1, 6.0, 2.0),
+        'inner': (1, 4.0, 1.0),
+        'app': (1, 3.0, 3.0),
+    }
+
+
+def test_composed_filter():
+    timings = LayerTimings(clock=clock)
+    outer = Loadable(factory=make_filter, global_conf={}, local_conf={'cost': '2'}, name='outer')
+    outer.inner = Loadable(factory=make_filter, global_conf={}, local_conf={'cost': '1'}, name='inner')
+    composed = outer.normalize().get(layer_timings=timings)
+    assert isinstance(composed, ComposedFilter)
+    assert composed.names == ['inner', 'outer']
+    app = composed(make_app({}))
+    assert call(app) == ('200 OK', b'ab')
+    assert totals(timings) == {'outer': (1, 8.0, 2.0), 'inner': (1, 6.0, 6.0)}
+
+
+def test_histogram():
+    histogram = Histogram(bounds=(0.001, 0.01, 0.1))
+    assert histogram.percentile(50) is None
+    for seconds in [0.0005] * 90 + [0.005] * 9 + [0.5]:
+        histogram.record(seconds)
+    assert histogram.percentile(50) == 0.001
+    assert histogram.percentile(90) == 0.001
+    assert histogram.percentile(99) == 0.01
+    assert histogram.percentile(100) == 0.5
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 100
+    assert snapshot['max'] == 0.5
+    assert snapshot['p99'] == 0.01
+    assert snapshot['buckets'] == [(0.001, 90), (0.01, 9), (None, 1)]
+
+
+def test_loader_pipeline_layers():
+    timings = LayerTimings()
+    loader = Loader(os.path.join(here, 'config_files/multi_app.ini'), layer_timings=timings)
+    app = loader.load_app()
+    assert call(app) == ('200 OK', b'this is basic app')
+    stats = timings.stats()
+    assert sorted(stats) == ['_montague_pipeline_main_filter_1', 'app', 'lower', 'upper']
+    assert all(layer['inclusive']['count'] == 1 for layer in stats.values())
+    assert stats['lower']['inclusive']['total'] >= stats['upper']['inclusive']['total']
+    # Off by default
+    assert not isinstance(Loader(os.path.join(here, 'config_files/multi_app.ini')).load_app(),
+                          TimingShim)
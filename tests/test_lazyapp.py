@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+import counting_factories
+from montague.lazyapp import LazyApp
+from montague.loadwsgi import Loader
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files', 'shared.ini')
+
+
+def call(app, addr):
+    environ = {'REMOTE_ADDR': addr, 'PATH_INFO': '/'}
+    statuses = []
+    body = app(environ, lambda status, headers: statuses.append(status))
+    return statuses[0], b''.join(body)
+
+
+def test_children_loaded_on_first_request():
+    loader = Loader(config_path, lazy_children=True)
+    dispatcher = loader.load_app()
+    children = dispatcher.map
+    assert all(isinstance(child, LazyApp) for child in children.values())
+    assert not any(child.loaded for child in children.values())
+    # The same app mounted twice gets one proxy
+    assert children['10.0.0.1'] is children['10.0.0.2']
+    assert call(dispatcher, '10.0.0.9') == ('200 OK', b'other')
+    assert children['0.0.0.0'].loaded
+    assert not children['10.0.0.1'].loaded
+    first = children['10.0.0.1'].load()
+    assert children['10.0.0.1'].load() is first
+
+
+def test_concurrent_first_requests_build_once(monkeypatch):
+    built = []
+    CountedApp = counting_factories.CountedApp
+
+    class SlowApp(CountedApp):
+        def __init__(self, conf):
+            built.append(conf)
+            time.sleep(0.05)
+            CountedApp.__init__(self, conf)
+    monkeypatch.setattr(counting_factories, 'CountedApp', SlowApp)
+    loader = Loader(config_path, lazy_children=True)
+    dispatcher = loader.load_app()
+    threads = [threading.Thread(target=call, args=(dispatcher, '0.0.0.0')) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert built == [{'body': 'other'}]
+
+
+def test_failed_load_is_retried():
+    attempts = []
+
+    class FlakyLoader(object):
+        def load_app(self, name):
+            attempts.append(name)
+            if len(attempts) == 1:
+                raise RuntimeError('not yet')
+            return 'app'
+    lazy_app = LazyApp(FlakyLoader(), 'main')
+    try:
+        lazy_app.load()
+    except RuntimeError:
+        pass
+    assert not lazy_app.loaded
+    assert lazy_app.load() == 'app'
+    assert attempts == ['main', 'main']
+
+
+def test_prewarm():
+    loader = Loader(config_path, lazy_children=True, prewarm=['other'])
+    dispatcher = loader.load_app()
+    prewarmed = loader.lazy_app('other')
+    for _ in range(100):
+        if prewarmed.loaded:
+            break
+        time.sleep(0.01)
+    assert prewarmed.loaded
+    assert dispatcher.map['0.0.0.0'] is prewarmed
+    assert not loader.lazy_app('counted').loaded
+    assert loader.prewarm(['counted'], background=False) is None
+    assert loader.lazy_app('counted').loaded
+
+
+def test_prewarm_started_once():
+    # Two threads load their first apps at the same moment
+    path = os.path.join(here, 'config_files', 'parallel.ini')
+    loader = Loader(path, lazy_children=True, prewarm=['slow_a'])
+    started = []
+    loader.prewarm = lambda: started.append(True)
+    counting_factories.barrier = threading.Barrier(2, timeout=5)
+    try:
+        threads = [threading.Thread(target=loader.load_app, args=(name,))
+                   for name in ('slow_a', 'slow_b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        counting_factories.barrier = None
+    assert started == [True]
@@ -1,7 +1,9 @@
 import os
+import mock
 import pytest
 from six.moves.configparser import ConfigParser
 from montague.logging import convert_loggers, convert_handlers, convert_formatters, combine
+from montague.logging import adapt_args, evaluate_args, resolve_argnames
 import sys
 
 here = os.path.dirname(__file__)
@@ -89,3 +91,22 @@ def test_combined(ini_cp):
     }
     actual = combine(loggers, handlers, formatters)
     assert expected == actual
+
+
+def test_evaluate_args():
+    assert evaluate_args('()') == ()
+    assert evaluate_args("('app.log', 'a')") == ('app.log', 'a')
+    assert evaluate_args('(sys.stdout,)') == (sys.stdout,)
+    assert evaluate_args("(('localhost', handlers.SYSLOG_UDP_PORT),)") == (('localhost', 514),)
+
+
+def test_argnames_cached():
+    import montague.logging
+    montague.logging._argnames.pop('logging.FileHandler', None)
+    montague.logging._resolved.pop('logging.FileHandler', None)
+    with mock.patch.object(montague.logging, '_resolve', wraps=montague.logging._resolve) as resolve:
+        assert resolve_argnames('logging.FileHandler')[:2] == ('filename', 'mode')
+        assert adapt_args(('app.log', 'w'), 'logging.FileHandler') == {'filename': 'app.log', 'mode': 'w'}
+        assert resolve.call_count == 1
+    with pytest.raises(ValueError):
+        resolve_argnames('logging.NoSuchHandler')
@@ -0,0 +1,132 @@
+import logging
+from montague.loadwsgi import Loader
+from montague.logreconfig import IncrementalLogging, diff_logging_config
+
+LOGGER = 'montague.test.reconfig'
+
+
+def make_config(path, level='INFO', handler_level='DEBUG', fmt='%(message)s', filename=None):
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {'plain': {'format': fmt}},
+        'handlers': {
+            'file': {
+                'class': 'logging.FileHandler',
+                'filename': filename or path,
+                'level': handler_level,
+                'formatter': 'plain',
+            },
+        },
+        'loggers': {LOGGER: {'level': level, 'handlers': ['file'], 'propagate': False}},
+    }
+
+
+def teardown_function(function):
+    logger = logging.getLogger(LOGGER)
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers = []
+
+
+def test_diff(tmpdir):
+    path = str(tmpdir.join('a.log'))
+    base = make_config(path)
+    assert not diff_logging_config(base, make_config(path))
+    changes = diff_logging_config(base, make_config(path, level='DEBUG'))
+    assert changes.loggers == [LOGGER]
+    assert changes.updated == changes.rebuilt == []
+    changes = diff_logging_config(base, make_config(path, handler_level='ERROR'))
+    assert changes.updated == ['file'] and changes.loggers == []
+    changes = diff_logging_config(base, make_config(path, fmt='> %(message)s'))
+    assert changes.updated == ['file']
+    changes = diff_logging_config(base, make_config(path, filename=path + '.new'))
+    assert changes.rebuilt == ['file'] and changes.loggers == [LOGGER]
+
+
+def test_handlers_kept_open(tmpdir):
+    path = str(tmpdir.join('a.log'))
+    state = IncrementalLogging()
+    state.apply(make_config(path))
+    logger = logging.getLogger(LOGGER)
+    handler, = logger.handlers
+    stream = handler.stream
+    logger.debug('hidden')
+    logger.info('one')
+
+    state.apply(make_config(path, level='DEBUG', fmt='> %(message)s'))
+    assert logger.handlers == [handler]
+    assert handler.stream is stream and not stream.closed
+    logger.debug('two')
+
+    state.apply(make_config(path, level='DEBUG', handler_level='ERROR'))
+    logger.info('hidden')
+    assert logger.handlers == [handler]
+    handler.flush()
+    assert tmpdir.join('a.log').read() == 'one\n> two\n'
+
+
+def test_rebuild_and_remove(tmpdir):
+    path = str(tmpdir.join('a.log'))
+    new_path = str(tmpdir.join('b.log'))
+    state = IncrementalLogging()
+    state.apply(make_config(path))
+    logger = logging.getLogger(LOGGER)
+    old, = logger.handlers
+    changes = state.apply(make_config(path, filename=new_path))
+    assert changes.rebuilt == ['file']
+    new, = logger.handlers
+    assert new is not old and new.name == 'file'
+    assert old.stream is None  # closed
+    assert new.level == logging.DEBUG and new.formatter._fmt == '%(message)s'
+    logger.info('moved')
+    new.flush()
+    assert tmpdir.join('b.log').read() == 'moved\n'
+
+    config = make_config(path, filename=new_path)
+    del config['handlers']['file']
+    del config['loggers'][LOGGER]
+    changes = state.apply(config)
+    assert changes.removed == ['file'] and changes.loggers == [LOGGER]
+    assert logger.handlers == []
+    assert logger.level == logging.NOTSET and logger.propagate
+
+
+def test_failed_build_changes_nothing(tmpdir):
+    path = str(tmpdir.join('a.log'))
+    state = IncrementalLogging()
+    state.apply(make_config(path))
+    logger = logging.getLogger(LOGGER)
+    handler, = logger.handlers
+    config = make_config(path, level='DEBUG', filename=str(tmpdir.join('missing', 'b.log')))
+    try:
+        state.apply(config)
+    except Exception:
+        pass
+    else:  # pragma: no cover
+        assert False, 'expected the handler to fail'
+    assert logger.handlers == [handler]
+    assert logger.level == logging.INFO
+
+
+def test_loader(tmpdir):
+    log_path = tmpdir.join('app.log')
+    ini = tmpdir.join('logging.ini')
+    template = '\n'.join([
+        '[loggers]', 'keys=root,reconfig',
+        '[handlers]', 'keys=file',
+        '[formatters]', 'keys=plain',
+        '[logger_root]', 'level=WARNING', 'handlers=',
+        '[logger_reconfig]', 'level={0}', 'handlers=file', 'qualname=' + LOGGER, 'propagate=0',
+        '[handler_file]', 'class=FileHandler', 'formatter=plain',
+        'args=({1!r},)',
+        '[formatter_plain]', 'format=%%(message)s', ''])
+    ini.write(template.format('INFO', str(log_path)))
+    state = IncrementalLogging()
+    Loader(str(ini)).apply_logging_config(state=state)
+    handler, = logging.getLogger(LOGGER).handlers
+    ini.write(template.format('DEBUG', str(log_path)) + '\n')
+    changes = Loader(str(ini)).apply_logging_config(state=state)
+    assert changes.loggers == [LOGGER] and not changes.rebuilt
+    assert logging.getLogger(LOGGER).handlers == [handler]
+    assert logging.getLogger(LOGGER).level == logging.DEBUG
@@ -0,0 +1,68 @@
+import gc
+import os
+import pytest
+import montague_testapps.apps
+from montague.loadwsgi import Loader
+from montague.prefork import ForkHooks
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files/simple_config.ini')
+
+
+def test_hooks_in_order():
+    calls = []
+    hooks = ForkHooks()
+    hooks.register_pre_fork(lambda: calls.append('pre1'))
+    hooks.register_pre_fork(lambda: calls.append('pre2'))
+
+    @hooks.register_post_fork
+    def post():
+        calls.append('post')
+
+    assert post is not None
+    hooks.pre_fork()
+    hooks.post_fork()
+    assert calls == ['pre1', 'pre2', 'post']
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork()')
+def test_preload_and_fork():
+    loader = Loader(config_path)
+    pids = []
+    loader.fork_hooks.register_pre_fork(lambda: pids.append(('pre', os.getpid())))
+    loader.fork_hooks.register_post_fork(lambda: pids.append(('post', os.getpid())))
+    app = loader.preload_app()
+    assert app is montague_testapps.apps.basic_app
+    read_fd, write_fd = os.pipe()
+    loader.fork_hooks.pre_fork()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        loader.fork_hooks.post_fork()
+        os.write(write_fd, repr(pids).encode('ascii'))
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    child_pids = os.read(read_fd, 1024).decode('ascii')
+    os.close(read_fd)
+    assert pids == [('pre', os.getpid())]
+    assert child_pids == repr([('pre', os.getpid()), ('post', pid)])
+
+
+@pytest.mark.skipif(not hasattr(gc, 'freeze'), reason='requires gc.freeze()')
+def test_preload_freeze():
+    try:
+        Loader(config_path).preload_app(freeze=True)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_parent_hooks():
+    calls = []
+    hooks = ForkHooks()
+    hooks.register_pre_fork(lambda: calls.append('pre'))
+    hooks.register_post_fork(lambda: calls.append('child'))
+    hooks.register_post_fork_parent(lambda: calls.append('parent'))
+    hooks.pre_fork()
+    hooks.post_fork_parent()
+    assert calls == ['pre', 'parent']
@@ -0,0 +1,75 @@
+import json
+import os
+from montague import cli
+from montague.cache import config_cache
+from montague.ini import IniConfigLoader
+from montague.profiler import Profiler, profile, format_tree
+from montague.structs import Loadable
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files/multi_app.ini')
+
+
+def walk(phase):
+    yield phase
+    for child in phase.children:
+        for descendant in walk(child):
+            yield descendant
+
+
+def test_phases():
+    ticks = iter(range(100))
+    profiler = Profiler(clock=lambda: next(ticks))
+    with profiler.phase('outer'):
+        with profiler.phase('inner', 'a'):
+            pass
+        with profiler.phase('inner', 'b'):
+            pass
+    outer = profiler.root.children[0]
+    assert outer.duration == 5
+    assert [child.label for child in outer.children] == ['a', 'b']
+    assert outer.exclusive == 3
+    assert profiler.root.duration == 5
+
+
+def test_profile():
+    config_cache.clear()
+    original = IniConfigLoader.__dict__['_expand_pipeline']
+    profiler = profile(config_path)
+    # everything is unpatched afterwards
+    assert IniConfigLoader.__dict__['_expand_pipeline'] is original
+    assert Loadable._call_factory.__name__ == '_call_factory'
+    assert not hasattr(Loadable._call_factory, '__wrapped__')
+    load = profiler.root.children[0]
+    assert (load.name, load.label) == ('load app', 'main')
+    phases = [(phase.name, phase.label) for phase in walk(load)]
+    assert ('config loader', config_path) in phases
+    assert ('read', config_path) in phases
+    assert ('interpolate', 'pipeline:main') in phases
+    assert ('expand', 'pipeline:main') in phases
+    factories = [label for name, label in phases if name == 'factory']
+    assert factories == [
+        'lower (montague_testapps.apps:make_cap_filter)',
+        'upper (montague_testapps.apps:make_cap_filter)',
+        '_montague_pipeline_main_filter_1 (montague_testapps.apps:make_cap_filter)',
+        'app (montague_testapps.apps:make_basic_app)',
+    ]
+    lines = format_tree(profiler.root)
+    assert lines[1].endswith('  load app main')
+
+
+def test_cli_json(capsys):
+    config_cache.clear()
+    assert cli.main(['profile', config_path, '--name', 'app', '--json']) == 0
+    result = json.loads(capsys.readouterr()[0])
+    assert result['name'] == 'total'
+    load = result['children'][0]
+    assert load['label'] == 'app'
+    assert load['duration'] >= load['exclusive'] >= 0
+
+
+def test_cli_tree(capsys):
+    assert cli.main(['profile', config_path, '--kind', 'server']) == 0
+    out = capsys.readouterr()[0]
+    assert 'load server main' in out
+    assert 'factory main (montague_testapps.servers:make_server_factory)' in out
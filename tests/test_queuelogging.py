@@ -0,0 +1,106 @@
+import logging
+import logging.config
+import logging.handlers
+import os
+import threading
+from montague.loadwsgi import Loader
+from montague.queuelogging import QueueLogging, queue_logging_config
+
+here = os.path.dirname(__file__)
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.records.append(self.format(record))
+
+
+def dict_config():
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {'short': {'format': '%(levelname)s:%(message)s'}},
+        'handlers': {
+            'everything': {
+                'class': 'test_queuelogging.RecordingHandler',
+                'formatter': 'short',
+            },
+            'warnings': {
+                'class': 'test_queuelogging.RecordingHandler',
+                'level': 'WARNING',
+            },
+        },
+        'loggers': {
+            'montague.test.queue': {
+                'level': 'DEBUG',
+                'handlers': ['everything', 'warnings'],
+                'propagate': False,
+            },
+        },
+    }
+
+
+def test_rewrite():
+    manager = QueueLogging()
+    original = dict_config()
+    config = queue_logging_config(original, manager)
+    assert original == dict_config()
+    warnings = config['handlers']['warnings']
+    assert warnings['()'] == manager.make_handler
+    assert warnings['level'] == 'WARNING'
+    assert warnings['handler'] == {'class': 'test_queuelogging.RecordingHandler'}
+    assert config['handlers']['everything']['handler']['formatter'] == 'short'
+    assert config['loggers'] == original['loggers']
+
+
+def test_records_handled_off_thread():
+    manager = QueueLogging()
+    logging.config.dictConfig(queue_logging_config(dict_config(), manager))
+    logger = logging.getLogger('montague.test.queue')
+    try:
+        assert manager.running
+        assert all(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers)
+        logger.debug('quiet')
+        logger.warning('loud')
+        manager.stop()
+        assert not manager.running
+        everything, warnings = sorted(manager.handlers, key=lambda h: h.formatter is None)
+        assert everything.records == ['DEBUG:quiet', 'WARNING:loud']
+        assert warnings.records == ['loud']
+        assert threading.current_thread().name not in everything.threads
+        # Records queued while stopped are handled once it starts again
+        logger.error('later')
+        assert warnings.records == ['loud']
+        manager.start()
+        manager.stop()
+        assert warnings.records == ['loud', 'later']
+    finally:
+        manager.close()
+        logger.handlers = []
+    assert manager.handlers == []
+
+
+def test_loader_lifecycle():
+    loader = Loader(os.path.join(here, 'config_files', 'logging.ini'))
+    plain = loader.logging_config()
+    config = loader.logging_config(queue=True)
+    assert set(config['handlers']) == set(plain['handlers'])
+    console = config['handlers']['console']
+    assert console['()'] == loader.queue_logging.make_handler
+    assert console['level'] == 'DEBUG'
+    assert 'level' not in console['handler']
+    assert console['handler']['formatter'] == 'simple'
+    assert config['loggers'] == plain['loggers']
+    manager = loader.queue_logging
+    manager.start()
+    loader.fork_hooks.pre_fork()
+    assert not manager.running
+    loader.fork_hooks.post_fork_parent()
+    assert manager.running
+    loader.close()
+    assert not manager.running
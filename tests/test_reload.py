@@ -0,0 +1,153 @@
+import os
+import shutil
+import threading
+import pytest
+from montague.apppool import AppPool
+from montague.cache import file_identity
+from montague.reload import ReloadingApp, PollingWatcher, diff_config, _Generation
+
+here = os.path.dirname(__file__)
+
+
+@pytest.fixture
+def ini_path(tmpdir):
+    path = str(tmpdir.join('shared.ini'))
+    shutil.copy(os.path.join(here, 'config_files', 'shared.ini'), path)
+    return path
+
+
+def rewrite(path, old, new):
+    with open(path) as f:
+        text = f.read()
+    assert old in text
+    with open(path, 'w') as f:
+        f.write(text.replace(old, new))
+    # make sure the change is visible even on filesystems with coarse mtimes
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+
+def rewrite_in_place(path, old, new):
+    # Same size, same mtime
+    assert len(old) == len(new)
+    identity = file_identity(path)
+    st = os.stat(path)
+    with open(path) as f:
+        text = f.read()
+    with open(path, 'w') as f:
+        f.write(text.replace(old, new))
+    if hasattr(st, 'st_mtime_ns'):
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    else:
+        os.utime(path, (st.st_atime, st.st_mtime))
+    assert file_identity(path) == identity
+
+
+def call(app, addr):
+    environ = {'REMOTE_ADDR': addr}
+    app_iter = app(environ, lambda status, headers: None)
+    return app_iter
+
+
+def test_diff_config():
+    old = {'globals': {}, 'application': {'a': {'use': 'x'}, 'b': {'use': 'y'}}}
+    new = {'globals': {}, 'application': {'a': {'use': 'x'}, 'c': {'use': 'z'}}}
+    assert diff_config(old, new) == set([('application', 'b'), ('application', 'c')])
+    assert diff_config(old, dict(old, globals={'here': '/'})) == set([('globals', None)])
+
+
+def test_incremental_reload(ini_path):
+    reloading = ReloadingApp(ini_path)
+    old = reloading.app
+    assert reloading.reload() == set()
+    assert reloading.app is old
+
+    rewrite(ini_path, 'body = other', 'body = changed')
+    assert reloading.reload() == set([('application', 'other')])
+    new = reloading.app
+    # the composite depends on 'other', so it was rebuilt...
+    assert new is not old
+    assert new.map['0.0.0.0'].conf['body'] == 'changed'
+    assert old.map['0.0.0.0'].closed
+    # ...but the unchanged children were carried over
+    assert new.map['10.0.0.1'] is old.map['10.0.0.1']
+    assert not old.map['10.0.0.1'].app.closed
+
+
+def test_in_flight_requests(ini_path):
+    reloading = ReloadingApp(ini_path)
+    old = reloading.app
+    app_iter = call(reloading, '0.0.0.0')
+    rewrite(ini_path, 'body = other', 'body = changed')
+    reloading.reload()
+    # the request in flight still sees the old app, which hasn't been released
+    assert list(app_iter) == [b'other']
+    assert not old.map['0.0.0.0'].closed
+    app_iter.close()
+    assert old.map['0.0.0.0'].closed
+    app_iter = call(reloading, '0.0.0.0')
+    assert list(app_iter) == [b'changed']
+    app_iter.close()
+
+
+def test_reload_between_read_and_enter(ini_path, monkeypatch):
+    reloading = ReloadingApp(ini_path)
+    enter = _Generation.enter
+
+    def reload_first(generation):
+        monkeypatch.undo()
+        rewrite(ini_path, 'body = other', 'body = changed')
+        reloading.reload()
+        return enter(generation)
+    monkeypatch.setattr(_Generation, 'enter', reload_first)
+    # The request read the old generation, which was released before it
+    # could enter, so it goes to the new one
+    app_iter = call(reloading, '0.0.0.0')
+    assert list(app_iter) == [b'changed']
+    app_iter.close()
+
+
+def test_reload_same_size_and_mtime(ini_path):
+    reloading = ReloadingApp(ini_path)
+    rewrite_in_place(ini_path, 'body = other', 'body = OTHER')
+    assert reloading.reload() == set([('application', 'other')])
+    assert reloading.app.map['0.0.0.0'].conf['body'] == 'OTHER'
+
+
+def test_unsupported_loader_options(ini_path):
+    with pytest.raises(ValueError):
+        ReloadingApp(ini_path, share_instances=False)
+    with pytest.raises(ValueError):
+        ReloadingApp(ini_path, app_pool=AppPool())
+    assert ReloadingApp(ini_path, share_instances=True).loader.registry is not None
+
+
+def test_failed_reload_keeps_old_app(ini_path):
+    reloading = ReloadingApp(ini_path)
+    old = reloading.app
+    rewrite(ini_path, 'use = call:counting_factories:make_filter', 'use = call:counting_factories:nope')
+    with pytest.raises(AttributeError):
+        reloading.reload()
+    assert reloading.app is old
+
+
+def test_polling_watcher(ini_path):
+    changed = threading.Event()
+    watcher = PollingWatcher(lambda: [ini_path], changed.set, interval=0.01)
+    watcher.start()
+    try:
+        rewrite(ini_path, 'body = other', 'body = changed')
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
+
+
+def test_polling_watcher_same_size_and_mtime(ini_path):
+    changed = threading.Event()
+    watcher = PollingWatcher(lambda: [ini_path], changed.set, interval=0.01)
+    watcher.start()
+    try:
+        rewrite_in_place(ini_path, 'body = other', 'body = OTHER')
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
@@ -0,0 +1,126 @@
+import os
+import sys
+import pytest
+import montague_testapps.apps
+from montague.loadwsgi import Loader
+from montague.structs import Loadable, LoadableConfig, ComposedFilter, LayeredConfig, layered
+
+
+def make_filter(global_conf, tag):
+    def filter(app):
+        return (tag, app)
+    return filter
+
+
+def make_app(global_conf):
+    return 'app'
+
+
+def filter_loadable(tag):
+    return Loadable(factory=make_filter, global_conf={}, local_conf={'tag': tag}, name=tag)
+
+
+def test_normalize_order():
+    # app with filter-with f1, where f1 has filter-with f2, and f1 is a filter-app
+    # whose inner is f3
+    app = Loadable(factory=make_app, global_conf={}, local_conf={}, is_app=True, name='app')
+    f1 = filter_loadable('f1')
+    f1.outer = filter_loadable('f2')
+    f1.inner = filter_loadable('f3')
+    app.outer = f1
+    root = app.normalize()
+    assert [node.name for node in root.chain()] == ['f2', 'f1', 'f3', 'app']
+    assert all(node.outer is None for node in root.chain())
+    assert root.get() == ('f2', ('f1', ('f3', 'app')))
+
+
+def test_deep_chain():
+    depth = sys.getrecursionlimit() * 2
+    app = Loadable(factory=make_app, global_conf={}, local_conf={}, is_app=True, name='app')
+    node = app
+    for count in range(depth):
+        node.outer = filter_loadable(count)
+        node = node.outer
+    root = app.normalize()
+    assert len(root.chain()) == depth + 1
+    loaded = root.get()
+    for count in reversed(range(depth)):
+        tag, loaded = loaded
+        assert tag == count
+    assert loaded == 'app'
+
+
+def test_composed_filter():
+    f1 = filter_loadable('f1')
+    f1.inner = filter_loadable('f2')
+    composed = f1.normalize().get()
+    assert isinstance(composed, ComposedFilter)
+    assert composed('app') == ('f1', ('f2', 'app'))
+
+
+def test_layout():
+    app = Loadable(factory=montague_testapps.apps.make_basic_app, global_conf={},
+                   local_conf={}, is_app=True, name='main')
+    app.outer = filter_loadable('f1')
+    assert app.normalize().layout() == [
+        {'name': 'f1', 'factory': 'test_structs:make_filter', 'is_app': False},
+        {'name': 'main', 'factory': 'montague_testapps.apps:make_basic_app', 'is_app': True},
+    ]
+
+
+def test_layered_config():
+    lower = {'a': '1', 'b': '2'}
+    upper = {'b': '3'}
+    conf = layered(upper, LayeredConfig(lower))
+    assert conf.layers == (upper, lower)
+    assert conf == {'a': '1', 'b': '3'}
+    assert sorted(conf) == ['a', 'b'] and len(conf) == 2
+    with pytest.raises(TypeError):
+        conf['c'] = '4'
+    assert not hasattr(conf, 'update')
+    copied = conf.copy()
+    copied['c'] = '4'
+    assert 'c' not in conf and lower == {'a': '1', 'b': '2'}
+    assert layered({}, {}) is layered()
+    assert layered(conf) is conf
+
+
+def test_struct_protocol():
+    config = LoadableConfig.app(name='main', config={'use': 'x'}, global_config={})
+    assert config == LoadableConfig.app(name='main', config={'use': 'x'}, global_config={})
+    assert config != LoadableConfig.filter(name='main', config={'use': 'x'}, global_config={})
+    assert repr(config).startswith("<LoadableConfig(name='main', ")
+    with pytest.raises(AttributeError):
+        config.name = 'other'
+    app = Loadable(factory=make_app, global_conf={'here': '/'}, local_conf={}, is_app=True)
+    assert not hasattr(app, '__dict__')
+    assert app.global_conf == {'here': '/'}
+    assert app == Loadable(factory=make_app, global_conf={'here': '/'}, local_conf={}, is_app=True)
+    assert app != Loadable(factory=make_app, global_conf={}, local_conf={}, is_app=True)
+
+
+def test_global_conf_shared_not_copied():
+    path = os.path.join(os.path.dirname(__file__), 'config_files', 'simple_config.ini')
+    loader = Loader(path)
+    globals_before = dict(loader.config['globals'])
+    main = loader._load_app('main')
+    filtered = loader._load_app('filtered-app')
+    assert main.global_conf.layers == filtered.global_conf.layers == (loader.config['globals'],)
+    assert loader.config['globals'] == globals_before
+    # Factories get a dict of their own, which they may change
+    received = []
+
+    def factory(global_conf):
+        received.append(global_conf)
+        global_conf['here'] = 'changed'
+        global_conf.update(extra='x')
+    Loadable(factory=factory, global_conf=main.global_conf, local_conf={}, is_app=True).get()
+    assert type(received[0]) is dict
+    assert received[0]['extra'] == 'x'
+    assert loader.config['globals'] == globals_before
+    assert main.global_conf == globals_before
+    # Repeated keys and values are interned
+    local_conf = loader._load_filter('filter').local_conf
+    key, = local_conf
+    assert key is sys.intern('method_to_call')
+    assert local_conf[key] is sys.intern('lower')
@@ -0,0 +1,87 @@
+import os
+import pytest
+from montague.loadwsgi import Loader
+from montague.urlmap import URLMap, parse_path_expression, normalize_url
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files', 'urlmap.ini')
+
+
+def app_named(name):
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [(name, environ['SCRIPT_NAME'], environ['PATH_INFO'])]
+    return app
+
+
+def request(app, path, host='localhost', script_name=''):
+    environ = {'PATH_INFO': path, 'SCRIPT_NAME': script_name, 'HTTP_HOST': host,
+               'SERVER_NAME': 'localhost', 'SERVER_PORT': '80'}
+    statuses = []
+    body = app(environ, lambda status, headers: statuses.append(status))
+    return statuses[0], list(body)
+
+
+def test_parse_path_expression():
+    assert parse_path_expression('/blog') == '/blog'
+    assert parse_path_expression('domain example.com /blog') == 'http://example.com/blog'
+    assert parse_path_expression('domain example.com port 8080 path /') == 'http://example.com:8080/'
+    with pytest.raises(ValueError):
+        parse_path_expression('port 8080 /blog')
+    with pytest.raises(ValueError):
+        parse_path_expression('/a /b')
+    assert normalize_url('http://Example.com/blog/') == ('example.com', '/blog')
+    assert normalize_url('/') == (None, '')
+    with pytest.raises(ValueError):
+        normalize_url('blog')
+
+
+def test_longest_prefix():
+    urlmap = URLMap()
+    urlmap['/'] = app_named('root')
+    urlmap['/a'] = app_named('a')
+    urlmap['/a/b/c'] = app_named('c')
+    assert request(urlmap, '/a/b') == ('200 OK', [('a', '/a', '/b')])
+    assert request(urlmap, '/a/b/c/d') == ('200 OK', [('c', '/a/b/c', '/d')])
+    assert request(urlmap, '/a/') == ('200 OK', [('a', '/a', '/')])
+    # Prefixes only match whole segments
+    assert request(urlmap, '/ab') == ('200 OK', [('root', '', '/ab')])
+    assert request(urlmap, '/x', script_name='/mount') == ('200 OK', [('root', '/mount', '/x')])
+    del urlmap['/']
+    assert request(urlmap, '/ab')[0] == '404 Not Found'
+    assert request(urlmap, '/a/b/c')[1] == [('c', '/a/b/c', '')]
+    assert len(urlmap) == 2
+
+
+def test_hosts():
+    urlmap = URLMap()
+    urlmap['/'] = app_named('any')
+    urlmap['http://example.com/'] = app_named('example')
+    urlmap['http://example.com:8080/api'] = app_named('api')
+    assert request(urlmap, '/x', host='other.com')[1] == [('any', '', '/x')]
+    assert request(urlmap, '/x', host='EXAMPLE.com')[1] == [('example', '', '/x')]
+    assert request(urlmap, '/api/x', host='example.com')[1] == [('example', '', '/api/x')]
+    assert request(urlmap, '/api/x', host='example.com:8080')[1] == [('api', '/api', '/x')]
+
+
+def test_many_mounts():
+    urlmap = URLMap()
+    for n in range(3000):
+        urlmap['/tenant{0}/app'.format(n)] = app_named(n)
+    assert request(urlmap, '/tenant2999/app/x')[1] == [(2999, '/tenant2999/app', '/x')]
+    assert request(urlmap, '/tenant2999/other')[0] == '404 Not Found'
+
+
+def test_from_config():
+    loader = Loader(config_path)
+    urlmap = loader.load_app()
+    assert isinstance(urlmap, URLMap)
+    assert request(urlmap, '/blog/post')[1] == ['I am: ', 'basic']
+    assert urlmap['/blog'].local_conf == {'name': 'blog'}
+    assert urlmap['/blog/admin'].local_conf == {'name': 'admin'}
+    assert urlmap['http://docs.example.com/blog'].local_conf == {'name': 'docs'}
+    # The same app mounted twice is only loaded once
+    assert urlmap['http://api.example.com:8080/v1'] is urlmap['/blog/admin']
+    assert urlmap.not_found_app is urlmap['/']
+    strict = loader.load_app('strict')
+    assert request(strict, '/elsewhere')[0] == '404 Not Found'
@@ -0,0 +1,107 @@
+import os
+import sys
+import mock
+import pytest
+from montague.loadwsgi import Loader
+from montague.warmup import Warmup, WarmupRequest, make_environ
+
+here = os.path.dirname(__file__)
+config_path = os.path.join(here, 'config_files', 'warmup.ini')
+
+
+def test_parse_request():
+    assert WarmupRequest.parse('/') == WarmupRequest(method='GET', path='/', headers=())
+    request = WarmupRequest.parse('post /api | Content-Type: application/json | X-A: b: c')
+    assert request.method == 'POST'
+    assert request.path == '/api'
+    assert request.headers == (('Content-Type', 'application/json'), ('X-A', 'b: c'))
+    for line in ('GET', 'GET / extra', 'relative/path', '/ | no colon'):
+        with pytest.raises(ValueError):
+            WarmupRequest.parse(line)
+
+
+def test_from_config():
+    local_conf = {'warmup': '\n/\n  HEAD /ping\n', 'warmup-workers': '3', 'other': 'x'}
+    warmup = Warmup.from_config(local_conf)
+    assert [r.path for r in warmup.requests] == ['/', '/ping']
+    assert warmup.workers == 3
+    assert local_conf == {'other': 'x'}
+    assert Warmup.from_config({}) is None
+    # JSON configs can give a list
+    assert len(Warmup.from_config({'warmup': ['/a', 'GET /b']}).requests) == 2
+
+
+def test_make_environ():
+    environ = make_environ(WarmupRequest.parse(
+        'PUT /a%20b?x=1 | Content-Length: 0 | Accept-Language: en'))
+    assert environ['REQUEST_METHOD'] == 'PUT'
+    assert environ['PATH_INFO'] == '/a b'
+    assert environ['QUERY_STRING'] == 'x=1'
+    assert environ['CONTENT_LENGTH'] == '0'
+    assert environ['HTTP_ACCEPT_LANGUAGE'] == 'en'
+    assert environ['montague.warmup'] is True
+    assert environ['wsgi.input'].read() == b''
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_warmup_before_load_app_returns(lazy):
+    loader = Loader(config_path, lazy=lazy)
+    app = loader.load_app()
+    recording = app.app
+    # The requests go through the filter, and the settings aren't passed on
+    assert 'warmup' not in recording.conf
+    assert 'warmup-workers' not in recording.conf
+    assert sorted(e['PATH_INFO'] for e in recording.environs) == ['/', '/api/ping', '/search']
+    ping = [e for e in recording.environs if e['PATH_INFO'] == '/api/ping'][0]
+    assert ping['REQUEST_METHOD'] == 'POST'
+    assert ping['CONTENT_TYPE'] == 'application/json'
+    assert ping['HTTP_X_WARMUP'] == '1'
+    results = loader.warmup_results['main']
+    assert [r.request.path for r in results] == ['/', '/search?q=warmup', '/api/ping']
+    assert all(r.ok and r.status == '200 OK' and r.seconds >= 0 for r in results)
+
+
+def test_warmup_inherited_and_overridden():
+    loader = Loader(config_path)
+    nested = loader.load_app('nested')
+    assert len(nested.app.environs) == 3
+    override = loader.load_app('override')
+    assert [e['PATH_INFO'] for e in override.app.environs] == ['/other']
+    assert [r.request.path for r in loader.warmup_results['override']] == ['/other']
+
+
+def test_failed_warmup_is_reported_not_raised(caplog):
+    loader = Loader(config_path)
+    app = loader.load_app('failing')
+    failed, ok = loader.warmup_results['failing']
+    assert isinstance(failed.error, ValueError)
+    assert failed.status is None
+    assert not failed.ok
+    assert ok.ok
+    assert len(app.environs) == 2
+    assert 'failed on purpose' in caplog.text
+
+
+def test_warmup_without_futures():
+    loader = Loader(config_path)
+    with mock.patch.dict(sys.modules, {'concurrent.futures': None}):
+        app = loader.load_app()
+    assert len(app.app.environs) == 3
+    assert all(r.ok for r in loader.warmup_results['main'])
+
+
+def test_pipeline_warmup():
+    loader = Loader(config_path)
+    app = loader.load_app('piped')
+    assert [e['PATH_INFO'] for e in app.app.environs] == ['/piped']
+    assert 'warmup' not in app.conf
+    assert loader.load_app('recording').environs == []
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason='montague.aio needs Python 3.5+')
+def test_async_warmup():
+    import asyncio
+    loader = Loader(config_path)
+    app = asyncio.new_event_loop().run_until_complete(loader.load_app_async())
+    assert len(app.app.environs) == 3
+    assert len(loader.warmup_results['main']) == 3